@@ -0,0 +1,50 @@
+"""
+================================================
+Maxwell filter real-time data and check latency
+================================================
+
+This example uses :class:`mne.realtime.MockRtClient` to stream raw data
+buffers through :class:`mne.realtime.RtMaxwellFilter` inside
+:class:`mne.realtime.RtEpochs`, so that the epochs are cleaned with
+SSS or tSSS as the data come in. The time taken to process each buffer
+is compared to the time span of a buffer, which has to be larger for the
+processing to keep up with the acquisition.
+"""
+# License: BSD (3-clause)
+
+import numpy as np
+
+import mne
+from mne.datasets import sample
+from mne.realtime import MockRtClient, RtEpochs, RtMaxwellFilter
+
+print(__doc__)
+
+data_path = sample.data_path()
+raw_fname = data_path + '/MEG/sample/sample_audvis_raw.fif'
+raw = mne.io.read_raw_fif(raw_fname).crop(0, 60).load_data()
+# we send all channels so that they are all calibrated in RtEpochs
+all_picks = np.arange(len(raw.ch_names))
+picks = mne.pick_types(raw.info, meg=True, eog=True, stim=True)
+event_id, tmin, tmax = 1, -0.2, 0.5
+buffer_size = 100
+buffer_duration = buffer_size / raw.info['sfreq']
+
+###############################################################################
+# Compare SSS, and tSSS with a 4 second sliding window
+
+for st_duration in (None, 4.):
+    sss = RtMaxwellFilter(raw.info, origin=(0., 0., 0.04),
+                          st_duration=st_duration, latency=buffer_duration,
+                          verbose='error')
+    rt_client = MockRtClient(raw)
+    rt_epochs = RtEpochs(rt_client, event_id, tmin, tmax, picks=picks,
+                         sss=sss, isi_max=0.5, verbose='error')
+    rt_epochs.start()
+    rt_client.send_data(rt_epochs, all_picks, tmin=0, tmax=60,
+                        buffer_size=buffer_size)
+    evoked = rt_epochs.average()
+    print('%s: %d epochs, %d/%d buffers took more than %0.1f ms '
+          '(max %0.1f ms)' % ('SSS' if st_duration is None else 'tSSS',
+                              evoked.nave, sss.n_late, sss.n_buffers,
+                              1000 * buffer_duration, 1000 * sss.max_latency))
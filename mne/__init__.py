@@ -21,7 +21,8 @@ __version__ = '0.17.dev0'
 # have to import verbose first since it's needed by many things
 from .utils import (set_log_level, set_log_file, verbose, set_config,
                     get_config, get_config_path, set_cache_dir,
-                    set_memmap_min_size, grand_average, sys_info, open_docs)
+                    set_memmap_min_size, grand_average, sys_info, open_docs,
+                    use_threads)
 from .io.pick import (pick_types, pick_channels,
                       pick_channels_regexp, pick_channels_forward,
                       pick_types_forward, pick_channels_cov,
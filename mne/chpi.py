@@ -16,7 +16,8 @@
 #     5. Use a linear model (DC + linear slope + sin + cos terms set up
 #        in ``_setup_hpi_struct``) to fit sinusoidal amplitudes to MEG
 #        channels. Use SVD to determine the phase/amplitude of the sinusoids.
-#        This step is accomplished using ``_fit_cHPI_amplitudes``
+#        This step is accomplished using ``_fit_cHPI_amplitudes_windows``
+#        for many windows at once.
 #     6. If the amplitudes are 98% correlated with last position
 #        (and Δt < t_step_max), skip fitting.
 #     7. Fit magnetic dipoles using the amplitudes for each coil frequency
@@ -34,6 +35,7 @@
 # License: BSD (3-clause)
 
 from functools import partial
+import logging
 
 import numpy as np
 from scipy import linalg
@@ -43,10 +45,11 @@ from .io.pick import pick_types, pick_channels, pick_channels_regexp
 from .io.constants import FIFF
 from .io.ctf.trans import _make_ctf_coord_trans_set
 from .forward import (_magnetic_dipole_field_vec, _create_meg_coils,
-                      _concatenate_coils)
+                      _concatenate_coils, _magnetic_dipole_field_grad)
 from .cov import make_ad_hoc_cov, compute_whitener
 from .transforms import (apply_trans, invert_transform, _angle_between_quats,
                          quat_to_rot, rot_to_quat)
+from .parallel import parallel_func
 from .utils import verbose, logger, use_log_level, _check_fname, warn
 from .externals.six import string_types
 
@@ -387,11 +390,47 @@ def _magnetic_dipole_objective(x, B, B2, coils, scale, method, too_close):
     return B2 - Bm2
 
 
-def _fit_magnetic_dipole(B_orig, x0, coils, scale, method, too_close):
+def _magnetic_dipole_residual(x, B, coils, scale, too_close):
+    """Compute the residual of the data after fitting a magnetic dipole."""
+    fwd = np.dot(_magnetic_dipole_field_vec(x[np.newaxis, :], coils,
+                                            too_close), scale.T)
+    u = linalg.svd(fwd, full_matrices=False)[2]
+    return B - np.dot(np.dot(u, B), u)
+
+
+def _magnetic_dipole_jacobian(x, B, coils, scale, too_close):
+    """Compute the Jacobian of the residual of a magnetic dipole fit."""
+    # The dipole moment is linear, so this is the derivative of the
+    # variable projection residual (Golub & Pereyra 1973)
+    fwd, grad = _magnetic_dipole_field_grad(x, coils, too_close)
+    u, s, vt = linalg.svd(np.dot(scale, fwd.T), full_matrices=False)
+    uB = np.dot(u.T, B)
+    resid = B - np.dot(u, uB)
+    moment = np.dot(vt.T, uB / s)
+    pinv_T = np.dot(u / s, vt)
+    jac = np.empty((len(B), 3))
+    for k in range(3):
+        d_fwd = np.dot(scale, grad[k].T)
+        d_fit = np.dot(d_fwd, moment)
+        d_fit -= np.dot(u, np.dot(u.T, d_fit))
+        jac[:, k] = -d_fit - np.dot(pinv_T, np.dot(d_fwd.T, resid))
+    return jac
+
+
+def _fit_magnetic_dipole(B_orig, x0, coils, scale, method, too_close,
+                         solver='cobyla'):
     """Fit a single bit of data (x0 = pos)."""
-    from scipy.optimize import fmin_cobyla
     B = np.dot(scale, B_orig)
     B2 = np.dot(B, B)
+    if solver == 'lm':  # only for method == 'forward'
+        from scipy.optimize import leastsq
+        args = (B, coils, scale, too_close)
+        # factor limits the first step to ~1 cm
+        x = leastsq(_magnetic_dipole_residual, x0, args,
+                    Dfun=_magnetic_dipole_jacobian, factor=0.1)[0]
+        resid = _magnetic_dipole_residual(x, *args)
+        return x, 1. - np.dot(resid, resid) / B2
+    from scipy.optimize import fmin_cobyla
     objective = partial(_magnetic_dipole_objective, B=B, B2=B2,
                         coils=coils, scale=scale, method=method,
                         too_close=too_close)
@@ -547,67 +586,130 @@ def _fit_cHPI_amplitudes(raw, time_sl, hpi, fit_time, verbose=None):
         The sin amplitudes matching each cHPI frequency
             or None if this time window should be skipped
     """
-    # No need to detrend the data because our model has a DC term
+    return _fit_cHPI_amplitudes_windows(raw, [time_sl], hpi, [fit_time])[0]
+
+
+def _fit_cHPI_amplitudes_windows(raw, time_sls, hpi, fit_times):
+    """Fit cHPI amplitudes for several time windows at once.
+
+    The windows of ``hpi['n_window']`` samples all use the same linear
+    model, so their amplitudes are fit with a single matrix product (and
+    the phases with a stacked SVD). Shorter windows (at the edges of the
+    data) each get their own model.
+
+    Returns
+    -------
+    sin_fits : list of (ndarray, shape (n_freqs, n_channels)) or None
+        The sin amplitudes of each window, see ``_fit_cHPI_amplitudes``.
+    """
+    offset = min(time_sl.start for time_sl in time_sls)
+    stop = max(time_sl.stop for time_sl in time_sls)
+    time_sls = [slice(time_sl.start - offset, time_sl.stop - offset)
+                for time_sl in time_sls]
+    chpi_data = None
     with use_log_level(False):
-        # loads good channels
-        this_data = raw[hpi['meg_picks'], time_sl][0]
+        # loads good channels (once for all windows)
+        data = raw[hpi['meg_picks'], offset:stop][0]
+        if hpi['hpi_pick'] is not None:
+            # loads hpi_stim channel
+            chpi_data = raw[hpi['hpi_pick'], offset:stop][0]
+    return _fit_cHPI_amplitudes_data(data, chpi_data, time_sls, hpi,
+                                     fit_times)
 
+
+def _fit_cHPI_amplitudes_data(data, chpi_data, time_sls, hpi, fit_times):
+    """Fit cHPI amplitudes for several time windows of data arrays.
+
+    ``data`` holds the channels ``hpi['meg_picks']`` and ``chpi_data`` the
+    channel ``hpi['hpi_pick']`` (or is None), see
+    ``_fit_cHPI_amplitudes_windows``.
+    """
+    # No need to detrend the data because our model has a DC term
     # which HPI coils to use
     # other then erroring I don't see this getting used elsewhere?
     if hpi['hpi_pick'] is not None:
-        with use_log_level(False):
-            # loads hpi_stim channel
-            chpi_data = raw[hpi['hpi_pick'], time_sl][0]
-
         ons = (np.round(chpi_data).astype(np.int) &
                hpi['on'][:, np.newaxis]).astype(bool)
         n_on = np.sum(ons, axis=0)
-        if not (n_on >= 3).all():
-            logger.info(_time_prefix(fit_time) + '%s < 3 HPI coils turned on, '
-                        'skipping fit' % (n_on.min(),))
-            return None
-        # #TODO REMOVE # ons = ons.all(axis=1)  # which HPI coils to use
+        # number of samples with too few coils on up to each sample
+        n_bad = np.concatenate([[0], np.cumsum(n_on < 3)])
+
+    sin_fits = [None] * len(time_sls)
+    full, partial = list(), list()
+    for wi, (time_sl, fit_time) in enumerate(zip(time_sls, fit_times)):
+        if hpi['hpi_pick'] is not None and \
+                n_bad[time_sl.stop] > n_bad[time_sl.start]:
+            logger.info(_time_prefix(fit_time) + '%s < 3 HPI coils turned '
+                        'on, skipping fit' % (n_on[time_sl].min(),))
+            continue
+        if time_sl.stop - time_sl.start == hpi['n_window']:
+            full.append(wi)
+        else:  # first or last window
+            partial.append(wi)
+    groups = list()
+    if len(full) > 0:
+        groups.append((full, hpi['model'], hpi['inv_model']))
+    for wi in partial:
+        model = hpi['model'][:time_sls[wi].stop - time_sls[wi].start]
+        groups.append(([wi], model, linalg.pinv(model)))
 
     n_freqs = hpi['n_freqs']
-    this_len = time_sl.stop - time_sl.start
-    if this_len == hpi['n_window']:
-        model, inv_model = hpi['model'], hpi['inv_model']
-    else:  # first or last window
-        model = hpi['model'][:this_len]
-        inv_model = linalg.pinv(model)
-    X = np.dot(inv_model, this_data.T)
-    X_sin, X_cos = X[:n_freqs], X[n_freqs:2 * n_freqs]
-
-    # use SVD across all sensors to estimate the sinusoid phase
-    sin_fit = np.zeros((n_freqs, X_sin.shape[1]))
-    for fi in range(n_freqs):
-        u, s, vt = np.linalg.svd(np.vstack((X_sin[fi, :], X_cos[fi, :])),
-                                 full_matrices=False)
+    for wis, model, inv_model in groups:
+        this_data = np.array([data[:, time_sls[wi]] for wi in wis])
+        # one GEMM for all windows, shape (n_windows, n_channels, n_coefs)
+        X = np.dot(this_data.reshape(-1, len(model)), inv_model.T)
+        X.shape = this_data.shape[:2] + (-1,)
+
+        # use SVD across all sensors to estimate the sinusoid phase
+        X_sin_cos = np.array([X[..., :n_freqs], X[..., n_freqs:2 * n_freqs]])
+        vt = np.linalg.svd(X_sin_cos.transpose(1, 3, 0, 2),
+                           full_matrices=False)[2]
         # the first component holds the predominant phase direction
         # (so ignore the second, effectively doing s[1] = 0):
-        sin_fit[fi, :] = vt[0]
-        # Do not modify X, however, because it will break the signal
-        # reconstruction step.
-
-    data_diff_sq = np.dot(model, X).T - this_data
-    data_diff_sq *= data_diff_sq
-    data_diff_sq = np.sum(data_diff_sq, axis=-1)
-
-    # compute amplitude correlation (for logging), protect against zero
-    norm = this_data
-    del this_data
-    norm *= norm
-    norm = np.sum(norm, axis=-1)
-    norm_sum = norm.sum()
-    norm_sum = np.inf if norm_sum == 0 else norm_sum
-    norm[norm == 0] = np.inf
-    g_sin = 1 - data_diff_sq.sum() / norm_sum
-    g_chan = 1 - data_diff_sq / norm
-    logger.debug('    HPI amplitude correlation %0.3f: %0.3f '
-                 '(%s chnls > 0.95)' % (fit_time, g_sin,
-                                        (g_chan > 0.95).sum()))
-
-    return sin_fit
+        for wi, sin_fit in zip(wis, vt[:, :, 0]):
+            sin_fits[wi] = sin_fit
+
+        # compute amplitude correlation (only logged), protect against zero;
+        # the residual is orthogonal to the fit, so no need to reconstruct
+        if logger.getEffectiveLevel() > logging.DEBUG:
+            continue
+        norm = this_data
+        del this_data
+        norm *= norm
+        norm = np.sum(norm, axis=-1)
+        fit_sq = np.dot(X.reshape(-1, X.shape[-1]), np.dot(model.T, model))
+        fit_sq.shape = X.shape
+        data_diff_sq = norm - np.sum(fit_sq * X, axis=-1)
+        norm_sum = norm.sum(axis=-1)
+        norm_sum[norm_sum == 0] = np.inf
+        norm[norm == 0] = np.inf
+        g_sin = 1 - data_diff_sq.sum(axis=-1) / norm_sum
+        g_chan = 1 - data_diff_sq / norm
+        for wi, this_g_sin, this_g_chan in zip(wis, g_sin, g_chan):
+            logger.debug('    HPI amplitude correlation %0.3f: %0.3f '
+                         '(%s chnls > 0.95)' % (fit_times[wi], this_g_sin,
+                                                (this_g_chan > 0.95).sum()))
+
+    return sin_fits
+
+
+def _iter_cHPI_amplitudes(raw, fit_idxs, hpi):
+    """Yield the fit time and cHPI amplitudes of each window to fit."""
+    fit_times, time_sls = list(), list()
+    for midpt in fit_idxs:
+        fit_times.append((midpt + raw.first_samp - hpi['n_window'] / 2.) /
+                         raw.info['sfreq'])
+        time_sl = midpt - hpi['n_window'] // 2
+        time_sls.append(slice(max(time_sl, 0),
+                              min(time_sl + hpi['n_window'], len(raw.times))))
+    # fit many windows at once, using up to ~40 MB for their data
+    n_batch = max(int(5e6 // (hpi['n_window'] * len(hpi['meg_picks']))), 1)
+    for start in range(0, len(fit_times), n_batch):
+        batch = slice(start, start + n_batch)
+        sin_fits = _fit_cHPI_amplitudes_windows(raw, time_sls[batch], hpi,
+                                                fit_times[batch])
+        for fit_time, sin_fit in zip(fit_times[batch], sin_fits):
+            yield fit_time, sin_fit
 
 
 @verbose
@@ -685,7 +787,7 @@ def _check_too_close(too_close):
 def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
                               t_window=0.2, dist_limit=0.005, gof_limit=0.98,
                               use_distances=True, too_close='raise',
-                              verbose=None):
+                              solver='cobyla', n_jobs=1, verbose=None):
     """Calculate head positions using cHPI coils.
 
     Parameters
@@ -708,6 +810,25 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
     too_close : str
         How to handle HPI positions too close to the sensors,
         can be 'raise', 'warning', or 'info'.
+    solver : str
+        The solver used to fit the position of each coil, can be
+        ``'cobyla'`` (default) to use :func:`scipy.optimize.fmin_cobyla`,
+        or ``'lm'`` to use the Levenberg-Marquardt algorithm of
+        :func:`scipy.optimize.leastsq` with the analytic Jacobian, which
+        needs fewer evaluations of the magnetic dipole field. The coil
+        positions of both solvers agree within about 0.1 mm (``'cobyla'``
+        stops when the steps get below 0.01 mm).
+    n_jobs : int
+        Number of jobs to run in parallel. The time windows are split into
+        ``n_jobs`` consecutive chunks that are fit in parallel. Before that,
+        the chunks are seeded in order: the last window of the previous
+        chunk is fit starting from the fit of the first window of the
+        previous chunk (thus skipping the windows in between), and the first
+        window of the chunk is then fit starting from it and used as the
+        starting point of the chunk. The head positions agree with those
+        of ``n_jobs=1`` within about 0.1 mm and 0.1°, but the windows that
+        are fit (and skipped because the cHPI amplitudes have not changed)
+        can differ near the boundaries of the chunks.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more).
@@ -727,17 +848,71 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
     read_head_pos
     write_head_pos
     """
+    hpi, hpi_dig_head_rrs, hpi_coil_dists, last = _prep_chpi_positions(
+        raw.info, t_window, t_step_min, too_close, solver)
+
+    t_begin = raw.times[0]
+    t_end = raw.times[-1]
+    fit_idxs = raw.time_as_index(np.arange(t_begin + t_window / 2., t_end,
+                                           t_step_min),
+                                 use_rounding=True)
+    logger.info('Fitting up to %s time points (%0.1f sec duration)'
+                % (len(fit_idxs), t_end - t_begin))
+
+    kwargs = dict(hpi=hpi, hpi_dig_head_rrs=hpi_dig_head_rrs,
+                  hpi_coil_dists=hpi_coil_dists, t_step_max=t_step_max,
+                  t_window=t_window, dist_limit=dist_limit,
+                  gof_limit=gof_limit, use_distances=use_distances,
+                  too_close=too_close, solver=solver)
+    parallel, p_fun, n_jobs = parallel_func(_fit_chpi_positions_chunk,
+                                            n_jobs)
+    chunks = [chunk for chunk in np.array_split(fit_idxs, n_jobs)
+              if len(chunk) > 0]
+    # Seed the chunks in order: the last window of the previous chunk is fit
+    # starting from the fit of that chunk's first window (skipping the
+    # windows in between, so its fit is discarded), then the first window of
+    # the chunk is fit starting from it. The rest of the chunks are then fit
+    # in parallel, each one starting from the fit of its first window.
+    seed_quats, seed_lasts = [list()], [last]
+    for prev_chunk, chunk in zip(chunks[:-1], chunks[1:]):
+        this_last = seed_lasts[-1]
+        if len(prev_chunk) > 1:
+            _, this_last = _fit_chpi_positions_chunk(
+                raw, prev_chunk[-1:], this_last, **kwargs)
+        this_last = this_last.copy()
+        this_last['sin_fit'] = None  # always fit the first window
+        this_quats, this_last = _fit_chpi_positions_chunk(
+            raw, chunk[:1], this_last, **kwargs)
+        seed_quats.append(this_quats)
+        seed_lasts.append(this_last)
+    outs = parallel(p_fun(raw, chunk if ci == 0 else chunk[1:], seed_last,
+                          **kwargs)
+                    for ci, (chunk, seed_last)
+                    in enumerate(zip(chunks, seed_lasts)))
+    quats = list()
+    for this_quats, (chunk_quats, _) in zip(seed_quats, outs):
+        quats.extend(this_quats + chunk_quats)
+    logger.info('[done]')
+    quats = np.array(quats, np.float64)
+    quats = np.zeros((0, 10)) if quats.size == 0 else quats
+    return quats
+
+
+def _prep_chpi_positions(info, t_window, t_step_min, too_close, solver):
+    """Set up the cHPI model and the state of the head position fits."""
     from scipy.spatial.distance import cdist
     # extract initial geometry from info['hpi_results']
-    hpi_dig_head_rrs = _get_hpi_initial_fit(raw.info)
+    hpi_dig_head_rrs = _get_hpi_initial_fit(info)
     _check_too_close(too_close)
+    if solver not in ('cobyla', 'lm'):
+        raise ValueError('solver must be "cobyla" or "lm", got %s' % (solver,))
 
     # extract hpi system information
-    hpi = _setup_hpi_struct(raw.info, int(round(t_window * raw.info['sfreq'])))
+    hpi = _setup_hpi_struct(info, int(round(t_window * info['sfreq'])))
 
     # move to device coords
-    dev_head_t = raw.info['dev_head_t']['trans']
-    head_dev_t = invert_transform(raw.info['dev_head_t'])['trans']
+    dev_head_t = info['dev_head_t']['trans']
+    head_dev_t = invert_transform(info['dev_head_t'])['trans']
     hpi_dig_dev_rrs = apply_trans(head_dev_t, hpi_dig_head_rrs)
 
     # compute initial coil to coil distances
@@ -747,35 +922,24 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
     last = dict(sin_fit=None, fit_time=t_step_min,
                 coil_dev_rrs=hpi_dig_dev_rrs,
                 quat=np.concatenate([rot_to_quat(dev_head_t[:3, :3]),
-                                     dev_head_t[:3, 3]]))
-
-    t_begin = raw.times[0]
-    t_end = raw.times[-1]
-    fit_idxs = raw.time_as_index(np.arange(t_begin + t_window / 2., t_end,
-                                           t_step_min),
-                                 use_rounding=True)
-    quats = []
-    logger.info('Fitting up to %s time points (%0.1f sec duration)'
-                % (len(fit_idxs), t_end - t_begin))
-    pos_0 = None
-
-    hpi['n_freqs'] = len(hpi['freqs'])
-    for midpt in fit_idxs:
-        #
-        # 0. determine samples to fit.
-        #
-        fit_time = (midpt + raw.first_samp - hpi['n_window'] / 2.) /\
-            raw.info['sfreq']
-
-        time_sl = midpt - hpi['n_window'] // 2
-        time_sl = slice(max(time_sl, 0),
-                        min(time_sl + hpi['n_window'], len(raw.times)))
-
-        #
-        # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
-        #
-        sin_fit = _fit_cHPI_amplitudes(raw, time_sl, hpi, fit_time)
-
+                                     dev_head_t[:3, 3]]),
+                pos_0=None)
+    return hpi, hpi_dig_head_rrs, hpi_coil_dists, last
+
+
+def _fit_chpi_positions_chunk(raw, fit_idxs, last, hpi, hpi_dig_head_rrs,
+                              hpi_coil_dists, t_step_max, t_window,
+                              dist_limit, gof_limit, use_distances, too_close,
+                              solver):
+    """Fit the head positions of consecutive windows, starting at last."""
+    last = last.copy()
+    quats = list()
+    #
+    # 0. determine samples to fit, and
+    # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
+    #    (for many windows at once)
+    #
+    for fit_time, sin_fit in _iter_cHPI_amplitudes(raw, fit_idxs, hpi):
         # skip this window if bad
         # logging has already been done! Maybe turn this into an Exception
         if sin_fit is None:
@@ -796,120 +960,137 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
         # update 'last' sin_fit *before* inplace sign mult
         last['sin_fit'] = sin_fit.copy()
 
-        #
-        # 2. Fit magnetic dipole for each coil to obtain coil positions
-        #    in device coordinates
-        #
-        outs = [_fit_magnetic_dipole(f, pos, hpi['coils'], hpi['scale'],
-                                     hpi['method'], too_close)
-                for f, pos in zip(sin_fit, last['coil_dev_rrs'])]
-        this_coil_dev_rrs = np.array([o[0] for o in outs])
-        g_coils = [o[1] for o in outs]
-
-        # filter coil fits based on the correspodnace to digitization geometry
-        use_mask = np.ones(hpi['n_freqs'], bool)
-        if use_distances:
-            these_dists = cdist(this_coil_dev_rrs, this_coil_dev_rrs)
-            these_dists = np.abs(hpi_coil_dists - these_dists)
-            # there is probably a better algorithm for finding the bad ones...
-            good = False
-            while not good:
-                d = these_dists[use_mask][:, use_mask]
-                d_bad = (d > dist_limit)
-                good = not d_bad.any()
-                if not good:
-                    if use_mask.sum() == 2:
-                        use_mask[:] = False
-                        break  # failure
-                    # exclude next worst point
-                    badness = (d * d_bad).sum(axis=0)
-                    exclude_coils = np.where(use_mask)[0][np.argmax(badness)]
-                    use_mask[exclude_coils] = False
-            good = use_mask.sum() >= 3
-            if not good:
-                warn(_time_prefix(fit_time) + '%s/%s good HPI fits, '
-                     'cannot determine the transformation!'
-                     % (use_mask.sum(), hpi['n_freqs']))
-                continue
+        quat = _fit_chpi_position(
+            sin_fit, fit_time, last, hpi, hpi_dig_head_rrs, hpi_coil_dists,
+            t_window, dist_limit, gof_limit, use_distances, too_close, solver)
+        if quat is not None:
+            quats.append(quat)
+    return quats, last
 
-        #
-        # 3. Fit the head translation and rotation params (minimize error
-        #    between coil positions and the head coil digitization positions)
-        #
-        this_quat, g = _fit_chpi_quat(this_coil_dev_rrs[use_mask],
-                                      hpi_dig_head_rrs[use_mask],
-                                      last['quat'])
-        if g < gof_limit:
-            logger.info(_time_prefix(fit_time) +
-                        'Bad coil fit! (g=%7.3f)' % (g,))
-            continue
 
-        # Convert quaterion to transform
-        this_dev_head_t = np.concatenate(
-            (quat_to_rot(this_quat[:3]),
-             this_quat[3:][:, np.newaxis]), axis=1)
-        this_dev_head_t = np.concatenate((this_dev_head_t, [[0, 0, 0, 1.]]))
-
-        # velocities, in device coords, of HPI coils
-        # dt = fit_time - last['fit_time'] #
-        dt = t_window
-        vs = tuple(1000. * np.sqrt(np.sum((last['coil_dev_rrs'] -
-                                           this_coil_dev_rrs) ** 2,
-                                          axis=1)) / dt)
+def _fit_chpi_position(sin_fit, fit_time, last, hpi, hpi_dig_head_rrs,
+                       hpi_coil_dists, t_window, dist_limit, gof_limit,
+                       use_distances, too_close, solver):
+    """Fit the head position of one window, updating last inplace.
+
+    Returns
+    -------
+    quat : ndarray, shape (10,) | None
+        The ``[t, q1, q2, q3, x, y, z, gof, err, v]`` of the fit, or None
+        if it failed.
+    """
+    from scipy.spatial.distance import cdist
+    #
+    # 2. Fit magnetic dipole for each coil to obtain coil positions
+    #    in device coordinates
+    #
+    outs = [_fit_magnetic_dipole(f, pos, hpi['coils'], hpi['scale'],
+                                 hpi['method'], too_close, solver)
+            for f, pos in zip(sin_fit, last['coil_dev_rrs'])]
+    this_coil_dev_rrs = np.array([o[0] for o in outs])
+    g_coils = [o[1] for o in outs]
+
+    # filter coil fits based on the correspodnace to digitization geometry
+    use_mask = np.ones(hpi['n_freqs'], bool)
+    if use_distances:
+        these_dists = cdist(this_coil_dev_rrs, this_coil_dev_rrs)
+        these_dists = np.abs(hpi_coil_dists - these_dists)
+        # there is probably a better algorithm for finding the bad ones...
+        good = False
+        while not good:
+            d = these_dists[use_mask][:, use_mask]
+            d_bad = (d > dist_limit)
+            good = not d_bad.any()
+            if not good:
+                if use_mask.sum() == 2:
+                    use_mask[:] = False
+                    break  # failure
+                # exclude next worst point
+                badness = (d * d_bad).sum(axis=0)
+                exclude_coils = np.where(use_mask)[0][np.argmax(badness)]
+                use_mask[exclude_coils] = False
+        good = use_mask.sum() >= 3
+        if not good:
+            warn(_time_prefix(fit_time) + '%s/%s good HPI fits, '
+                 'cannot determine the transformation!'
+                 % (use_mask.sum(), hpi['n_freqs']))
+            return None
+
+    #
+    # 3. Fit the head translation and rotation params (minimize error
+    #    between coil positions and the head coil digitization positions)
+    #
+    this_quat, g = _fit_chpi_quat(this_coil_dev_rrs[use_mask],
+                                  hpi_dig_head_rrs[use_mask],
+                                  last['quat'])
+    if g < gof_limit:
         logger.info(_time_prefix(fit_time) +
-                    ('%s/%s good HPI fits, movements [mm/s] = ' +
-                     ' / '.join(['% 6.1f'] * hpi['n_freqs']))
-                    % ((use_mask.sum(), hpi['n_freqs']) + vs))
-
-        # resulting errors in head coil positions
-        est_coil_head_rrs = apply_trans(this_dev_head_t, this_coil_dev_rrs)
-        errs = 1000. * np.sqrt(((hpi_dig_head_rrs -
-                                 est_coil_head_rrs) ** 2).sum(axis=-1))
-        e = errs[use_mask].mean() / 1000.  # mm -> m
-        d = 100 * np.sqrt(np.sum(last['quat'][3:] - this_quat[3:]) ** 2)  # cm
-        r = _angle_between_quats(last['quat'][:3], this_quat[:3]) / dt
-        v = d / dt  # cm/sec
-        if pos_0 is None:
-            pos_0 = this_quat[3:].copy()
-        d = 100 * np.sqrt(np.sum((this_quat[3:] - pos_0) ** 2))  # dis from 1st
-        # MaxFilter averages over a 200 ms window for display, but we don't
-        for ii in range(hpi['n_freqs']):
-            if use_mask[ii]:
-                start, end = ' ', '/'
-            else:
-                start, end = '(', ')'
-            log_str = ('    ' + start +
-                       '{0:6.1f} {1:6.1f} {2:6.1f} / ' +
-                       '{3:6.1f} {4:6.1f} {5:6.1f} / ' +
-                       'g = {6:0.3f} err = {7:4.1f} ' +
-                       end)
-            if ii <= 2:
-                log_str += '{8:6.3f} {9:6.3f} {10:6.3f}'
-            elif ii == 3:
-                log_str += '{8:6.1f} {9:6.1f} {10:6.1f}'
-            vals = np.concatenate((1000 * hpi_dig_head_rrs[ii],
-                                   1000 * est_coil_head_rrs[ii],
-                                   [g_coils[ii], errs[ii]]))  # errs in mm
-            if ii <= 2:
-                vals = np.concatenate((vals, this_dev_head_t[ii, :3]))
-            elif ii == 3:
-                vals = np.concatenate((vals, this_dev_head_t[:3, 3] * 1000.))
-            logger.debug(log_str.format(*vals))
-        logger.debug('    #t = %0.3f, #e = %0.2f cm, #g = %0.3f, '
-                     '#v = %0.2f cm/s, #r = %0.2f rad/s, #d = %0.2f cm'
-                     % (fit_time, 100 * e, g, v, r, d))
-        logger.debug('    #t = %0.3f, #q = %s '
-                     % (fit_time, ' '.join(map('{:8.5f}'.format, this_quat))))
-
-        quats.append(np.concatenate(([fit_time], this_quat, [g],
-                                     [e * 100], [v])))  # e in centimeters
-        last['fit_time'] = fit_time
-        last['quat'] = this_quat
-        last['coil_dev_rrs'] = this_coil_dev_rrs
-    logger.info('[done]')
-    quats = np.array(quats, np.float64)
-    quats = np.zeros((0, 10)) if quats.size == 0 else quats
-    return quats
+                    'Bad coil fit! (g=%7.3f)' % (g,))
+        return None
+
+    # Convert quaterion to transform
+    this_dev_head_t = np.concatenate(
+        (quat_to_rot(this_quat[:3]),
+         this_quat[3:][:, np.newaxis]), axis=1)
+    this_dev_head_t = np.concatenate((this_dev_head_t, [[0, 0, 0, 1.]]))
+
+    # velocities, in device coords, of HPI coils
+    # dt = fit_time - last['fit_time'] #
+    dt = t_window
+    vs = tuple(1000. * np.sqrt(np.sum((last['coil_dev_rrs'] -
+                                       this_coil_dev_rrs) ** 2,
+                                      axis=1)) / dt)
+    logger.info(_time_prefix(fit_time) +
+                ('%s/%s good HPI fits, movements [mm/s] = ' +
+                 ' / '.join(['% 6.1f'] * hpi['n_freqs']))
+                % ((use_mask.sum(), hpi['n_freqs']) + vs))
+
+    # resulting errors in head coil positions
+    est_coil_head_rrs = apply_trans(this_dev_head_t, this_coil_dev_rrs)
+    errs = 1000. * np.sqrt(((hpi_dig_head_rrs -
+                             est_coil_head_rrs) ** 2).sum(axis=-1))
+    e = errs[use_mask].mean() / 1000.  # mm -> m
+    d = 100 * np.sqrt(np.sum(last['quat'][3:] - this_quat[3:]) ** 2)  # cm
+    r = _angle_between_quats(last['quat'][:3], this_quat[:3]) / dt
+    v = d / dt  # cm/sec
+    if last['pos_0'] is None:
+        last['pos_0'] = this_quat[3:].copy()
+    d = 100 * np.sqrt(np.sum((this_quat[3:] - last['pos_0']) ** 2))
+    # d is the distance from the first position
+    # MaxFilter averages over a 200 ms window for display, but we don't
+    for ii in range(hpi['n_freqs']):
+        if use_mask[ii]:
+            start, end = ' ', '/'
+        else:
+            start, end = '(', ')'
+        log_str = ('    ' + start +
+                   '{0:6.1f} {1:6.1f} {2:6.1f} / ' +
+                   '{3:6.1f} {4:6.1f} {5:6.1f} / ' +
+                   'g = {6:0.3f} err = {7:4.1f} ' +
+                   end)
+        if ii <= 2:
+            log_str += '{8:6.3f} {9:6.3f} {10:6.3f}'
+        elif ii == 3:
+            log_str += '{8:6.1f} {9:6.1f} {10:6.1f}'
+        vals = np.concatenate((1000 * hpi_dig_head_rrs[ii],
+                               1000 * est_coil_head_rrs[ii],
+                               [g_coils[ii], errs[ii]]))  # errs in mm
+        if ii <= 2:
+            vals = np.concatenate((vals, this_dev_head_t[ii, :3]))
+        elif ii == 3:
+            vals = np.concatenate((vals, this_dev_head_t[:3, 3] * 1000.))
+        logger.debug(log_str.format(*vals))
+    logger.debug('    #t = %0.3f, #e = %0.2f cm, #g = %0.3f, '
+                 '#v = %0.2f cm/s, #r = %0.2f rad/s, #d = %0.2f cm'
+                 % (fit_time, 100 * e, g, v, r, d))
+    logger.debug('    #t = %0.3f, #q = %s '
+                 % (fit_time, ' '.join(map('{:8.5f}'.format, this_quat))))
+
+    last['fit_time'] = fit_time
+    last['quat'] = this_quat
+    last['coil_dev_rrs'] = this_coil_dev_rrs
+    return np.concatenate(([fit_time], this_quat, [g],
+                           [e * 100], [v]))  # e in centimeters
 
 
 @verbose
@@ -985,22 +1166,12 @@ def _calculate_chpi_coil_locs(raw, t_step_min=0.1, t_step_max=10.,
                 % (len(fit_idxs), t_end - t_begin))
 
     hpi['n_freqs'] = len(hpi['freqs'])
-    for midpt in fit_idxs:
-        #
-        # 0. determine samples to fit.
-        #
-        fit_time = (midpt + raw.first_samp - hpi['n_window'] / 2.) /\
-            raw.info['sfreq']
-
-        time_sl = midpt - hpi['n_window'] // 2
-        time_sl = slice(max(time_sl, 0),
-                        min(time_sl + hpi['n_window'], len(raw.times)))
-
-        #
-        # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
-        #
-        sin_fit = _fit_cHPI_amplitudes(raw, time_sl, hpi, fit_time)
-
+    #
+    # 0. determine samples to fit, and
+    # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
+    #    (for many windows at once)
+    #
+    for fit_time, sin_fit in _iter_cHPI_amplitudes(raw, fit_idxs, hpi):
         # skip this window if bad
         # logging has already been done! Maybe turn this into an Exception
         if sin_fit is None:
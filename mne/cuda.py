@@ -85,7 +85,7 @@ def init_cuda(ignore_config=False, verbose=None):
 ###############################################################################
 # Repeated FFT multiplication
 
-def _setup_cuda_fft_multiply_repeated(n_jobs, h, n_fft):
+def _setup_cuda_fft_multiply_repeated(n_jobs, h, n_fft, h_fft=None):
     """Set up repeated CUDA FFT multiplication with a given filter.
 
     Parameters
@@ -97,6 +97,9 @@ def _setup_cuda_fft_multiply_repeated(n_jobs, h, n_fft):
         The filtering function that will be used repeatedly.
     n_fft : int
         The number of points in the FFT.
+    h_fft : array | None
+        The precomputed real FFT of ``h`` with ``n_fft`` points, if
+        available.
 
     Returns
     -------
@@ -123,8 +126,10 @@ def _setup_cuda_fft_multiply_repeated(n_jobs, h, n_fft):
     -----
     This function is designed to be used with fft_multiply_repeated().
     """
-    cuda_dict = dict(n_fft=n_fft, rfft=np.fft.rfft, irfft=np.fft.irfft,
-                     h_fft=np.fft.rfft(h, n=n_fft))
+    if h_fft is None:
+        h_fft = np.fft.rfft(h, n=n_fft)
+    cuda_dict = dict(use_cuda=False, n_fft=n_fft, rfft=np.fft.rfft,
+                     irfft=np.fft.irfft, h_fft=h_fft)
     if n_jobs == 'cuda':
         n_jobs = 1
         init_cuda()
@@ -138,7 +143,7 @@ def _setup_cuda_fft_multiply_repeated(n_jobs, h, n_fft):
                 logger.info('CUDA not used, could not instantiate memory '
                             '(arrays may be too large: "%s"), falling back to '
                             'n_jobs=1' % str(exp))
-            cuda_dict.update(h_fft=h_fft,
+            cuda_dict.update(use_cuda=True, h_fft=h_fft,
                              rfft=_cuda_upload_rfft,
                              irfft=_cuda_irfft_get)
         else:
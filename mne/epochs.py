@@ -12,6 +12,7 @@
 
 from collections import OrderedDict, Counter
 from copy import deepcopy
+import itertools
 import json
 import operator
 import os.path as op
@@ -21,10 +22,8 @@ import numpy as np
 import scipy
 
 from .io.write import (start_file, start_block, end_file, end_block,
-                       write_int, write_float, write_float_matrix,
-                       write_double_matrix, write_complex_float_matrix,
-                       write_complex_double_matrix, write_id, write_string,
-                       _get_split_size)
+                       write_int, write_float, write_id, write_string,
+                       _get_split_size, _write_matrix_chunks)
 from .io.meas_info import read_meas_info, write_meas_info, _merge_info
 from .io.open import fiff_open, _get_next_fname
 from .io.tree import dir_tree_find
@@ -38,6 +37,7 @@ from .io.base import BaseRaw, ToDataFrameMixin, TimeMixin
 from .bem import _check_origin
 from .evoked import EvokedArray, _check_decim
 from .baseline import rescale, _log_rescale
+from .annotations import _sync_onset
 from .channels.channels import (ContainsMixin, UpdateChannelsMixin,
                                 SetChannelsMixin, InterpolationMixin)
 from .filter import detrend, FilterMixin
@@ -52,8 +52,13 @@ from .utils import (check_fname, logger, verbose, _check_type_picks,
 from .externals.six import iteritems, string_types
 from .externals.six.moves import zip
 
+# number of samples (n_epochs * n_channels * n_times) that are read and
+# processed at once when loading epochs, and the maximum number of samples
+# (n_channels * n_times) of a raw data window read at once
+_BATCH_SIZE = int(1e7)
 
-def _save_split(epochs, fname, part_idx, n_parts, fmt):
+
+def _save_split(epochs, fname, part_idx, n_parts, fmt, chunk_size=None):
     """Split epochs."""
     # insert index in filename
     path, base = op.split(fname)
@@ -85,22 +90,19 @@ def _save_split(epochs, fname, part_idx, n_parts, fmt):
     start_block(fid, FIFF.FIFFB_PROCESSED_DATA)
     start_block(fid, FIFF.FIFFB_MNE_EPOCHS)
 
-    # write events out after getting data to ensure bad events are dropped
-    data = epochs.get_data()
+    # the data are loaded (and written) chunk by chunk, get the first one
+    # to know the data type
+    assert epochs._bad_dropped
+    batches = epochs._iter_data(chunk_size)
+    first = next(batches, None)
 
     if fmt not in ['single', 'double']:
         raise ValueError('fmt must be "single" or "double". Got (%s)' % fmt)
 
-    if np.iscomplexobj(data):
-        if fmt == 'single':
-            write_function = write_complex_float_matrix
-        elif fmt == 'double':
-            write_function = write_complex_double_matrix
+    if first is not None and np.iscomplexobj(first[1]):
+        dtype = '>c8' if fmt == 'single' else '>c16'
     else:
-        if fmt == 'single':
-            write_function = write_float_matrix
-        elif fmt == 'double':
-            write_function = write_double_matrix
+        dtype = '>f4' if fmt == 'single' else '>f8'
 
     start_block(fid, FIFF.FIFFB_MNE_EVENTS)
     write_int(fid, FIFF.FIFF_MNE_EVENT_LIST, epochs.events.T)
@@ -142,12 +144,17 @@ def _save_split(epochs, fname, part_idx, n_parts, fmt):
         decal[k] = 1.0 / (info['chs'][k]['cal'] *
                           info['chs'][k].get('scale', 1.0))
 
-    data *= decal[np.newaxis, :, np.newaxis]
+    decal = decal[np.newaxis, :, np.newaxis]
 
-    write_function(fid, FIFF.FIFF_EPOCH, data)
+    def _scaled_chunks():
+        if first is not None:
+            for _, data in itertools.chain([first], batches):
+                yield data * decal
 
-    # undo modifications to data
-    data /= decal[np.newaxis, :, np.newaxis]
+    _write_matrix_chunks(fid, FIFF.FIFF_EPOCH,
+                         (len(epochs.events), info['nchan'],
+                          len(epochs.times)),
+                         _scaled_chunks(), dtype)
 
     write_string(fid, FIFF.FIFF_MNE_EPOCHS_DROP_LOG,
                  json.dumps(epochs.drop_log))
@@ -707,6 +714,9 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
     def _detrend_offset_decim(self, epoch, verbose=None):
         """Aux Function: detrend, baseline correct, offset, decim.
 
+        Works on a single epoch (n_channels, n_times) or on a batch of epochs
+        (n_epochs, n_channels, n_times).
+
         Note: operates inplace
         """
         if (epoch is None) or isinstance(epoch, string_types):
@@ -715,22 +725,24 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         # Detrend
         if self.detrend is not None:
             picks = _pick_data_channels(self.info, exclude=[])
-            epoch[picks] = detrend(epoch[picks], self.detrend, axis=1)
+            epoch[..., picks, :] = detrend(epoch[..., picks, :],
+                                           self.detrend, axis=-1)
 
         # Baseline correct
         picks = pick_types(self.info, meg=True, eeg=True, stim=False,
                            ref_meg=True, eog=True, ecg=True, seeg=True,
                            emg=True, bio=True, ecog=True, fnirs=True,
                            exclude=[])
-        epoch[picks] = rescale(epoch[picks], self._raw_times, self.baseline,
-                               copy=False, verbose=False)
+        epoch[..., picks, :] = rescale(epoch[..., picks, :], self._raw_times,
+                                       self.baseline, copy=False,
+                                       verbose=False)
 
         # handle offset
         if self._offset is not None:
             epoch += self._offset
 
         # Decimate if necessary (i.e., epoch not preloaded)
-        epoch = epoch[:, self._decim_slice]
+        epoch = epoch[..., self._decim_slice]
         return epoch
 
     def iter_evoked(self):
@@ -1208,6 +1220,107 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         """Get a given epoch from disk."""
         raise NotImplementedError
 
+    def _get_epochs_from_raw(self, idx):
+        """Get several epochs from disk.
+
+        Subclasses can override this to read the epochs more efficiently
+        than one at a time.
+
+        Parameters
+        ----------
+        idx : ndarray of int
+            The epoch indices.
+
+        Returns
+        -------
+        data : ndarray, shape (len(idx), n_channels, n_raw_times)
+            The epochs data. Rows of the epochs in ``others`` are undefined.
+        others : dict
+            Maps positions in ``idx`` to what :meth:`_get_epoch_from_raw`
+            returns for epochs that could not be read in full (None, a
+            string describing a bad segment, or a too short array).
+        """
+        n_times = len(self._raw_times)
+        data = None
+        others = dict()
+        for ii, this_idx in enumerate(idx):
+            epoch = self._get_epoch_from_raw(this_idx)
+            if isinstance(epoch, np.ndarray) and epoch.shape[1] == n_times:
+                if data is None:
+                    data = np.zeros((len(idx),) + epoch.shape, epoch.dtype)
+                data[ii] = epoch
+            else:
+                others[ii] = epoch
+        if data is None:
+            data = np.zeros((len(idx), len(self.ch_names), n_times))
+        return data, others
+
+    def _get_batch_from_raw(self, idx):
+        """Get several epochs from disk and detrend, offset and decimate."""
+        data, others = self._get_epochs_from_raw(idx)
+        data = self._detrend_offset_decim(data)
+        for ii, epoch in others.items():
+            others[ii] = self._detrend_offset_decim(epoch)
+        return data, others
+
+    def _is_good_batch(self, data):
+        """Determine which epochs of a batch of full-length epochs are good.
+
+        Returns a list with None for good epochs and the list of offending
+        channels (as for :meth:`_is_good_epoch`) for bad ones.
+        """
+        if self.reject is None and self.flat is None:
+            return [None] * len(data)
+        if self._reject_time is not None:
+            data = data[..., self._reject_time]
+        return _is_good_batch(data, self.ch_names, self._channel_type_idx,
+                              self.reject, self.flat,
+                              ignore_chs=self.info['bads'])
+
+    def _iter_batches(self, n_epochs=None):
+        """Iterate over slices of epochs that are processed together."""
+        n_events = len(self.events)
+        if n_epochs is None:
+            n_epochs = _BATCH_SIZE // (len(self.ch_names) *
+                                       len(self._raw_times))
+        n_epochs = max(int(n_epochs), 1)
+        for start in range(0, n_events, n_epochs):
+            yield slice(start, min(start + n_epochs, n_events))
+
+    def _iter_data(self, n_epochs=None):
+        """Iterate over the data of the epochs in batches.
+
+        Only the data of one batch are loaded at a time if the epochs are not
+        preloaded. Bad epochs must already have been dropped.
+
+        Parameters
+        ----------
+        n_epochs : int | None
+            The number of epochs per batch. If None, the batch size is
+            chosen based on the number of channels and time points.
+
+        Yields
+        ------
+        batch : slice
+            The epochs in the batch.
+        data : ndarray, shape (n_batch, n_channels, n_times)
+            The data of the batch.
+        """
+        assert self._bad_dropped
+        for batch in self._iter_batches(n_epochs):
+            if self.preload:
+                yield batch, self._data[batch]
+                continue
+            data, others = self._get_batch_from_raw(
+                np.arange(len(self.events))[batch])
+            if not self._do_delayed_proj:
+                data = self._project_epoch(data)
+            for ii, epoch in others.items():
+                if not self._do_delayed_proj:
+                    epoch = self._project_epoch(epoch)
+                data[ii] = epoch
+            yield batch, data
+
     def _project_epoch(self, epoch):
         """Process a raw epoch based on the delayed param."""
         # whenever requested, the first epoch is being projected.
@@ -1216,7 +1329,10 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             return epoch
         proj = self._do_delayed_proj or self.proj
         if self._projector is not None and proj is True:
-            epoch = np.dot(self._projector, epoch)
+            if epoch.ndim == 3:  # a batch of epochs
+                epoch = np.dot(self._projector, epoch).transpose(1, 0, 2)
+            else:
+                epoch = np.dot(self._projector, epoch)
         return epoch
 
     @verbose
@@ -1250,53 +1366,62 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
                 return data
 
             # we need to load from disk, drop, and return data
-            for idx in range(n_events):
-                # faster to pre-allocate memory here
-                epoch_noproj = self._get_epoch_from_raw(idx)
-                epoch_noproj = self._detrend_offset_decim(epoch_noproj)
-                if self._do_delayed_proj:
-                    epoch_out = epoch_noproj
-                else:
-                    epoch_out = self._project_epoch(epoch_noproj)
-                if idx == 0:
+            for batch, epoch_out in self._iter_data():
+                if batch.start == 0:
+                    # faster to pre-allocate memory here
                     data = np.empty((n_events, len(self.ch_names),
                                      len(self.times)), dtype=epoch_out.dtype)
-                data[idx] = epoch_out
+                data[batch] = epoch_out
         else:
             # bads need to be dropped, this might occur after a preload
             # e.g., when calling drop_bad w/new params
             good_idx = []
             n_out = 0
             assert n_events == len(self.selection)
-            for idx, sel in enumerate(self.selection):
+            for batch in self._iter_batches():
+                others = dict()
                 if self.preload:  # from memory
                     if self._do_delayed_proj:
-                        epoch_noproj = self._data[idx]
+                        epoch_noproj = self._data[batch]
                         epoch = self._project_epoch(epoch_noproj)
                     else:
                         epoch_noproj = None
-                        epoch = self._data[idx]
+                        epoch = self._data[batch]
                 else:  # from disk
-                    epoch_noproj = self._get_epoch_from_raw(idx)
-                    epoch_noproj = self._detrend_offset_decim(epoch_noproj)
+                    epoch_noproj, others = self._get_batch_from_raw(
+                        np.arange(n_events)[batch])
                     epoch = self._project_epoch(epoch_noproj)
-
                 epoch_out = epoch_noproj if self._do_delayed_proj else epoch
-                is_good, offending_reason = self._is_good_epoch(epoch)
-                if not is_good:
-                    self.drop_log[sel] += offending_reason
-                    continue
-                good_idx.append(idx)
-
-                # store the epoch if there is a reason to (output or update)
-                if out or self.preload:
-                    # faster to pre-allocate, then trim as necessary
-                    if n_out == 0 and not self.preload:
-                        data = np.empty((n_events, epoch_out.shape[0],
-                                         epoch_out.shape[1]),
-                                        dtype=epoch_out.dtype, order='C')
-                    data[n_out] = epoch_out
-                    n_out += 1
+                offending_reasons = self._is_good_batch(epoch)
+
+                for ii, sel in enumerate(self.selection[batch]):
+                    idx = batch.start + ii
+                    if ii in others:  # could not be read in full
+                        this_noproj = others[ii]
+                        this_epoch = self._project_epoch(this_noproj)
+                        this_out = (this_noproj if self._do_delayed_proj
+                                    else this_epoch)
+                        is_good, offending_reason = \
+                            self._is_good_epoch(this_epoch)
+                    else:
+                        this_out = epoch_out[ii]
+                        offending_reason = offending_reasons[ii]
+                        is_good = offending_reason is None
+                    if not is_good:
+                        self.drop_log[sel] += offending_reason
+                        continue
+                    good_idx.append(idx)
+
+                    # store the epoch if there is a reason to (output or
+                    # update)
+                    if out or self.preload:
+                        # faster to pre-allocate, then trim as necessary
+                        if n_out == 0 and not self.preload:
+                            data = np.empty((n_events, this_out.shape[0],
+                                             this_out.shape[1]),
+                                            dtype=this_out.dtype, order='C')
+                        data[n_out] = this_out
+                        n_out += 1
 
             self._bad_dropped = True
             logger.info("%d bad epochs dropped" % (n_events - len(good_idx)))
@@ -1677,7 +1802,8 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         return new
 
     @verbose
-    def save(self, fname, split_size='2GB', fmt='single', verbose=True):
+    def save(self, fname, split_size='2GB', fmt='single', chunk_size=None,
+             verbose=True):
         """Save epochs in a fif file.
 
         Parameters
@@ -1700,6 +1826,13 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             double precision. Choosing single-precision, the saved data
             will slightly differ due to the reduction in precision.
 
+            .. versionadded:: 0.17
+        chunk_size : int | None
+            The number of epochs that are loaded, processed and written at a
+            time. If the epochs are not preloaded, this bounds the memory
+            needed to save them. If None (default), chunks of about 80 MB
+            (1e7 samples) are used.
+
             .. versionadded:: 0.17
         verbose : bool, str, int, or None
             If not None, override default verbose level (see
@@ -1709,6 +1842,8 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         Notes
         -----
         Bad epochs will be dropped before saving the epochs to disk.
+        Epochs that are not preloaded are read from the raw data while they
+        are written, they are not loaded into memory all at once.
         """
         check_fname(fname, 'epochs', ('-epo.fif', '-epo.fif.gz',
                                       '_epo.fif', '_epo.fif.gz'))
@@ -1739,7 +1874,8 @@ class BaseEpochs(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             this_epochs = self[epoch_idx] if n_parts > 1 else self
             # avoid missing event_ids in splits
             this_epochs.event_id = self.event_id
-            _save_split(this_epochs, fname, part_idx, n_parts, fmt)
+            _save_split(this_epochs, fname, part_idx, n_parts, fmt,
+                        chunk_size)
 
     def equalize_event_counts(self, event_ids, method='mintime'):
         """Equalize the number of trials in each condition.
@@ -2143,6 +2279,73 @@ class Epochs(BaseEpochs):
                                             self.reject_by_annotation)
         return data
 
+    def _get_epochs_from_raw(self, idx):
+        """Load several epochs from disk.
+
+        Epochs that are close in time are grouped into windows, each window
+        is read from the raw data once, and the epochs are indexed out of it.
+        """
+        if self._raw is None:
+            # This should never happen, as raw=None only if preload=True
+            raise ValueError('An error has occurred, no valid raw file found.'
+                             ' Please report this to the mne-python '
+                             'developers.')
+        raw = self._raw
+        sfreq = raw.info['sfreq']
+        n_times = len(self._raw_times)
+        starts = np.array([int(round(event_samp + self._raw_times[0] * sfreq))
+                           for event_samp in self.events[idx, 0]], np.int64)
+        starts -= raw.first_samp
+        stops = starts + n_times
+        others = dict()
+
+        # epochs that are not fully inside the data are read one at a time
+        full = (starts >= 0) & (stops <= len(raw.times))
+        for ii in np.where(~full)[0]:
+            others[ii] = self._get_epoch_from_raw(idx[ii])
+        if self.reject_by_annotation and len(raw.annotations) > 0:
+            # the first bad annotation overlapping an epoch is its reason
+            annot = raw.annotations
+            onsets = _sync_onset(raw, annot.onset)
+            for onset, duration, descr in zip(onsets, annot.duration,
+                                              annot.description):
+                if not descr.lower().startswith('bad'):
+                    continue
+                overlaps = np.where(full & (onset < stops / sfreq) &
+                                    (onset + duration > starts / sfreq))[0]
+                for ii in overlaps:
+                    others[ii] = descr
+                full[overlaps] = False
+
+        # group epochs into windows, do not read more than one epoch length
+        # of unused data between epochs
+        data = None
+        max_len = max(_BATCH_SIZE // len(self.picks), n_times)
+        order = np.where(full)[0]
+        order = order[np.argsort(starts[order], kind='mergesort')]
+        ii = 0
+        while ii < len(order):
+            win_start, win_stop = starts[order[ii]], stops[order[ii]]
+            kk = ii + 1
+            while kk < len(order):
+                if starts[order[kk]] > win_stop + n_times or \
+                        stops[order[kk]] - win_start > max_len:
+                    break
+                win_stop = max(win_stop, stops[order[kk]])
+                kk += 1
+            use = order[ii:kk]
+            window = raw[self.picks, win_start:win_stop][0]
+            if data is None:
+                data = np.zeros((len(idx), len(self.picks), n_times),
+                                window.dtype)
+            samps = (starts[use] - win_start)[:, np.newaxis] + \
+                np.arange(n_times)
+            data[use] = window[:, samps].transpose(1, 0, 2)
+            ii = kk
+        if data is None:
+            data = np.zeros((len(idx), len(self.picks), n_times))
+        return data, others
+
 
 class EpochsArray(BaseEpochs):
     """Epochs object from numpy array.
@@ -2479,6 +2682,41 @@ def _is_good(e, ch_names, channel_type_idx, reject, flat, full_report=False,
             return False, bad_list
 
 
+def _is_good_batch(data, ch_names, channel_type_idx, reject, flat,
+                   ignore_chs=[]):
+    """Test which epochs of a batch are good according to reject and flat.
+
+    Vectorized version of :func:`_is_good` (with ``full_report=True``) for
+    data of shape (n_epochs, n_channels, n_times). Returns a list with None
+    for good epochs and the list of offending channels for bad ones.
+    """
+    bad_lists = [None] * len(data)
+    logged = np.zeros(len(data), bool)
+    checkable = np.ones(len(ch_names), dtype=bool)
+    checkable[np.array([c in ignore_chs
+                        for c in ch_names], dtype=bool)] = False
+    for refl, f, t in zip([reject, flat], [np.greater, np.less], ['', 'flat']):
+        if refl is not None:
+            for key, thresh in iteritems(refl):
+                idx = channel_type_idx[key]
+                name = key.upper()
+                if len(idx) > 0:
+                    e_idx = data[:, idx]
+                    deltas = np.max(e_idx, axis=-1) - np.min(e_idx, axis=-1)
+                    bad = np.logical_and(f(deltas, thresh), checkable[idx])
+                    for ei in np.where(bad.any(axis=1))[0]:
+                        ch_name = [ch_names[idx[i]]
+                                   for i in np.where(bad[ei])[0]]
+                        if not logged[ei]:
+                            logger.info('    Rejecting %s epoch based on %s : '
+                                        '%s' % (t, name, ch_name))
+                            logged[ei] = True
+                        if bad_lists[ei] is None:
+                            bad_lists[ei] = list()
+                        bad_lists[ei].extend(ch_name)
+    return bad_lists
+
+
 def _read_one_epoch_file(f, tree, preload):
     """Read a single FIF file."""
     with f as fid:
@@ -3162,7 +3400,7 @@ def average_movements(epochs, head_pos=None, orig_sfreq=None, picks=None,
         head_pos = head_pos_to_trans_rot_t(head_pos)
     trn, rot, t = head_pos
     del head_pos
-    _check_usable(epochs)
+    _check_usable(epochs.info)
     origin = _check_origin(origin, epochs.info, 'head')
     recon_trans = _check_destination(destination, epochs.info, True)
 
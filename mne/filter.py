@@ -2,6 +2,7 @@
 
 from copy import deepcopy
 from functools import partial
+import hashlib
 
 import numpy as np
 from scipy.fftpack import ifftshift, fftfreq
@@ -9,15 +10,91 @@ from scipy.fftpack import ifftshift, fftfreq
 from .cuda import (_setup_cuda_fft_multiply_repeated, _fft_multiply_repeated,
                    _setup_cuda_fft_resample, _fft_resample, _smart_pad)
 from .externals.six import string_types, integer_types
-from .fixes import get_sosfiltfilt, minimum_phase
+from .fixes import (get_sosfiltfilt, minimum_phase, _get_rfft_irfft,
+                    _has_fft_workers)
 from .parallel import parallel_func, check_n_jobs
 from .time_frequency.multitaper import _mt_spectra, _compute_mt_params
 from .utils import (logger, verbose, sum_squared, check_version, warn,
-                    _check_preload, _validate_type)
+                    _check_preload, _validate_type, _LRUCache)
 
 # These values from Ifeachor and Jervis.
 _length_factors = dict(hann=3.1, hamming=3.3, blackman=5.0)
 
+# Maximum number of samples to process at once in blockwise filtering
+_BLOCK_SIZE = 2 ** 20
+
+# Designed FIR and IIR filters and the FFTs of FIR filters
+_filter_cache = _LRUCache(max_size=64)
+
+
+def get_filter_cache_info():
+    """Get statistics of the filter design cache.
+
+    Designed FIR and IIR filters, as well as the FFTs of FIR filters used
+    for overlap-add filtering, are cached so that filtering many signals
+    with the same parameters does not redesign the filter each time.
+
+    Returns
+    -------
+    info : dict
+        Dictionary with the number of cache ``'hits'`` and ``'misses'``,
+        the current number of entries ``'size'``, and ``'max_size'``.
+
+    See Also
+    --------
+    set_filter_cache_size
+
+    Notes
+    -----
+    .. versionadded:: 0.17
+    """
+    return _filter_cache.info()
+
+
+def set_filter_cache_size(max_size):
+    """Set the maximum number of entries in the filter design cache.
+
+    This also clears the cache and resets its statistics.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of cached entries. Use 0 to disable caching.
+        The default is 64.
+
+    See Also
+    --------
+    get_filter_cache_info
+
+    Notes
+    -----
+    .. versionadded:: 0.17
+    """
+    _validate_type(max_size, 'int', 'max_size')
+    if max_size < 0:
+        raise ValueError('max_size must be >= 0, got %s' % (max_size,))
+    _filter_cache.max_size = int(max_size)
+    _filter_cache.clear()
+
+
+def _array_hash(*arrays):
+    """Hash arrays to use them in cache keys."""
+    hasher = hashlib.sha1()
+    for a in arrays:
+        a = np.ascontiguousarray(a, float)
+        hasher.update(str(a.shape).encode('ascii'))
+        hasher.update(a.tobytes())
+    return hasher.hexdigest()
+
+
+def _get_h_fft(h, n_fft):
+    """Get the (cached) real FFT of the filter h."""
+    def _compute():
+        h_fft = np.fft.rfft(h, n=n_fft)
+        h_fft.flags.writeable = False
+        return h_fft
+    return _filter_cache.get(('fft', _array_hash(h), n_fft), _compute)
+
 
 def is_power2(num):
     """Test if number is a power of 2.
@@ -200,25 +277,112 @@ def _overlap_add_filter(x, h, n_fft=None, phase='zero', picks=None,
 
     # Figure out if we should use CUDA
     n_jobs, cuda_dict = _setup_cuda_fft_multiply_repeated(
-        n_jobs, h, n_fft)
+        n_jobs, h, n_fft, _get_h_fft(h, n_fft))
 
-    # Process each row separately
     picks = np.arange(len(x)) if picks is None else picks
-    if n_jobs == 1:
+    if cuda_dict['use_cuda']:
+        # Process each row separately
         for p in picks:
             x[p] = _1d_overlap_filter(x[p], len(h), n_edge, phase,
                                       cuda_dict, pad, n_fft)
+    elif n_jobs == 1 or _has_fft_workers():
+        # Process blocks of rows at once, using n_jobs threads for the FFTs
+        n_block = max(_BLOCK_SIZE // n_fft, 1)
+        for start in range(0, len(picks), n_block):
+            _2d_overlap_filter(x, picks[start:start + n_block], len(h),
+                               n_edge, phase, cuda_dict['h_fft'], pad, n_fft,
+                               n_jobs)
     else:
-        parallel, p_fun, _ = parallel_func(_1d_overlap_filter, n_jobs)
-        data_new = parallel(p_fun(x[p], len(h), n_edge, phase,
-                                  cuda_dict, pad, n_fft) for p in picks)
-        for pp, p in enumerate(picks):
-            x[p] = data_new[pp]
+        # The FFTs are single-threaded, process the blocks in parallel
+        n_block = max(min(_BLOCK_SIZE // n_fft,
+                          int(np.ceil(len(picks) / float(n_jobs)))), 1)
+        blocks = [picks[start:start + n_block]
+                  for start in range(0, len(picks), n_block)]
+        parallel, p_fun, _ = parallel_func(_2d_overlap_filter_rows, n_jobs)
+        data_new = parallel(p_fun(x[block], len(h), n_edge, phase,
+                                  cuda_dict['h_fft'], pad, n_fft)
+                            for block in blocks)
+        for block, block_new in zip(blocks, data_new):
+            x[block] = block_new
 
     x.shape = orig_shape
     return x
 
 
+def _2d_overlap_filter(x, picks, n_h, n_edge, phase, h_fft, pad, n_fft,
+                       n_jobs):
+    """Do overlap-add FFT FIR filtering of the rows picks of x in place.
+
+    This is equivalent to using _1d_overlap_filter on each row, but the
+    FFTs of each segment are computed for all rows at once and the output
+    is written back as soon as it is complete (i.e., once the data are no
+    longer needed for later segments).
+    """
+    rfft, irfft = _get_rfft_irfft(n_jobs)
+    n_times = x.shape[1]
+    n_x = n_times + 2 * n_edge
+    n_seg = n_fft - n_h + 1
+    n_segments = int(np.ceil(n_x / float(n_seg)))
+    shift = ((n_h - 1) // 2 if phase.startswith('zero') else 0) + n_edge
+
+    # pad to reduce ringing
+    l_pad, r_pad = _get_edge_pads(x, picks, n_edge, pad)
+    seg = np.zeros((len(picks), n_fft))
+    x_filtered = np.zeros((len(picks), n_fft))  # output from -shift + start
+    for seg_idx in range(n_segments):
+        start = seg_idx * n_seg
+        _fill_padded(seg[:, :n_seg], x, picks, l_pad, r_pad, start)
+        x_fft = rfft(seg, n_fft, axis=-1)
+        x_fft *= h_fft
+        x_filtered += irfft(x_fft, n_fft, axis=-1)
+
+        # the first n_seg outputs are now complete, write them back
+        out_start = start - shift
+        n_out = n_seg if seg_idx < n_segments - 1 else n_fft
+        write_start, write_stop = max(out_start, 0), min(out_start + n_out,
+                                                         n_times)
+        if write_stop > write_start:
+            x[picks, write_start:write_stop] = \
+                x_filtered[:, write_start - out_start:write_stop - out_start]
+        x_filtered[:, :n_fft - n_seg] = x_filtered[:, n_seg:]
+        x_filtered[:, n_fft - n_seg:] = 0.
+
+
+def _2d_overlap_filter_rows(x, n_h, n_edge, phase, h_fft, pad, n_fft):
+    """Do overlap-add FFT FIR filtering of all rows of x (in place)."""
+    _2d_overlap_filter(x, np.arange(len(x)), n_h, n_edge, phase, h_fft, pad,
+                       n_fft, 1)
+    return x
+
+
+def _get_edge_pads(x, rows, n_pad, pad):
+    """Get the n_pad samples used to pad each row of x[rows] on each side."""
+    l_pad = np.empty((len(rows), n_pad), x.dtype)
+    r_pad = np.empty((len(rows), n_pad), x.dtype)
+    for ri, row in enumerate(rows):
+        this_pad = _smart_pad(x[row], (n_pad, n_pad), pad)
+        l_pad[ri] = this_pad[:n_pad]
+        r_pad[ri] = this_pad[len(this_pad) - n_pad:]
+    return l_pad, r_pad
+
+
+def _fill_padded(out, x, rows, l_pad, r_pad, start):
+    """Fill out with x[rows] padded by l_pad and r_pad (then zeros).
+
+    ``start`` is the index of the first sample in the padded signal.
+    """
+    stops = np.cumsum([l_pad.shape[1], x.shape[1], r_pad.shape[1]])
+    starts = stops - [l_pad.shape[1], x.shape[1], r_pad.shape[1]]
+    stop = start + out.shape[1]
+    out.fill(0.)
+    for src, src_start, src_stop in zip((l_pad, x, r_pad), starts, stops):
+        use_start, use_stop = max(start, src_start), min(stop, src_stop)
+        if use_stop > use_start:
+            src_sl = slice(use_start - src_start, use_stop - src_start)
+            out[:, use_start - start:use_stop - start] = \
+                x[rows, src_sl] if src is x else src[:, src_sl]
+
+
 def _1d_overlap_filter(x, n_h, n_edge, phase, cuda_dict, pad, n_fft):
     """Do one-dimensional overlap-add FFT FIR filtering."""
     # pad to reduce ringing
@@ -367,6 +531,7 @@ def _construct_fir_filter(sfreq, freq, gain, filter_length, phase, fir_window,
         Filter coefficients.
     """
     assert freq[0] == 0
+    design_key = fir_design
     if fir_design == 'firwin2':
         from scipy.signal import firwin2 as fir_design
     else:
@@ -385,14 +550,22 @@ def _construct_fir_filter(sfreq, freq, gain, filter_length, phase, fir_window,
 
     # Use overlap-add filter with a fixed length
     N = _check_zero_phase_length(filter_length, phase, gain[-1])
-    # construct symmetric (linear phase) filter
-    if phase == 'minimum':
-        h = fir_design(N * 2 - 1, freq, gain, window=fir_window)
-        h = minimum_phase(h)
-    else:
-        h = fir_design(N, freq, gain, window=fir_window)
-    assert h.size == N
-    att_db, att_freq = _filter_attenuation(h, freq, gain)
+
+    def _design():
+        # construct symmetric (linear phase) filter
+        if phase == 'minimum':
+            h = fir_design(N * 2 - 1, freq, gain, window=fir_window)
+            h = minimum_phase(h)
+        else:
+            h = fir_design(N, freq, gain, window=fir_window)
+        assert h.size == N
+        h.flags.writeable = False
+        return (h,) + _filter_attenuation(h, freq, gain)
+
+    key = ('fir', float(sfreq), tuple(freq.tolist()), tuple(gain.tolist()),
+           N, phase, fir_window, design_key)
+    h, att_db, att_freq = _filter_cache.get(key, _design)
+    h = h.copy()
     if phase == 'zero-double':
         att_db += 6
     if att_db < min_att_db:
@@ -654,19 +827,26 @@ def construct_iir_filter(iir_params, f_pass=None, f_stop=None, sfreq=None,
                                'scipy.signal (e.g., butter, cheby1, etc.) not '
                                '%s' % ftype)
 
-        # use order-based design
-        Wp = np.asanyarray(f_pass) / (float(sfreq) / 2)
-        if 'order' in iir_params:
-            system = iirfilter(iir_params['order'], Wp, btype=btype,
-                               ftype=ftype, output=output)
-        else:
+        def _design():
+            # use order-based design
+            Wp = np.asanyarray(f_pass) / (float(sfreq) / 2)
+            if 'order' in iir_params:
+                return iirfilter(iir_params['order'], Wp, btype=btype,
+                                 ftype=ftype, output=output)
             # use gpass / gstop design
             Ws = np.asanyarray(f_stop) / (float(sfreq) / 2)
             if 'gpass' not in iir_params or 'gstop' not in iir_params:
                 raise ValueError('iir_params must have at least ''gstop'' and'
                                  ' ''gpass'' (or ''N'') entries')
-            system = iirdesign(Wp, Ws, iir_params['gpass'],
-                               iir_params['gstop'], ftype=ftype, output=output)
+            return iirdesign(Wp, Ws, iir_params['gpass'],
+                             iir_params['gstop'], ftype=ftype, output=output)
+
+        key = ('iir', output, ftype, btype, sfreq,
+               tuple(np.atleast_1d(f_pass).tolist()),
+               tuple(np.atleast_1d(f_stop).tolist()),
+               iir_params.get('order'), iir_params.get('gpass'),
+               iir_params.get('gstop'))
+        system = deepcopy(_filter_cache.get(key, _design))
 
     if system is None:
         raise RuntimeError('coefficients could not be created from iir_params')
@@ -675,7 +855,10 @@ def construct_iir_filter(iir_params, f_pass=None, f_stop=None, sfreq=None,
 
     # now deal with padding
     if 'padlen' not in iir_params:
-        padlen = estimate_ringing_samples(system)
+        systems = system if output == 'ba' else (system,)
+        key = ('padlen', _array_hash(*systems))
+        padlen = _filter_cache.get(
+            key, partial(estimate_ringing_samples, system))
     else:
         padlen = iir_params['padlen']
 
@@ -1306,25 +1489,11 @@ def notch_filter(x, Fs, freqs, filter_length='auto', notch_widths=None,
 
     # Only have to deal with notch_widths for non-autodetect
     if freqs is not None:
-        if notch_widths is None:
-            notch_widths = freqs / 200.0
-        elif np.any(notch_widths < 0):
-            raise ValueError('notch_widths must be >= 0')
-        else:
-            notch_widths = np.atleast_1d(notch_widths)
-            if len(notch_widths) == 1:
-                notch_widths = notch_widths[0] * np.ones_like(freqs)
-            elif len(notch_widths) != len(freqs):
-                raise ValueError('notch_widths must be None, scalar, or the '
-                                 'same length as freqs')
+        notch_widths = _check_notch_widths(freqs, notch_widths)
 
     if method in ('fir', 'iir'):
         # Speed this up by computing the fourier coefficients once
-        tb_2 = trans_bandwidth / 2.0
-        lows = [freq - nw / 2.0 - tb_2
-                for freq, nw in zip(freqs, notch_widths)]
-        highs = [freq + nw / 2.0 + tb_2
-                 for freq, nw in zip(freqs, notch_widths)]
+        lows, highs, tb_2 = _notch_bands(freqs, notch_widths, trans_bandwidth)
         xf = filter_data(x, Fs, highs, lows, picks, filter_length, tb_2, tb_2,
                          n_jobs, method, iir_params, copy, phase, fir_window,
                          fir_design, pad=pad)
@@ -1335,6 +1504,32 @@ def notch_filter(x, Fs, freqs, filter_length='auto', notch_widths=None,
     return xf
 
 
+def _check_notch_widths(freqs, notch_widths):
+    """Check the notch widths, one for each frequency in freqs."""
+    if notch_widths is None:
+        notch_widths = freqs / 200.0
+    elif np.any(notch_widths < 0):
+        raise ValueError('notch_widths must be >= 0')
+    else:
+        notch_widths = np.atleast_1d(notch_widths)
+        if len(notch_widths) == 1:
+            notch_widths = notch_widths[0] * np.ones_like(freqs)
+        elif len(notch_widths) != len(freqs):
+            raise ValueError('notch_widths must be None, scalar, or the '
+                             'same length as freqs')
+    return notch_widths
+
+
+def _notch_bands(freqs, notch_widths, trans_bandwidth):
+    """Get the band-stop edges (and half transition) to notch freqs."""
+    tb_2 = trans_bandwidth / 2.0
+    lows = [freq - nw / 2.0 - tb_2
+            for freq, nw in zip(freqs, notch_widths)]
+    highs = [freq + nw / 2.0 + tb_2
+             for freq, nw in zip(freqs, notch_widths)]
+    return lows, highs, tb_2
+
+
 def _mt_spectrum_proc(x, sfreq, line_freqs, notch_widths, mt_bandwidth,
                       p_value, picks, n_jobs, copy):
     """Call _mt_spectrum_remove."""
@@ -1468,7 +1663,7 @@ def _mt_spectrum_remove(x, sfreq, line_freqs, notch_widths,
 
 @verbose
 def resample(x, up=1., down=1., npad=100, axis=-1, window='boxcar', n_jobs=1,
-             pad='reflect_limited', verbose=None):
+             pad='reflect_limited', method='fft', verbose=None):
     """Resample an array.
 
     Operates along the last dimension of the array.
@@ -1484,13 +1679,15 @@ def resample(x, up=1., down=1., npad=100, axis=-1, window='boxcar', n_jobs=1,
     npad : int | str
         Number of samples to use at the beginning and end for padding.
         Can be "auto" to pad to the next highest power of 2.
+        Only used for ``method='fft'``.
     axis : int
         Axis along which to resample (default is the last axis).
     window : string or tuple
         See :func:`scipy.signal.resample` for description.
+        Only used for ``method='fft'``.
     n_jobs : int | str
         Number of jobs to run in parallel. Can be 'cuda' if ``cupy``
-        is installed properly.
+        is installed properly and ``method='fft'``.
     pad : str
         The type of padding to use. Supports all :func:`numpy.pad` ``mode``
         options. Can also be "reflect_limited" (default), which pads with a
@@ -1498,6 +1695,12 @@ def resample(x, up=1., down=1., npad=100, axis=-1, window='boxcar', n_jobs=1,
         values of the vector, followed by zeros.
 
         .. versionadded:: 0.15
+    method : str
+        Can be "fft" (default) to resample in the frequency domain, or
+        "polyphase" to use a polyphase FIR filter (see Notes), which
+        requires ``up / down`` to be a ratio of integers of at most 1000.
+
+        .. versionadded:: 0.17
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more).
@@ -1515,10 +1718,21 @@ def resample(x, up=1., down=1., npad=100, axis=-1, window='boxcar', n_jobs=1,
     important consequences, and the default choices should work well
     for most natural signals.
 
-    Resampling arguments are broken into "up" and "down" components for future
-    compatibility in case we decide to use an upfirdn implementation. The
-    current implementation is functionally equivalent to passing
+    Resampling arguments are broken into "up" and "down" components. For
+    ``method='fft'`` this is functionally equivalent to passing
     up=up/down and down=1.
+
+    With ``method='polyphase'``, ``up / down`` is reduced to a ratio of
+    integers ``p / q`` and the signal is upsampled by ``p``, low-pass
+    filtered and downsampled by ``q`` using :func:`scipy.signal.upfirdn`
+    (requires SciPy >= 0.18). The anti-aliasing filter is a zero-phase FIR
+    filter with its cutoff at the Nyquist frequency of the lower of the
+    two sample rates, designed with :func:`scipy.signal.firwin` using a
+    Kaiser window (beta=5.0, about 50 dB of stop-band attenuation) and
+    ``20 * max(p, q) + 1`` taps at the upsampled rate. The signal is padded
+    using ``pad`` by the filter half-length. The data are processed in
+    blocks of time, so the memory needed is much lower than for the
+    FFT-based method and does not depend on the signal length.
     """
     from scipy.signal import get_window
     # check explicitly for backwards compatibility
@@ -1542,6 +1756,15 @@ def resample(x, up=1., down=1., npad=100, axis=-1, window='boxcar', n_jobs=1,
     if x_len == 0:
         warn('x has zero length along last axis, returning a copy of x')
         return x.copy()
+    if method == 'polyphase':
+        y = _polyphase_resample(x.reshape((-1, x_len)), up, down, pad)
+        y.shape = orig_shape[:-1] + (y.shape[1],)
+        if axis != orig_last_axis:
+            y = y.swapaxes(axis, orig_last_axis)
+        return y
+    elif method != 'fft':
+        raise ValueError('method must be "fft" or "polyphase", got %s'
+                         % (method,))
     bad_msg = 'npad must be "auto" or an integer'
     if isinstance(npad, string_types):
         if npad != 'auto':
@@ -1605,6 +1828,51 @@ def resample(x, up=1., down=1., npad=100, axis=-1, window='boxcar', n_jobs=1,
     return y
 
 
+def _polyphase_resample(x, up, down, pad):
+    """Resample the rows of x by up / down with a polyphase FIR filter."""
+    from fractions import Fraction
+    from scipy.signal import firwin
+    if not check_version('scipy', '0.18'):
+        raise RuntimeError('method="polyphase" requires SciPy >= 0.18')
+    from scipy.signal import upfirdn
+    ratio = float(up) / down
+    frac = Fraction(ratio).limit_denominator(1000)
+    up, down = frac.numerator, frac.denominator
+    if up > 1000 or not np.isclose(float(frac), ratio, rtol=1e-10, atol=0):
+        raise ValueError('The resampling ratio %s cannot be expressed as a '
+                         'ratio of integers of at most 1000, use method="fft"'
+                         % (ratio,))
+    x_len = x.shape[1]
+    n_out = int(round(ratio * x_len))
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1. / max_rate, window=('kaiser', 5.0)) * up
+    logger.info('Polyphase resampling by %d / %d using a filter of %d taps'
+                % (up, down, len(h)))
+    n_pad = half_len // up + 1
+    l_pad, r_pad = _get_edge_pads(x, np.arange(len(x)), n_pad, pad)
+    rows = slice(None)
+
+    # output sample m uses inputs j with |m * down - j * up| <= half_len
+    y = np.empty((len(x), n_out), np.result_type(x.dtype, np.float64))
+    n_block = max(_BLOCK_SIZE // max(len(x), 1) * up // down, 1)
+    h_shifts = dict()
+    for m_start in range(0, n_out, n_block):
+        m_stop = min(m_start + n_block, n_out)
+        j_start = -(-(m_start * down - half_len) // up)  # ceil division
+        j_stop = ((m_stop - 1) * down + half_len) // up + 1
+        x_use = np.empty((len(x), j_stop - j_start), y.dtype)
+        _fill_padded(x_use, x, rows, l_pad, r_pad, j_start + n_pad)
+        # delay the filter so that the output samples align with m_start
+        shift = (j_start * up - half_len) % down
+        if shift not in h_shifts:
+            h_shifts[shift] = np.concatenate([np.zeros(shift), h])
+        y_use = upfirdn(h_shifts[shift], x_use, up, down, axis=-1)
+        offset = (m_start * down + half_len + shift - j_start * up) // down
+        y[:, m_start:m_stop] = y_use[:, offset:offset + m_stop - m_start]
+    return y
+
+
 def _resample_stim_channels(stim_data, up, down):
     """Resample stim channels, carefully.
 
@@ -2048,7 +2316,7 @@ class FilterMixin(object):
 
     @verbose
     def resample(self, sfreq, npad='auto', window='boxcar', n_jobs=1,
-                 pad='edge', verbose=None):
+                 pad='edge', method='fft', verbose=None):
         """Resample data.
 
         .. note:: Data must be loaded.
@@ -2073,6 +2341,14 @@ class FilterMixin(object):
             which pads with the edge values of each vector.
 
             .. versionadded:: 0.15
+        method : str
+            Can be "fft" (default) to resample in the frequency domain, or
+            "polyphase" to use a polyphase FIR filter, which is faster and
+            needs less memory but only supports ratios of sample rates that
+            are ratios of integers of at most 1000. See
+            :func:`mne.filter.resample` for details.
+
+            .. versionadded:: 0.17
         verbose : bool, str, int, or None
             If not None, override default verbose level (see
             :func:`mne.verbose` :ref:`Logging documentation <tut_logging>` for
@@ -2097,7 +2373,7 @@ class FilterMixin(object):
         sfreq = float(sfreq)
         o_sfreq = self.info['sfreq']
         self._data = resample(self._data, sfreq, o_sfreq, npad, window=window,
-                              n_jobs=n_jobs, pad=pad)
+                              n_jobs=n_jobs, pad=pad, method=method)
         self.info['sfreq'] = float(sfreq)
         self.times = (np.arange(self._data.shape[-1], dtype=np.float) /
                       sfreq + self.times[0])
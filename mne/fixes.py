@@ -14,6 +14,7 @@ at which the fix is no longer needed.
 
 from __future__ import division
 
+from functools import partial
 import inspect
 from distutils.version import LooseVersion
 import warnings
@@ -372,6 +373,26 @@ def get_sosfiltfilt():
     return sosfiltfilt
 
 
+def _has_fft_workers():
+    """Check if the FFTs can use multiple threads (scipy >= 1.4)."""
+    try:
+        from scipy.fft import rfft  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _get_rfft_irfft(workers=1):
+    """Get rfft and irfft, using multiple threads if supported."""
+    if _has_fft_workers():
+        from scipy.fft import rfft, irfft
+        rfft = partial(rfft, workers=workers)
+        irfft = partial(irfft, workers=workers)
+    else:
+        from numpy.fft import rfft, irfft
+    return rfft, irfft
+
+
 def minimum_phase(h):
     """Convert a linear-phase FIR filter to minimum phase.
 
@@ -17,7 +17,7 @@ from ._make_forward import (make_forward_solution, _prepare_for_forward,
                             _read_coil_defs, _transform_orig_meg_coils,
                             make_forward_dipole, use_coil_def)
 from ._compute_forward import (_magnetic_dipole_field_vec, _compute_forwards,
-                               _concatenate_coils)
+                               _concatenate_coils, _magnetic_dipole_field_grad)
 from ._field_interpolation import (_make_surface_mapping, make_field_map,
                                    _as_meg_type_evoked, _map_meg_channels)
 from . import _lead_dots  # for testing purposes
@@ -660,6 +660,39 @@ def _magnetic_dipole_field_vec(rrs, coils, too_close='raise'):
     return fwd
 
 
+def _magnetic_dipole_field_grad(rr, coils, too_close='raise'):
+    """Compute the MEG forward of a magnetic dipole and its spatial gradient.
+
+    Returns
+    -------
+    fwd : ndarray, shape (3, n_coils)
+        The forward for each dipole orientation.
+    grad : ndarray, shape (3, 3, n_coils)
+        The derivative of ``fwd`` with respect to each coordinate of ``rr``.
+    """
+    fwd = _magnetic_dipole_field_vec(rr[np.newaxis], coils, too_close)
+    rmags, cosmags, ws, bins = coils
+    diff = rmags - rr
+    dist2 = np.sum(diff * diff, axis=1)[:, np.newaxis]
+    dist5 = dist2 * dist2 * np.sqrt(dist2)
+    dot = np.sum(diff * cosmags, axis=1)[:, np.newaxis]
+    field = 3 * diff * dot - dist2 * cosmags
+    # derivative with respect to diff (which is -rr), shape (n_points, 3, 3)
+    d_field = 3 * cosmags[:, :, np.newaxis] * diff[:, np.newaxis]
+    d_field -= 2 * diff[:, :, np.newaxis] * cosmags[:, np.newaxis]
+    d_field += 3 * dot[:, :, np.newaxis] * np.eye(3)
+    d_field /= dist5[:, :, np.newaxis]
+    d_field -= (5 * diff[:, :, np.newaxis] *
+                (field / (dist5 * dist2))[:, np.newaxis])
+    d_field *= -ws[:, np.newaxis, np.newaxis]
+    # sum over the integration points of each coil (which are contiguous)
+    starts = np.concatenate([[0], np.where(np.diff(bins))[0] + 1])
+    grad = np.add.reduceat(d_field.reshape(len(bins), 9), starts)
+    grad = grad.T.reshape(3, 3, len(starts))
+    grad *= 1e-7
+    return fwd, grad
+
+
 # #############################################################################
 # MAIN TRIAGING FUNCTION
 
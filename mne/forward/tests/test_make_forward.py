@@ -17,7 +17,9 @@ from mne import (read_forward_solution, write_forward_solution,
 from mne.utils import (requires_mne, requires_nibabel, _TempDir,
                        run_tests_if_main, run_subprocess)
 from mne.forward._make_forward import _create_meg_coils, make_forward_dipole
-from mne.forward._compute_forward import _magnetic_dipole_field_vec
+from mne.forward._compute_forward import (_magnetic_dipole_field_vec,
+                                          _magnetic_dipole_field_grad,
+                                          _concatenate_coils)
 from mne.forward import Forward, _do_forward_solution
 from mne.dipole import Dipole, fit_dipole
 from mne.simulation import simulate_evoked
@@ -104,6 +106,20 @@ def test_magnetic_dipole():
         near_fwd = _magnetic_dipole_field_vec(rr[np.newaxis, :], [coil])
         ratio = 8. if ch['ch_name'][-1] == '1' else 16.  # grad vs mag
         assert_allclose(np.median(near_fwd / far_fwd), ratio, atol=1e-1)
+    # spatial gradient
+    rr = np.array([0.01, 0.02, 0.03])
+    coils_cat = _concatenate_coils(coils)
+    fwd, grad = _magnetic_dipole_field_grad(rr, coils_cat)
+    assert_allclose(fwd, _magnetic_dipole_field_vec(rr[np.newaxis], coils))
+    assert grad.shape == (3, 3, len(coils))
+    eps = 1e-7
+    for k in range(3):
+        rr_eps = rr.copy()
+        rr_eps[k] += eps
+        grad_num = (_magnetic_dipole_field_grad(rr_eps, coils_cat)[0] -
+                    fwd) / eps
+        assert_allclose(grad[k], grad_num, rtol=1e-4,
+                        atol=1e-4 * np.abs(grad).max())
     # degenerate case
     r0 = coils[0]['rmag'][[0]]
     with pytest.raises(RuntimeError, match='Coil too close'):
@@ -32,7 +32,8 @@ from ..annotations import (_annotations_starts_stops, _write_annotations,
                            _handle_meas_date)
 from ..filter import (filter_data, notch_filter, resample, next_fast_len,
                       _resample_stim_channels, _filt_check_picks,
-                      _filt_update_info)
+                      _filt_update_info, create_filter, _check_method,
+                      _overlap_add_filter, _check_notch_widths, _notch_bands)
 from ..parallel import parallel_func
 from ..utils import (_check_fname, _check_pandas_installed, sizeof_fmt,
                      _check_pandas_index_arguments,
@@ -354,6 +355,7 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         self.verbose = verbose
         self._cals = cals
         self._raw_extras = list(raw_extras)
+        self._buffer_index = [None] * len(self._raw_extras)
         # deal with compensation (only relevant for CTF data, either CTF
         # reader or MNE-C converted CTF->FIF files)
         self._read_comp_grade = self.compensation_grade  # read property
@@ -527,6 +529,34 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             offset += n_read
         return data
 
+    def _get_buffer_index(self, fi):
+        """Get the first and last samples of the buffers in a file.
+
+        Only meaningful for readers whose ``_raw_extras[fi]`` is a list of
+        buffer descriptions with ``'first'`` and ``'last'`` keys (e.g., FIF).
+        The index is computed once per file so that readers can find the
+        buffers they need with a binary search (see :func:`np.searchsorted`)
+        instead of scanning all buffers on every read.
+
+        Parameters
+        ----------
+        fi : int
+            The file index.
+
+        Returns
+        -------
+        firsts : ndarray, shape (n_buffers,)
+            The first sample of each buffer.
+        lasts : ndarray, shape (n_buffers,)
+            The last sample (inclusive) of each buffer.
+        """
+        if self._buffer_index[fi] is None:
+            extras = self._raw_extras[fi]
+            self._buffer_index[fi] = (
+                np.array([this['first'] for this in extras], np.int64),
+                np.array([this['last'] for this in extras], np.int64))
+        return self._buffer_index[fi]
+
     def _read_segment_file(self, data, idx, fi, start, stop, cals, mult):
         """Read a segment of data from a file.
 
@@ -1167,7 +1197,9 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
                method='fir', iir_params=None, phase='zero',
                fir_window='hamming', fir_design='firwin',
                skip_by_annotation=('edge', 'bad_acq_skip'),
-               pad='reflect_limited', verbose=None):
+               pad='reflect_limited', out_fname=None, fmt='single',
+               overwrite=False, split_size='2GB', split_naming='neuromag',
+               verbose=None):
         """Filter a subset of channels.
 
         Applies a zero-phase low-pass, high-pass, band-pass, or band-stop
@@ -1175,7 +1207,7 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         of the Raw object is modified inplace.
 
         The Raw object has to have the data loaded e.g. with ``preload=True``
-        or ``self.load_data()``.
+        or ``self.load_data()``, unless ``out_fname`` is given.
 
         ``l_freq`` and ``h_freq`` are the frequencies below which and above
         which, respectively, to filter out of the data. Thus the uses are:
@@ -1283,6 +1315,35 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             Only used for ``method='fir'``.
 
             .. versionadded:: 0.15
+        out_fname : str | None
+            If not None, the data are not filtered in memory. Instead they are
+            read in overlapping blocks, filtered, and written to this new raw
+            FIF file, so that the data do not need to be preloaded and memory
+            use does not depend on the duration of the recording. Only
+            ``method='fir'`` is supported. The Raw instance itself is not
+            modified.
+
+            .. versionadded:: 0.17
+        fmt : str
+            Format used to write ``out_fname``, see :meth:`mne.io.Raw.save`.
+            Only used with ``out_fname``.
+
+            .. versionadded:: 0.17
+        overwrite : bool
+            If True, ``out_fname`` is overwritten if it exists. Only used
+            with ``out_fname``.
+
+            .. versionadded:: 0.17
+        split_size : str | int
+            Maximum size of each file written, see :meth:`mne.io.Raw.save`.
+            Only used with ``out_fname``.
+
+            .. versionadded:: 0.17
+        split_naming : {'neuromag' | 'bids'}
+            Naming of the split files, see :meth:`mne.io.Raw.save`. Only used
+            with ``out_fname``.
+
+            .. versionadded:: 0.17
         verbose : bool, str, int, or None
             If not None, override default verbose level (see
             :func:`mne.verbose` and :ref:`Logging documentation <tut_logging>`
@@ -1291,7 +1352,8 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         Returns
         -------
         raw : instance of Raw
-            The raw instance with filtered data.
+            The raw instance with filtered data. If ``out_fname`` is given,
+            the filtered data read (not preloaded) from ``out_fname``.
 
         See Also
         --------
@@ -1308,9 +1370,23 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         and
         :ref:`sphx_glr_auto_tutorials_plot_artifacts_correction_filtering.py`.
         """
-        _check_preload(self, 'raw.filter')
         update_info, picks = _filt_check_picks(self.info, picks,
                                                l_freq, h_freq)
+        if out_fname is not None:
+            iir_params, method = _check_method(method, iir_params)
+            if method != 'fir':
+                raise ValueError('Only method="fir" can be used with '
+                                 'out_fname, got %s' % (method,))
+            h = create_filter(
+                None, self.info['sfreq'], l_freq, h_freq, filter_length,
+                l_trans_bandwidth, h_trans_bandwidth, method, iir_params,
+                phase, fir_window, fir_design)
+            info = deepcopy(self.info)
+            _filt_update_info(info, update_info, l_freq, h_freq)
+            return _write_raw_filtered(out_fname, self, info, h, picks, phase,
+                                       pad, n_jobs, skip_by_annotation, fmt,
+                                       overwrite, split_size, split_naming)
+        _check_preload(self, 'raw.filter')
         # Deal with annotations
         onsets, ends = _annotations_starts_stops(
             self, skip_by_annotation, 'skip_by_annotation', invert=True)
@@ -1330,14 +1406,17 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
                      notch_widths=None, trans_bandwidth=1.0, n_jobs=1,
                      method='fir', iir_params=None, mt_bandwidth=None,
                      p_value=0.05, phase='zero', fir_window='hamming',
-                     fir_design='firwin', pad='reflect_limited', verbose=None):
+                     fir_design='firwin', pad='reflect_limited',
+                     skip_by_annotation=(), out_fname=None, fmt='single',
+                     overwrite=False, split_size='2GB',
+                     split_naming='neuromag', verbose=None):
         """Notch filter a subset of channels.
 
         Applies a zero-phase notch filter to the channels selected by
         "picks". By default the data of the Raw object is modified inplace.
 
         The Raw object has to have the data loaded e.g. with ``preload=True``
-        or ``self.load_data()``.
+        or ``self.load_data()``, unless ``out_fname`` is given.
 
         .. note:: If n_jobs > 1, more memory is required as
                   ``len(picks) * n_times`` additional time points need to
@@ -1421,6 +1500,47 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             Only used for ``method='fir'``.
 
             .. versionadded:: 0.15
+        skip_by_annotation : str | list of str
+            If a string (or list of str), any annotation segment that begins
+            with the given string will not be included in filtering, and
+            segments on either side of the given excluded annotated segment
+            will be filtered separately (i.e., as independent signals).
+            For example, ``('edge', 'bad_acq_skip')`` (the default of
+            :meth:`mne.io.Raw.filter`) will separately filter any segments
+            that were concatenated by :func:`mne.concatenate_raws` or
+            :meth:`mne.io.Raw.append`, or separated during acquisition.
+            The default (an empty tuple) filters the data as one signal.
+
+            .. versionadded:: 0.17
+        out_fname : str | None
+            If not None, the data are not filtered in memory. Instead they are
+            read in overlapping blocks, filtered, and written to this new raw
+            FIF file, so that the data do not need to be preloaded and memory
+            use does not depend on the duration of the recording. Only
+            ``method='fir'`` is supported. The Raw instance itself is not
+            modified.
+
+            .. versionadded:: 0.17
+        fmt : str
+            Format used to write ``out_fname``, see :meth:`mne.io.Raw.save`.
+            Only used with ``out_fname``.
+
+            .. versionadded:: 0.17
+        overwrite : bool
+            If True, ``out_fname`` is overwritten if it exists. Only used
+            with ``out_fname``.
+
+            .. versionadded:: 0.17
+        split_size : str | int
+            Maximum size of each file written, see :meth:`mne.io.Raw.save`.
+            Only used with ``out_fname``.
+
+            .. versionadded:: 0.17
+        split_naming : {'neuromag' | 'bids'}
+            Naming of the split files, see :meth:`mne.io.Raw.save`. Only used
+            with ``out_fname``.
+
+            .. versionadded:: 0.17
         verbose : bool, str, int, or None
             If not None, override default verbose level (see
             :func:`mne.verbose` and :ref:`Logging documentation <tut_logging>`
@@ -1429,7 +1549,8 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         Returns
         -------
         raw : instance of Raw
-            The raw instance with filtered data.
+            The raw instance with filtered data. If ``out_fname`` is given,
+            the filtered data read (not preloaded) from ``out_fname``.
 
         See Also
         --------
@@ -1447,19 +1568,44 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
                 raise RuntimeError('Could not find any valid channels for '
                                    'your Raw object. Please contact the '
                                    'MNE-Python developers.')
+        if out_fname is not None:
+            iir_params, method = _check_method(method, iir_params,
+                                               ['spectrum_fit'])
+            if method != 'fir':
+                raise ValueError('Only method="fir" can be used with '
+                                 'out_fname, got %s' % (method,))
+            if freqs is None:
+                raise ValueError('freqs=None can only be used with method '
+                                 'spectrum_fit')
+            freqs = np.atleast_1d(freqs)
+            notch_widths = _check_notch_widths(freqs, notch_widths)
+            lows, highs, tb_2 = _notch_bands(freqs, notch_widths,
+                                             trans_bandwidth)
+            h = create_filter(None, fs, highs, lows, filter_length, tb_2,
+                              tb_2, method, iir_params, phase, fir_window,
+                              fir_design)
+            return _write_raw_filtered(out_fname, self, self.info, h, picks,
+                                       phase, pad, n_jobs, skip_by_annotation,
+                                       fmt, overwrite, split_size,
+                                       split_naming)
         _check_preload(self, 'raw.notch_filter')
-        self._data = notch_filter(
-            self._data, fs, freqs, filter_length=filter_length,
-            notch_widths=notch_widths, trans_bandwidth=trans_bandwidth,
-            method=method, iir_params=iir_params, mt_bandwidth=mt_bandwidth,
-            p_value=p_value, picks=picks, n_jobs=n_jobs, copy=False,
-            phase=phase, fir_window=fir_window, fir_design=fir_design,
-            pad=pad)
+        onsets, ends = _annotations_starts_stops(
+            self, skip_by_annotation, 'skip_by_annotation', invert=True)
+        for start, stop in zip(onsets, ends):
+            self._data[:, start:stop] = notch_filter(
+                self._data[:, start:stop], fs, freqs,
+                filter_length=filter_length, notch_widths=notch_widths,
+                trans_bandwidth=trans_bandwidth, method=method,
+                iir_params=iir_params, mt_bandwidth=mt_bandwidth,
+                p_value=p_value, picks=picks, n_jobs=n_jobs, copy=False,
+                phase=phase, fir_window=fir_window, fir_design=fir_design,
+                pad=pad)
         return self
 
     @verbose
     def resample(self, sfreq, npad='auto', window='boxcar', stim_picks=None,
-                 n_jobs=1, events=None, pad='reflect_limited', verbose=None):
+                 n_jobs=1, events=None, pad='reflect_limited', method='fft',
+                 verbose=None):
         """Resample all channels.
 
         The Raw object has to have the data loaded e.g. with ``preload=True``
@@ -1512,6 +1658,14 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             values of the vector, followed by zeros.
 
             .. versionadded:: 0.15
+        method : str
+            Can be "fft" (default) to resample in the frequency domain, or
+            "polyphase" to use a polyphase FIR filter, which is faster and
+            needs less memory but only supports ratios of sample rates that
+            are ratios of integers of at most 1000. See
+            :func:`mne.filter.resample` for details.
+
+            .. versionadded:: 0.17
         verbose : bool, str, int, or None
             If not None, override default verbose level (see
             :func:`mne.verbose` and :ref:`Logging documentation <tut_logging>`
@@ -1564,7 +1718,8 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         for ri in range(len(self._raw_lengths)):
             data_chunk = self._data[:, offsets[ri]:offsets[ri + 1]]
             new_data.append(resample(data_chunk, sfreq, o_sfreq, npad,
-                                     window=window, n_jobs=n_jobs, pad=pad))
+                                     window=window, n_jobs=n_jobs, pad=pad,
+                                     method=method))
             new_ntimes = new_data[ri].shape[1]
 
             # In empirical testing, it was faster to resample all channels
@@ -1661,6 +1816,8 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         self._last_samps[-1] -= cumul_lens[keepers[-1] + 1] - 1 - smax
         self._raw_extras = [r for ri, r in enumerate(self._raw_extras)
                             if ri in keepers]
+        self._buffer_index = [r for ri, r in enumerate(self._buffer_index)
+                              if ri in keepers]
         self._filenames = [r for ri, r in enumerate(self._filenames)
                            if ri in keepers]
         if self.preload:
@@ -1756,8 +1913,6 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
                                    'raw.fif.gz', 'raw_sss.fif.gz',
                                    'raw_tsss.fif.gz'))
 
-        split_size = _get_split_size(split_size)
-
         fname = op.realpath(fname)
         if not self.preload and fname in self._filenames:
             raise ValueError('You cannot save data to the same file.'
@@ -1768,21 +1923,8 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
                 warn('Saving raw file with complex data. Loading with '
                      'command-line MNE tools will not work.')
 
-        type_dict = dict(short=FIFF.FIFFT_DAU_PACK16,
-                         int=FIFF.FIFFT_INT,
-                         single=FIFF.FIFFT_FLOAT,
-                         double=FIFF.FIFFT_DOUBLE)
-        if fmt not in type_dict:
-            raise ValueError('fmt must be "short", "int", "single", '
-                             'or "double"')
-        reset_dict = dict(short=False, int=False, single=True, double=True)
-        reset_range = reset_dict[fmt]
-        data_type = type_dict[fmt]
-
-        data_test = self[0, 0][0]
-        if fmt == 'short' and np.iscomplexobj(data_test):
-            raise ValueError('Complex data must be saved as "single" or '
-                             '"double", not "short"')
+        data_type, reset_range, split_size, part_idx = _check_raw_save_params(
+            self, fmt, split_size, split_naming)
 
         # check for file existence
         _check_fname(fname, overwrite)
@@ -1811,14 +1953,6 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
         buffer_size = self._get_buffer_size(buffer_size_sec)
 
         # write the raw file
-        if split_naming == 'neuromag':
-            part_idx = 0
-        elif split_naming == 'bids':
-            part_idx = 1
-        else:
-            raise ValueError(
-                "split_naming must be either 'neuromag' or 'bids' instead "
-                "of '{}'.".format(split_naming))
         _write_raw(fname, self, info, picks, fmt, data_type, reset_range,
                    start, stop, buffer_size, projector, drop_small_buffer,
                    split_size, split_naming, part_idx, None, overwrite)
@@ -2102,6 +2236,7 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             self._first_samps = np.r_[self._first_samps, r._first_samps]
             self._last_samps = np.r_[self._last_samps, r._last_samps]
             self._raw_extras += r._raw_extras
+            self._buffer_index += r._buffer_index
             self._filenames += r._filenames
         self._update_times()
         self.set_annotations(annotations)
@@ -2110,7 +2245,8 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin,
             self.annotations.append(onset, 0., 'BAD boundary')
             self.annotations.append(onset, 0., 'EDGE boundary')
         if not (len(self._first_samps) == len(self._last_samps) ==
-                len(self._raw_extras) == len(self._filenames)):
+                len(self._raw_extras) == len(self._buffer_index) ==
+                len(self._filenames)):
             raise RuntimeError('Append error')  # should never happen
 
     def close(self):
@@ -2246,10 +2382,45 @@ class _RawShell():
 
 ###############################################################################
 # Writing
+def _check_raw_save_params(raw, fmt, split_size, split_naming):
+    """Check the format and split parameters of Raw.save."""
+    type_dict = dict(short=FIFF.FIFFT_DAU_PACK16,
+                     int=FIFF.FIFFT_INT,
+                     single=FIFF.FIFFT_FLOAT,
+                     double=FIFF.FIFFT_DOUBLE)
+    if fmt not in type_dict:
+        raise ValueError('fmt must be "short", "int", "single", '
+                         'or "double"')
+    reset_dict = dict(short=False, int=False, single=True, double=True)
+    reset_range = reset_dict[fmt]
+    data_type = type_dict[fmt]
+
+    data_test = raw[0, 0][0]
+    if fmt == 'short' and np.iscomplexobj(data_test):
+        raise ValueError('Complex data must be saved as "single" or '
+                         '"double", not "short"')
+
+    split_size = _get_split_size(split_size)
+    if split_naming == 'neuromag':
+        part_idx = 0
+    elif split_naming == 'bids':
+        part_idx = 1
+    else:
+        raise ValueError(
+            "split_naming must be either 'neuromag' or 'bids' instead "
+            "of '{}'.".format(split_naming))
+    return data_type, reset_range, split_size, part_idx
+
+
 def _write_raw(fname, raw, info, picks, fmt, data_type, reset_range, start,
                stop, buffer_size, projector, drop_small_buffer,
-               split_size, split_naming, part_idx, prev_fname, overwrite):
-    """Write raw file with splitting."""
+               split_size, split_naming, part_idx, prev_fname, overwrite,
+               reader=None):
+    """Write raw file with splitting.
+
+    If not None, ``reader(first, last)`` is used to get the data of all
+    channels instead of indexing ``raw``.
+    """
     # we've done something wrong if we hit this
     n_times_max = len(raw.times)
     if start >= stop or stop > n_times_max:
@@ -2332,7 +2503,11 @@ def _write_raw(fname, raw, info, picks, fmt, data_type, reset_range, start,
                 # write_nop(fid)
                 # write_nop(fid)
                 n_current_skip = 0
-        data, times = raw[use_picks, first:last]
+        if reader is None:
+            data, times = raw[use_picks, first:last]
+        else:
+            data = reader(first, last)[use_picks]
+            times = raw.times[first:last]
         assert len(times) == last - first
 
         if projector is not None:
@@ -2369,7 +2544,7 @@ def _write_raw(fname, raw, info, picks, fmt, data_type, reset_range, start,
                 fname, raw, info, picks, fmt,
                 data_type, reset_range, first + buffer_size, stop, buffer_size,
                 projector, drop_small_buffer, split_size, split_naming,
-                part_idx + 1, use_fname, overwrite)
+                part_idx + 1, use_fname, overwrite, reader)
 
             start_block(fid, FIFF.FIFFB_REF)
             write_int(fid, FIFF.FIFF_REF_ROLE, FIFF.FIFFV_ROLE_NEXT_FILE)
@@ -2392,6 +2567,90 @@ def _write_raw(fname, raw, info, picks, fmt, data_type, reset_range, start,
     return use_fname, part_idx
 
 
+def _write_raw_filtered(fname, raw, info, h, picks, phase, pad, n_jobs,
+                        skip_by_annotation, fmt, overwrite, split_size,
+                        split_naming):
+    """FIR filter raw data block by block and write them to a new file."""
+    from .fiff.raw import read_raw_fif
+    check_fname(fname, 'raw', ('raw.fif', 'raw_sss.fif', 'raw_tsss.fif',
+                               'raw.fif.gz', 'raw_sss.fif.gz',
+                               'raw_tsss.fif.gz'))
+    fname = op.realpath(fname)
+    if fname in raw._filenames:
+        raise ValueError('You cannot save data to the same file.'
+                         ' Please use a different filename.')
+    data_type, reset_range, split_size, part_idx = _check_raw_save_params(
+        raw, fmt, split_size, split_naming)
+    _check_fname(fname, overwrite)
+    onsets, ends = _annotations_starts_stops(
+        raw, skip_by_annotation, 'skip_by_annotation', invert=True)
+    reader = _RawFilterReader(raw, h, picks, phase, pad, n_jobs,
+                              onsets, ends)
+    logger.info('Filtering in blocks of %d samples (%d samples of context)'
+                % (reader.block_size, reader.n_context))
+    # with BIDS naming the first file written is not fname
+    first_fname, _ = _write_raw(
+        fname, raw, info, None, fmt, data_type, reset_range, 0,
+        len(raw.times), raw._get_buffer_size(), None, False, split_size,
+        split_naming, part_idx, None, overwrite, reader)
+    return read_raw_fif(first_fname)
+
+
+class _RawFilterReader(object):
+    """Read raw data in overlapping blocks and FIR filter them.
+
+    Each block is read with enough context on both sides for the filter to
+    settle, so the result matches filtering the whole recording (each
+    segment between ``onsets`` and ``ends`` separately) in memory.
+    """
+
+    def __init__(self, raw, h, picks, phase, pad, n_jobs, onsets, ends):
+        self.raw = raw
+        self.h = h
+        self.picks = picks
+        self.phase = phase
+        self.pad = pad
+        self.n_jobs = n_jobs
+        self.onsets = onsets
+        self.ends = ends
+        n_h = 2 * len(h) - 1 if phase == 'zero-double' else len(h)
+        self.n_context = n_h - 1
+        self.block_size = max(int(round(10 * raw.info['sfreq'])),
+                              4 * self.n_context)
+        self._block = None
+        self._block_start = 0
+
+    def __call__(self, start, stop):
+        """Get the filtered data of all channels from start to stop."""
+        if self._block is None or start < self._block_start or \
+                stop > self._block_start + self._block.shape[1]:
+            self._read_block(start, max(stop, start + self.block_size))
+        return self._block[:, start - self._block_start:
+                           stop - self._block_start]
+
+    def _read_block(self, start, stop):
+        n_times = len(self.raw.times)
+        stop = min(stop, n_times)
+        w_start = max(start - self.n_context, 0)
+        w_stop = min(stop + self.n_context, n_times)
+        window = self.raw[:, w_start:w_stop][0]
+        block = window[:, start - w_start:stop - w_start].copy()
+        for onset, end in zip(self.onsets, self.ends):
+            if max(onset, start) >= min(end, stop):
+                continue  # segment does not overlap this block
+            # filter the part of the segment within the window; samples
+            # further than n_context from the block do not affect it
+            s_start, s_stop = max(onset, w_start), min(end, w_stop)
+            seg = _overlap_add_filter(
+                window[:, s_start - w_start:s_stop - w_start], self.h,
+                phase=self.phase, picks=self.picks, n_jobs=self.n_jobs,
+                pad=self.pad)
+            o_start, o_stop = max(onset, start), min(end, stop)
+            block[:, o_start - start:o_stop - start] = \
+                seg[:, o_start - s_start:o_stop - s_start]
+        self._block, self._block_start = block, start
+
+
 def _start_writing_raw(name, info, sel, data_type,
                        reset_range, annotations):
     """Start write raw data in file.
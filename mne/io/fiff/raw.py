@@ -25,9 +25,22 @@ from ...annotations import (Annotations, _combine_annotations,
                             _read_annotations)
 
 from ...event import AcqParserFIF
+from ...externals.six import string_types
 from ...utils import check_fname, logger, verbose, warn
 
 
+# dtypes of the data buffers that can be memory-mapped directly
+_mmap_dtypes = {
+    FIFF.FIFFT_DAU_PACK16: '>i2',
+    FIFF.FIFFT_SHORT: '>i2',
+    FIFF.FIFFT_FLOAT: '>f4',
+    FIFF.FIFFT_DOUBLE: '>f8',
+    FIFF.FIFFT_INT: '>i4',
+    FIFF.FIFFT_COMPLEX_FLOAT: '>c8',
+    FIFF.FIFFT_COMPLEX_DOUBLE: '>c16',
+}
+
+
 class Raw(BaseRaw):
     """Raw data in FIF format.
 
@@ -49,7 +62,14 @@ class Raw(BaseRaw):
         If True, the data will be preloaded into memory (fast, requires
         large amount of memory). If preload is a string, preload is the
         file name of a memory-mapped file which is used to store the data
-        on the hard drive (slower, requires less memory).
+        on the hard drive (slower, requires less memory). If ``'mmap'``,
+        the data are not preloaded, but the data buffers of the file are
+        memory-mapped so that on-demand reads avoid parsing each tag
+        (calibration is applied when the data are accessed). This is not
+        supported for gzipped files.
+
+        .. versionadded:: 0.17
+           Support for ``preload='mmap'``.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more).
@@ -78,6 +98,9 @@ class Raw(BaseRaw):
                  verbose=None):  # noqa: D102
         fnames = [op.realpath(fname)]
         del fname
+        mmap = isinstance(preload, string_types) and preload == 'mmap'
+        if mmap:
+            preload = False
         split_fnames = []
 
         raws = []
@@ -103,6 +126,13 @@ class Raw(BaseRaw):
             [r.filename for r in raws], [r._raw_extras for r in raws],
             raws[0].orig_format, None, buffer_size_sec=buffer_size_sec,
             verbose=verbose)
+        if mmap:
+            for fname in self._filenames:
+                if op.splitext(fname)[1].lower() == '.gz':
+                    raise ValueError('preload="mmap" is not supported for '
+                                     'gzipped files, got %s' % fname)
+        self._mmap = mmap
+        self._mmap_views = _MmapViews()
 
         # combine annotations
         self.set_annotations(raws[0].annotations, False)
@@ -323,50 +353,83 @@ class Raw(BaseRaw):
         """Read a segment of data from a file."""
         stop -= 1
         offset = 0
-        with _fiff_get_fid(self._filenames[fi]) as fid:
-            for this in self._raw_extras[fi]:
-                #  Do we need this buffer
-                if this['last'] >= start:
-                    #  The picking logic is a bit complicated
-                    if stop > this['last'] and start < this['first']:
-                        #    We need the whole buffer
-                        first_pick = 0
+        views = self._get_mmap_views(fi) if self._mmap else None
+        #  Find the buffers we need (those overlapping [start, stop])
+        firsts, lasts = self._get_buffer_index(fi)
+        b_start = np.searchsorted(lasts, start)
+        b_stop = np.searchsorted(firsts, stop, side='right')
+        # the file is only needed if the buffers are not memory-mapped
+        fid = None if views is not None else \
+            _fiff_get_fid(self._filenames[fi])
+        try:
+            for bi in range(b_start, b_stop):
+                this = self._raw_extras[fi][bi]
+                #  The picking logic is a bit complicated
+                if stop > this['last'] and start < this['first']:
+                    #    We need the whole buffer
+                    first_pick = 0
+                    last_pick = this['nsamp']
+                    logger.debug('W')
+
+                elif start >= this['first']:
+                    first_pick = start - this['first']
+                    if stop <= this['last']:
+                        #   Something from the middle
+                        last_pick = this['nsamp'] + stop - this['last']
+                        logger.debug('M')
+                    else:
+                        #   From the middle to the end
                         last_pick = this['nsamp']
-                        logger.debug('W')
-
-                    elif start >= this['first']:
-                        first_pick = start - this['first']
-                        if stop <= this['last']:
-                            #   Something from the middle
-                            last_pick = this['nsamp'] + stop - this['last']
-                            logger.debug('M')
+                        logger.debug('E')
+                else:
+                    #    From the beginning to the middle
+                    first_pick = 0
+                    last_pick = stop - this['first'] + 1
+                    logger.debug('B')
+
+                #   Now we are ready to pick
+                picksamp = last_pick - first_pick
+                if picksamp > 0:
+                    # only read data if it exists
+                    if this['ent'] is not None:
+                        if views is not None:
+                            one = views[bi][first_pick:last_pick]
                         else:
-                            #   From the middle to the end
-                            last_pick = this['nsamp']
-                            logger.debug('E')
-                    else:
-                        #    From the beginning to the middle
-                        first_pick = 0
-                        last_pick = stop - this['first'] + 1
-                        logger.debug('B')
-
-                    #   Now we are ready to pick
-                    picksamp = last_pick - first_pick
-                    if picksamp > 0:
-                        # only read data if it exists
-                        if this['ent'] is not None:
-                            one = read_tag(fid, this['ent'].pos,
-                                           shape=(this['nsamp'],
-                                                  self.info['nchan']),
-                                           rlims=(first_pick, last_pick)).data
+                            one = read_tag(
+                                fid, this['ent'].pos,
+                                shape=(this['nsamp'], self.info['nchan']),
+                                rlims=(first_pick, last_pick)).data
                             one.shape = (picksamp, self.info['nchan'])
-                            _mult_cal_one(data[:, offset:(offset + picksamp)],
-                                          one.T, idx, cals, mult)
-                        offset += picksamp
+                        _mult_cal_one(data[:, offset:(offset + picksamp)],
+                                      one.T, idx, cals, mult)
+                    offset += picksamp
+        finally:
+            if fid is not None:
+                fid.close()
 
-                #   Done?
-                if this['last'] >= stop:
-                    break
+    def _get_mmap_views(self, fi):
+        """Get (and cache) the memory-mapped buffer views of a file.
+
+        Returns None for gzipped files, which cannot be memory-mapped.
+        """
+        fname = self._filenames[fi]
+        if op.splitext(fname)[1].lower() == '.gz':
+            # e.g., appended to a memory-mapped file, read it tag by tag
+            return None
+        views = self._mmap_views.get(fname)
+        if views is None:
+            views = _mmap_buffers(fname, self._raw_extras[fi],
+                                  self.info['nchan'])
+            self._mmap_views[fname] = views
+        return views
+
+    def close(self):
+        """Clean up the object.
+
+        For ``preload='mmap'`` this releases the memory-mapped buffers,
+        they will be mapped again on the next read.
+        """
+        self._mmap_views.clear()
 
     def fix_mag_coil_types(self):
         """Fix Elekta magnetometer coil types.
@@ -413,6 +476,74 @@ class Raw(BaseRaw):
         return self._acqparser
 
 
+class _MmapViews(dict):
+    """Cache of memory-mapped buffer views, dropped on copy and pickle."""
+
+    def __deepcopy__(self, memo):
+        return _MmapViews()
+
+    def __reduce__(self):
+        return (_MmapViews, ())
+
+
+def _mmap_buffers(fname, raw_extra, nchan):
+    """Create zero-copy views of the data buffers of a FIF file.
+
+    Parameters
+    ----------
+    fname : str
+        The (uncompressed) FIF file name.
+    raw_extra : list of dict
+        The buffer descriptions of the file (see ``Raw._read_raw_file``).
+    nchan : int
+        The number of channels.
+
+    Returns
+    -------
+    views : list of ndarray | None
+        For each entry in ``raw_extra`` an array of shape (nsamp, nchan)
+        in the on-disk (big-endian) dtype, or None for skips.
+
+    Notes
+    -----
+    Consecutive buffers of the same type and size that are equally spaced
+    in the file (the usual case) share a single strided view of shape
+    (n_buffers, nsamp, nchan) so that the number of mappings stays small.
+    """
+    mm = np.memmap(fname, dtype=np.uint8, mode='r')
+    views = [None] * len(raw_extra)
+    bufs = [bi for bi, this in enumerate(raw_extra) if this['ent'] is not None]
+    ii = 0
+    while ii < len(bufs):
+        first = raw_extra[bufs[ii]]
+        ent = first['ent']
+        if ent.type not in _mmap_dtypes:
+            raise ValueError('Cannot memory-map data buffers of type %d'
+                             % ent.type)
+        # extend the run as long as type, size and spacing match
+        step = 0
+        kk = ii + 1
+        while kk < len(bufs):
+            this = raw_extra[bufs[kk]]
+            this_step = this['ent'].pos - raw_extra[bufs[kk - 1]]['ent'].pos
+            if this['ent'].type != ent.type or \
+                    this['nsamp'] != first['nsamp'] or \
+                    (step != 0 and this_step != step):
+                break
+            step = this_step
+            kk += 1
+        dtype = np.dtype(_mmap_dtypes[ent.type])
+        # data follow the 16-byte tag header (kind, type, size, next)
+        run = np.ndarray(
+            (kk - ii, first['nsamp'], nchan), dtype, buffer=mm,
+            offset=ent.pos + 16,
+            strides=(step, nchan * dtype.itemsize, dtype.itemsize))
+        for ri, bi in enumerate(bufs[ii:kk]):
+            views[bi] = run[ri]
+        ii = kk
+    return views
+
+
 def _check_entry(first, nent):
     """Sanity check entries."""
     if first >= nent:
@@ -440,7 +571,14 @@ def read_raw_fif(fname, allow_maxshield=False, preload=False, verbose=None):
         If True, the data will be preloaded into memory (fast, requires
         large amount of memory). If preload is a string, preload is the
         file name of a memory-mapped file which is used to store the data
-        on the hard drive (slower, requires less memory).
+        on the hard drive (slower, requires less memory). If ``'mmap'``,
+        the data are not preloaded, but the data buffers of the file are
+        memory-mapped so that on-demand reads avoid parsing each tag
+        (calibration is applied when the data are accessed). This is not
+        supported for gzipped files.
+
+        .. versionadded:: 0.17
+           Support for ``preload='mmap'``.
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more).
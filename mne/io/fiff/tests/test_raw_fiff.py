@@ -949,6 +949,68 @@ def test_filter_picks():
         pytest.raises(RuntimeError, raw_.filter, 10, 30)
 
 
+def test_filter_out_fname(tmpdir):
+    """Test filtering raw data from disk in blocks to a new file."""
+    raw = read_raw_fif(test_fif_fname)
+    raw = concatenate_raws([raw.copy().crop(0, 15), raw.copy().crop(20, 35)])
+    picks = pick_types(raw.info, meg=True, eeg=True, exclude=())
+    for kwargs in (dict(l_freq=1., h_freq=40.),
+                   dict(l_freq=None, h_freq=10., phase='minimum'),
+                   dict(l_freq=0.5, h_freq=None, phase='zero-double',
+                        skip_by_annotation=())):
+        out_fname = tmpdir.join('filt_raw.fif')
+        if out_fname.check():
+            out_fname.remove()
+        raw_filt = raw.filter(out_fname=str(out_fname), **kwargs)
+        assert not raw.preload
+        assert not raw_filt.preload
+        assert raw_filt.first_samp == raw.first_samp
+        assert_array_equal(raw_filt.annotations.description,
+                           raw.annotations.description)
+        raw_mem = raw.copy().load_data().filter(**kwargs)
+        assert raw_filt.info['highpass'] == raw_mem.info['highpass']
+        assert raw_filt.info['lowpass'] == raw_mem.info['lowpass']
+        data_mem = raw_mem[picks][0]
+        scale = np.abs(data_mem).max(axis=1, keepdims=True)
+        assert_allclose(raw_filt[picks][0] / scale, data_mem / scale,
+                        atol=1e-6)
+    out_fname = str(tmpdir.join('notch_raw.fif'))
+    raw_filt = raw.notch_filter([60., 120.], out_fname=out_fname)
+    data_mem = raw.copy().load_data().notch_filter([60., 120.])[picks][0]
+    scale = np.abs(data_mem).max(axis=1, keepdims=True)
+    assert_allclose(raw_filt[picks][0] / scale, data_mem / scale, atol=1e-6)
+    with pytest.raises(IOError, match='exists'):
+        raw.notch_filter(60., out_fname=out_fname)
+    # the same segments are filtered separately in memory and from disk
+    kwargs = dict(freqs=60., skip_by_annotation=('edge',))
+    raw_filt = raw.notch_filter(out_fname=out_fname, fmt='double',
+                                overwrite=True, **kwargs)
+    assert raw_filt.orig_format == 'double'
+    data_mem = raw.copy().load_data().notch_filter(**kwargs)[picks][0]
+    scale = np.abs(data_mem).max(axis=1, keepdims=True)
+    assert_allclose(raw_filt[picks][0] / scale, data_mem / scale, atol=1e-10)
+    # by default the data are filtered as one signal
+    data_mem = raw.copy().load_data().notch_filter(60.)[picks][0]
+    assert not np.allclose(raw_filt[picks][0] / scale, data_mem / scale,
+                           atol=1e-6)
+    # BIDS split naming
+    out_fname = str(tmpdir.join('sub-01_meg.fif'))
+    raw_filt = raw.filter(1., 40., out_fname=out_fname, split_naming='bids')
+    assert op.basename(raw_filt.filenames[0]) == 'sub-01_part-01_meg.fif'
+    assert not op.isfile(out_fname)
+    data_mem = raw.copy().load_data().filter(1., 40.)[picks][0]
+    scale = np.abs(data_mem).max(axis=1, keepdims=True)
+    assert_allclose(raw_filt[picks][0] / scale, data_mem / scale, atol=1e-6)
+    with pytest.raises(ValueError, match='fmt must be'):
+        raw.notch_filter(60., out_fname=out_fname, overwrite=True, fmt='foo')
+    with pytest.raises(ValueError, match='method="fir"'):
+        raw.filter(1., 40., method='iir', out_fname=out_fname)
+    with pytest.raises(ValueError, match='method="fir"'):
+        raw.notch_filter(60., method='spectrum_fit', out_fname=out_fname)
+    with pytest.raises(RuntimeError, match='loaded'):
+        raw.filter(1., 40.)
+
+
 @testing.requires_testing_data
 def test_crop():
     """Test cropping raw files."""
@@ -1522,4 +1584,94 @@ def test_memmap(tmpdir):
     # require them.
 
 
+@testing.requires_testing_data
+def test_preload_mmap(tmpdir):
+    """Test memory-mapped reading of raw buffers."""
+    raw = read_raw_fif(test_fif_fname)
+    raw_mmap = read_raw_fif(test_fif_fname, preload='mmap')
+    assert not raw_mmap.preload
+    picks = [0, 5, 300, 301]
+    for start, stop in ((0, None), (100, 101), (1000, 3000)):
+        assert_array_equal(raw_mmap.get_data(picks, start, stop),
+                           raw.get_data(picks, start, stop))
+    # copies work and do not share (or load) the mapped views
+    raw_copy = raw_mmap.copy()
+    assert len(raw_copy._mmap_views) == 0
+    assert_array_equal(raw_copy[:, :100][0], raw[:, :100][0])
+    raw_mmap.close()
+    assert len(raw_mmap._mmap_views) == 0
+    assert_array_equal(raw_mmap.load_data()._data, raw.load_data()._data)
+    # acquisition skips
+    raw = read_raw_fif(skip_fname)
+    raw_mmap = read_raw_fif(skip_fname, preload='mmap')
+    assert_array_equal(raw_mmap[:, 1500:14500][0], raw[:, 1500:14500][0])
+    # split files
+    split_fname = op.join(str(tmpdir), 'split_raw.fif')
+    raw = read_raw_fif(fif_fname).crop(0, 20)
+    raw.save(split_fname, buffer_size_sec=1., split_size='10MB')
+    raw = read_raw_fif(split_fname)
+    raw_mmap = read_raw_fif(split_fname, preload='mmap')
+    assert len(raw_mmap._filenames) == 2
+    assert_array_equal(raw_mmap[:][0], raw[:][0])
+    # projection and compensation
+    raw = read_raw_fif(ctf_comp_fname).apply_gradient_compensation(1)
+    raw_mmap = read_raw_fif(ctf_comp_fname, preload='mmap')
+    raw_mmap.apply_gradient_compensation(1)
+    assert_allclose(raw_mmap[:][0], raw[:][0])
+    with pytest.raises(ValueError, match='not supported for gzipped'):
+        read_raw_fif(test_fif_gz_fname, preload='mmap')
+
+
+def test_preload_mmap_append_gz(tmpdir):
+    """Test appending a gzipped file to a memory-mapped raw."""
+    gz_fname = op.join(str(tmpdir), 'test_raw.fif.gz')
+    read_raw_fif(test_fif_fname).crop(0, 1).save(gz_fname)
+    raw = read_raw_fif(test_fif_fname, preload='mmap')
+    raw.append(read_raw_fif(gz_fname))
+    raw_orig = read_raw_fif(test_fif_fname)
+    raw_orig.append(read_raw_fif(gz_fname))
+    assert_array_equal(raw[:][0], raw_orig[:][0])
+    # only the uncompressed file is mapped
+    assert list(raw._mmap_views) == [raw._filenames[0]]
+
+
+def test_buffer_index(tmpdir, monkeypatch):
+    """Test that on-demand reads only visit the buffers they need."""
+    import mne.io.fiff.raw as raw_module
+    raw = read_raw_fif(test_fif_fname, preload=True)
+    fname = op.join(str(tmpdir), 'test_raw.fif')
+    raw.save(fname, buffer_size_sec=0.1)
+    raw = read_raw_fif(fname, preload=True)
+    raw_read = read_raw_fif(fname)
+    firsts, lasts = raw_read._get_buffer_index(0)
+    n_buf = len(raw_read._raw_extras[0])
+    assert n_buf > 100
+    assert_array_equal(firsts[1:], lasts[:-1] + 1)
+    assert firsts[0] == raw_read.first_samp
+    assert lasts[-1] == raw_read.last_samp
+    buf_len = raw_read._raw_extras[0][0]['nsamp']
+
+    n_calls = [0]
+    orig_read_tag = raw_module.read_tag
+
+    def _counting_read_tag(*args, **kwargs):
+        n_calls[0] += 1
+        return orig_read_tag(*args, **kwargs)
+
+    monkeypatch.setattr(raw_module, 'read_tag', _counting_read_tag)
+    # reading an "epoch" costs the same no matter where it is in the file
+    for start in (0, buf_len - 5, len(raw.times) // 2,
+                  len(raw.times) - buf_len):
+        n_calls[0] = 0
+        stop = start + buf_len
+        assert_array_equal(raw_read[:, start:stop][0],
+                           raw[:, start:stop][0])
+        assert n_calls[0] <= 2
+    # the index survives cropping and appending
+    raw_read.crop(10, None).append(read_raw_fif(fname))
+    assert len(raw_read._buffer_index) == 2
+    raw.crop(10, None).append(read_raw_fif(fname, preload=True))
+    assert_array_equal(raw_read[:][0], raw[:][0])
+
+
 run_tests_if_main()
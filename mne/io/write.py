@@ -234,6 +234,49 @@ def write_complex_double_matrix(fid, kind, mat):
     check_fiff_length(fid)
 
 
+def _write_matrix_chunks(fid, kind, shape, chunks, dtype):
+    """Write a matrix tag whose data are given chunk by chunk.
+
+    Parameters
+    ----------
+    fid : file
+        The open FIF file.
+    kind : int
+        The tag kind.
+    shape : tuple
+        The shape of the full matrix.
+    chunks : iterable of ndarray
+        The data in C order, split along the first dimension.
+    dtype : str
+        The on-disk data type, one of ``'>f4'``, ``'>f8'``, ``'>c8'`` or
+        ``'>c16'``.
+    """
+    FIFFT_MATRIX = 1 << 30
+    fifft_type = {'>f4': FIFF.FIFFT_FLOAT, '>f8': FIFF.FIFFT_DOUBLE,
+                  '>c8': FIFF.FIFFT_COMPLEX_FLOAT,
+                  '>c16': FIFF.FIFFT_COMPLEX_DOUBLE}[dtype] | FIFFT_MATRIX
+    n_total = int(np.prod(shape))
+    data_size = np.dtype(dtype).itemsize * n_total + 4 * (len(shape) + 1)
+
+    fid.write(np.array(kind, dtype='>i4').tostring())
+    fid.write(np.array(fifft_type, dtype='>i4').tostring())
+    fid.write(np.array(data_size, dtype='>i4').tostring())
+    fid.write(np.array(FIFF.FIFFV_NEXT_SEQ, dtype='>i4').tostring())
+    n_written = 0
+    for chunk in chunks:
+        fid.write(np.array(chunk, dtype=dtype).tostring())
+        n_written += chunk.size
+    if n_written != n_total:
+        raise RuntimeError('Wrote %d matrix elements but expected %d'
+                           % (n_written, n_total))
+
+    dims = np.empty(len(shape) + 1, dtype=np.int32)
+    dims[:len(shape)] = shape[::-1]
+    dims[-1] = len(shape)
+    fid.write(np.array(dims, dtype='>i4').tostring())
+    check_fiff_length(fid)
+
+
 def get_machid():
     """Get (mostly) unique machine ID.
 
@@ -6,7 +6,11 @@
 # License: BSD (3-clause)
 
 from copy import deepcopy
+from functools import partial
+import itertools
 from math import sqrt
+import weakref
+
 import numpy as np
 from scipy import linalg
 
@@ -35,7 +39,74 @@ from ..source_space import (_read_source_spaces_from_tree,
                             _write_source_spaces_to_fid, label_src_vertno_sel)
 from ..transforms import _ensure_trans, transform_surface_to
 from ..source_estimate import _make_stc, _get_src_type
-from ..utils import check_fname, logger, verbose, warn
+from ..utils import (check_fname, logger, verbose, warn, _validate_type,
+                     _LRUCache)
+
+# Prepared inverse operators and their kernels, see _get_inverse_kernel
+_inverse_cache = _LRUCache(max_size=0)
+# A unique token for each inverse operator used with the cache, by id
+_inverse_tokens = dict()
+_inverse_token_count = itertools.count()
+
+
+def get_inverse_cache_info():
+    """Get statistics of the inverse kernel cache.
+
+    Returns
+    -------
+    info : dict
+        Dictionary with the number of cache ``'hits'`` and ``'misses'``,
+        the current number of entries ``'size'``, and ``'max_size'``.
+
+    See Also
+    --------
+    set_inverse_cache_size
+
+    Notes
+    -----
+    .. versionadded:: 0.17
+    """
+    return _inverse_cache.info()
+
+
+def set_inverse_cache_size(max_size):
+    """Set the maximum number of entries in the inverse kernel cache.
+
+    When enabled, :func:`apply_inverse`, :func:`apply_inverse_epochs` and
+    :func:`apply_inverse_raw` keep the prepared inverse operator and the
+    imaging kernel of their most recent calls, so that calling them again
+    with the same inverse operator, ``nave``, ``lambda2``, ``method``,
+    ``pick_ori``, ``label``, ``prepared`` and ``method_params`` (e.g., for
+    each condition of an experiment with the same number of averages) skips
+    the preparation of the inverse operator and the assembly of the kernel.
+    The least recently used entries are discarded first. This also clears
+    the cache and resets its statistics.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of cached entries. Use 0 (default) to disable
+        caching. Each entry holds a copy of the inverse operator and a
+        kernel of shape ``(n_sources, n_channels)``, which can take
+        hundreds of MB for large source spaces.
+
+    See Also
+    --------
+    get_inverse_cache_info
+
+    Notes
+    -----
+    Inverse operators are cached by identity, so an inverse operator must
+    not be modified inplace once it has been used with the cache enabled
+    (a copy can be modified instead).
+
+    .. versionadded:: 0.17
+    """
+    _validate_type(max_size, 'int', 'max_size')
+    if max_size < 0:
+        raise ValueError('max_size must be >= 0, got %s' % (max_size,))
+    _inverse_cache.max_size = int(max_size)
+    _inverse_cache.clear()
 
 
 class InverseOperator(dict):
@@ -719,6 +790,68 @@ def _assemble_kernel(inv, label, method, pick_ori, verbose=None):
     return K, noise_norm, vertno, source_nn
 
 
+def _label_key(label):
+    """Get a hashable key of the vertices of a label."""
+    if label is None:
+        return None
+    if label.hemi == 'both':
+        return (_label_key(label.lh), _label_key(label.rh))
+    return (label.hemi, tuple(label.vertices.tolist()))
+
+
+def _forget_inverse(key, token, ref):
+    """Remove a deleted inverse operator from the cache."""
+    if _inverse_tokens.get(key, (None, None))[1] == token:
+        del _inverse_tokens[key]
+    _inverse_cache.remove(lambda cache_key: cache_key[0] == token)
+
+
+def _get_inverse_kernel(inverse_operator, nave, lambda2, method, pick_ori,
+                        label, prepared, method_params):
+    """Prepare the inverse operator and assemble the kernel (cached)."""
+    def _compute():
+        if not prepared:
+            inv = prepare_inverse_operator(inverse_operator, nave, lambda2,
+                                           method, method_params)
+        else:
+            inv = inverse_operator
+        K, noise_norm, vertno, source_nn = _assemble_kernel(
+            inv, label, method, pick_ori)
+        for x in (K, noise_norm):
+            if x is not None:
+                x.flags.writeable = False
+        # do not keep a prepared operator alive through the cache
+        return (None if prepared else inv), K, noise_norm, vertno, source_nn
+
+    if _inverse_cache.max_size == 0 or \
+            not isinstance(inverse_operator, InverseOperator):
+        out = _compute()
+    else:
+        # the cache is keyed by the identity of the inverse operator (ids of
+        # deleted objects are reused, hence the weak references, which also
+        # remove the entries of deleted operators)
+        ref, token = _inverse_tokens.get(id(inverse_operator), (None, None))
+        if ref is None or ref() is not inverse_operator:
+            token = next(_inverse_token_count)
+            _inverse_tokens[id(inverse_operator)] = (weakref.ref(
+                inverse_operator, partial(_forget_inverse,
+                                          id(inverse_operator), token)),
+                token)
+        if method_params is not None:
+            method_params = tuple(sorted(method_params.items()))
+        key = (token, nave, lambda2, method, pick_ori, _label_key(label),
+               prepared, method_params)
+        n_hits = _inverse_cache.hits
+        out = _inverse_cache.get(key, _compute)
+        if _inverse_cache.hits > n_hits:
+            logger.info('    Using the cached inverse operator and kernel')
+        # the source estimates get their own vertices and normals
+        out = out[:3] + ([np.array(vertices) for vertices in out[3]],
+                         np.array(out[4]))
+    inv = inverse_operator if prepared else out[0]
+    return (inv,) + out[1:]
+
+
 def _check_comps(info, data_info, kind):
     """Check for compatibility between compensation grades."""
     comp = get_current_comp(info)
@@ -920,11 +1053,9 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
 
     _check_ch_names(inverse_operator, evoked.info)
 
-    if not prepared:
-        inv = prepare_inverse_operator(inverse_operator, nave, lambda2, method,
-                                       method_params)
-    else:
-        inv = inverse_operator
+    inv, K, noise_norm, vertno, source_nn = _get_inverse_kernel(
+        inverse_operator, nave, lambda2, method, pick_ori, label, prepared,
+        method_params)
     #
     #   Pick the correct channels from the data
     #
@@ -932,8 +1063,6 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
     logger.info('Applying inverse operator to "%s"...' % (evoked.comment,))
     logger.info('    Picked %d channels from the data' % len(sel))
     logger.info('    Computing inverse...')
-    K, noise_norm, vertno, source_nn = _assemble_kernel(inv, label, method,
-                                                        pick_ori)
     sol = np.dot(K, evoked.data[sel])  # apply imaging kernel
     logger.info('    Computing residual...')
     # x̂(t) = G ĵ(t) = C ** 1/2 U Π w(t)
@@ -1050,11 +1179,9 @@ def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
     #
     #   Set up the inverse according to the parameters
     #
-    if not prepared:
-        inv = prepare_inverse_operator(inverse_operator, nave, lambda2, method,
-                                       method_params)
-    else:
-        inv = inverse_operator
+    inv, K, noise_norm, vertno, source_nn = _get_inverse_kernel(
+        inverse_operator, nave, lambda2, method, pick_ori, label, prepared,
+        method_params)
     #
     #   Pick the correct channels from the data
     #
@@ -1068,9 +1195,6 @@ def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
     if time_func is not None:
         data = time_func(data)
 
-    K, noise_norm, vertno, source_nn = _assemble_kernel(inv, label, method,
-                                                        pick_ori)
-
     is_free_ori = (inverse_operator['source_ori'] ==
                    FIFF.FIFFV_MNE_FREE_ORI and pick_ori != 'normal')
 
@@ -1129,19 +1253,15 @@ def _apply_inverse_epochs_gen(epochs, inverse_operator, lambda2, method='dSPM',
     #
     #   Set up the inverse according to the parameters
     #
-    if not prepared:
-        inv = prepare_inverse_operator(inverse_operator, nave, lambda2, method,
-                                       method_params)
-    else:
-        inv = inverse_operator
+    inv, K, noise_norm, vertno, source_nn = _get_inverse_kernel(
+        inverse_operator, nave, lambda2, method, pick_ori, label, prepared,
+        method_params)
     #
     #   Pick the correct channels from the data
     #
     sel = _pick_channels_inverse_operator(epochs.ch_names, inv)
     logger.info('Picked %d channels from the data' % len(sel))
     logger.info('Computing inverse...')
-    K, noise_norm, vertno, source_nn = _assemble_kernel(inv, label, method,
-                                                        pick_ori)
 
     tstep = 1.0 / epochs.info['sfreq']
     tmin = epochs.times[0]
@@ -1153,8 +1273,8 @@ def _apply_inverse_epochs_gen(epochs, inverse_operator, lambda2, method='dSPM',
         noise_norm = noise_norm.repeat(3, axis=0)
 
     if not is_free_ori and noise_norm is not None:
-        # premultiply kernel with noise normalization
-        K *= noise_norm
+        # premultiply kernel with noise normalization (K can be cached)
+        K = K * noise_norm
 
     subject = _subject_from_inverse(inverse_operator)
     for k, e in enumerate(epochs):
@@ -31,7 +31,9 @@ from mne.minimum_norm.inverse import (apply_inverse, read_inverse_operator,
                                       make_inverse_operator,
                                       write_inverse_operator,
                                       compute_rank_inverse,
-                                      prepare_inverse_operator)
+                                      prepare_inverse_operator,
+                                      get_inverse_cache_info,
+                                      set_inverse_cache_size)
 from mne.utils import _TempDir, run_tests_if_main, catch_logging
 from mne.externals import six
 
@@ -883,6 +885,63 @@ def test_apply_mne_inverse_epochs():
     assert_array_almost_equal(stcs_rh[0].data, label_stc.data)
 
 
+@testing.requires_testing_data
+def test_inverse_cache():
+    """Test caching of prepared inverse operators and kernels."""
+    inv = read_inverse_operator(fname_inv)
+    evoked = _get_evoked()
+    label = read_label(fname_label % 'Aud-lh') + \
+        read_label(fname_label % 'Aud-rh')
+    stc = apply_inverse(evoked, inv, lambda2, 'dSPM')
+    stc_label = apply_inverse(evoked, inv, lambda2, 'dSPM', label=label)
+    epochs = mne.EpochsArray(evoked.data[np.newaxis], evoked.info)
+    stcs = apply_inverse_epochs(epochs, inv, lambda2, 'dSPM',
+                                nave=evoked.nave, pick_ori='normal')
+    set_inverse_cache_size(2)
+    assert get_inverse_cache_info() == dict(hits=0, misses=0, size=0,
+                                            max_size=2)
+    for ii in range(2):
+        assert_array_equal(apply_inverse(evoked, inv, lambda2, 'dSPM').data,
+                           stc.data)
+        assert get_inverse_cache_info()['misses'] == 1
+    assert get_inverse_cache_info()['hits'] == 1
+    for ii in range(2):
+        assert_array_equal(apply_inverse(evoked, inv, lambda2, 'dSPM',
+                                         label=label).data, stc_label.data)
+    assert get_inverse_cache_info() == dict(hits=2, misses=2, size=2,
+                                            max_size=2)
+    # the least recently used entry is discarded
+    stcs_2 = apply_inverse_epochs(epochs, inv, lambda2, 'dSPM',
+                                  nave=evoked.nave, pick_ori='normal')
+    assert_array_equal(stcs_2[0].data, stcs[0].data)
+    apply_inverse(evoked, inv, lambda2, 'dSPM')
+    assert get_inverse_cache_info() == dict(hits=2, misses=4, size=2,
+                                            max_size=2)
+    # copies are not the same inverse operator
+    apply_inverse(evoked, inv.copy(), lambda2, 'dSPM')
+    assert get_inverse_cache_info()['misses'] == 5
+    # other parameters
+    stc_2 = apply_inverse(evoked, inv, lambda2 / 2., 'dSPM')
+    assert get_inverse_cache_info()['misses'] == 6
+    assert not np.allclose(stc_2.data, stc.data)
+    # the source estimates do not share the cached vertices
+    stc_3 = apply_inverse(evoked, inv, lambda2 / 2., 'dSPM')
+    assert get_inverse_cache_info()['hits'] == 3
+    for vertices, vertices_3 in zip(stc_2.vertices, stc_3.vertices):
+        assert not np.shares_memory(vertices, vertices_3)
+    # the entries of deleted inverse operators are removed
+    inv_copy = inv.copy()
+    apply_inverse(evoked, inv_copy, lambda2, 'dSPM')
+    assert get_inverse_cache_info()['size'] == 2
+    del inv_copy
+    assert get_inverse_cache_info()['size'] == 1
+    pytest.raises(ValueError, set_inverse_cache_size, -1)
+    set_inverse_cache_size(0)
+    apply_inverse(evoked, inv, lambda2, 'dSPM')  # the cache is not used
+    assert get_inverse_cache_info() == dict(hits=0, misses=0, size=0,
+                                            max_size=0)
+
+
 @testing.requires_testing_data
 def test_make_inverse_operator_bads():
     """Test MNE inverse computation given a mismatch of bad channels."""
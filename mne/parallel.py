@@ -4,8 +4,10 @@
 #
 # License: Simplified BSD
 
+from contextlib import contextmanager
 from .externals.six import string_types
 import logging
+import multiprocessing
 import os
 
 from . import get_config
@@ -17,10 +19,13 @@ if 'MNE_FORCE_SERIAL' in os.environ:
 else:
     _force_serial = None
 
+# total number of threads to use, set by mne.utils.use_threads
+_thread_budget = None
+
 
 @verbose
 def parallel_func(func, n_jobs, max_nbytes='auto', pre_dispatch='2 * n_jobs',
-                  total=None, verbose=None):
+                  total=None, backend=None, verbose=None):
     """Return parallel instance with delayed function.
 
     Util function to use joblib only if available
@@ -44,6 +49,19 @@ def parallel_func(func, n_jobs, max_nbytes='auto', pre_dispatch='2 * n_jobs',
         jobs. This should only be used when directly iterating, not when
         using ``split_list`` or :func:`np.array_split`.
         If None (default), do not add a progress bar.
+    backend : str | None
+        The :class:`joblib.Parallel` backend to use, e.g. "threading" to
+        run the jobs in threads of the current process, which avoids
+        copying (or memmapping) the data for functions that release the
+        GIL (e.g., NumPy FFTs and matrix products). For "threading", the
+        number of BLAS threads is limited so that ``n_jobs`` times the
+        number of BLAS threads does not exceed the number of CPUs, or the
+        number of threads set with :class:`mne.utils.use_threads` (requires
+        threadpoolctl). If None (default), the backend set with
+        ``mne.set_config('MNE_PARALLEL_BACKEND', ...)`` is used, or the
+        joblib default if it is not set.
+
+        .. versionadded:: 0.17
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more). INFO or DEBUG
@@ -74,15 +92,21 @@ def parallel_func(func, n_jobs, max_nbytes='auto', pre_dispatch='2 * n_jobs',
         my_func = func
         parallel = list
     else:
+        if backend is None:
+            backend = get_config('MNE_PARALLEL_BACKEND', None)
+        if backend is not None and not isinstance(backend, string_types):
+            raise TypeError('backend must be a str or None, got %s'
+                            % (type(backend),))
         # check if joblib is recent enough to support memmaping
         p_args = _get_args(Parallel.__init__)
-        joblib_mmap = ('temp_folder' in p_args and 'max_nbytes' in p_args)
+        joblib_mmap = ('temp_folder' in p_args and 'max_nbytes' in p_args and
+                       backend != 'threading')
 
         cache_dir = get_config('MNE_CACHE_DIR', None)
         if isinstance(max_nbytes, string_types) and max_nbytes == 'auto':
             max_nbytes = get_config('MNE_MEMMAP_MIN_SIZE', None)
 
-        if max_nbytes is not None:
+        if max_nbytes is not None and backend != 'threading':
             if not joblib_mmap and cache_dir is not None:
                 warn('"MNE_CACHE_DIR" is set but a newer version of joblib is '
                      'needed to use the memmapping pool.')
@@ -104,9 +128,29 @@ def parallel_func(func, n_jobs, max_nbytes='auto', pre_dispatch='2 * n_jobs',
             kwargs['temp_folder'] = cache_dir
             kwargs['max_nbytes'] = max_nbytes
 
+        if backend is not None:
+            kwargs['backend'] = backend
+
         n_jobs = check_n_jobs(n_jobs)
         parallel = Parallel(n_jobs, **kwargs)
         my_func = delayed(func)
+        # avoid oversubscription by BLAS threads in each of the jobs
+        if _thread_budget is not None:
+            n_threads = max(_thread_budget // n_jobs, 1)
+            logger.info('Using %d job(s) with %d BLAS thread(s) each (%d '
+                        'threads in total)' % (n_jobs, n_threads,
+                                               _thread_budget))
+        elif backend == 'threading':
+            n_threads = max(multiprocessing.cpu_count() // n_jobs, 1)
+            logger.debug('Using %d threads with %d BLAS thread(s) each'
+                         % (n_jobs, n_threads))
+        else:
+            n_threads = None
+        if n_threads is not None:
+            if backend == 'threading':
+                parallel = _limit_blas_threads(parallel, n_threads)
+            else:
+                my_func = delayed(_BlasLimitedFunc(func, n_threads))
 
     if total is not None:
         def parallel_progress(op_iter):
@@ -118,6 +162,48 @@ def parallel_func(func, n_jobs, max_nbytes='auto', pre_dispatch='2 * n_jobs',
     return parallel_out, my_func, n_jobs
 
 
+def _limit_blas_threads(parallel, n_threads):
+    """Wrap parallel so that BLAS uses at most n_threads while running."""
+    def run(op_iter):
+        with _blas_threads(n_threads):
+            return parallel(op_iter)
+    return run
+
+
+class _BlasLimitedFunc(object):
+    """Call func in a worker process with at most n_threads BLAS threads."""
+
+    def __init__(self, func, n_threads):  # noqa: D102
+        self.func = func
+        self.n_threads = n_threads
+
+    def __call__(self, *args, **kwargs):  # noqa: D102
+        with _blas_threads(self.n_threads):
+            return self.func(*args, **kwargs)
+
+
+def _set_thread_budget(n_threads):
+    """Set the total number of threads, returning the previous value."""
+    global _thread_budget
+    old_n_threads = _thread_budget
+    _thread_budget = n_threads
+    return old_n_threads
+
+
+@contextmanager
+def _blas_threads(n_threads):
+    """Limit the number of BLAS threads, if threadpoolctl is available."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        logger.debug('threadpoolctl not installed, cannot limit BLAS '
+                     'threads')
+        yield
+    else:
+        with threadpool_limits(limits=n_threads, user_api='blas'):
+            yield
+
+
 def check_n_jobs(n_jobs, allow_cuda=False):
     """Check n_jobs in particular for negative values.
 
@@ -132,7 +218,8 @@ def check_n_jobs(n_jobs, allow_cuda=False):
     -------
     n_jobs : int
         The checked number of jobs. Always positive (or 'cuda' if
-        applicable.)
+        applicable.) Within :class:`mne.utils.use_threads`, it is at most
+        the number of threads set there.
     """
     if not isinstance(n_jobs, int):
         if not allow_cuda:
@@ -159,4 +246,9 @@ def check_n_jobs(n_jobs, allow_cuda=False):
                 warn('multiprocessing not installed. Cannot run in parallel.')
                 n_jobs = 1
 
+    if isinstance(n_jobs, int) and _thread_budget is not None and \
+            n_jobs > _thread_budget:
+        logger.info('Reducing n_jobs from %d to %d to stay within the '
+                    'thread limit' % (n_jobs, _thread_budget))
+        n_jobs = _thread_budget
     return n_jobs
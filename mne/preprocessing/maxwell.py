@@ -8,6 +8,7 @@
 
 from functools import partial
 from math import factorial
+import os
 from os import path as op
 
 import numpy as np
@@ -20,16 +21,20 @@ from ..chpi import quat_to_rot, rot_to_quat
 from ..transforms import (_str_to_frame, _get_trans, Transform, apply_trans,
                           _find_vector_rotation, _cart_to_sph, _get_n_moments,
                           _sph_to_cart_partials, _deg_ord_idx, _average_quats,
+                          _angle_between_quats,
                           _sh_complex_to_real, _sh_real_to_complex, _sh_negate)
 from ..forward import _concatenate_coils, _prep_meg_channels, _create_meg_coils
 from ..surface import _normalize_vectors
+from ..io.compensator import get_current_comp
 from ..io.constants import FIFF, FWD
 from ..io.meas_info import _simplify_info
 from ..io.proc_history import _read_ctc
 from ..io.write import _generate_meas_id, DATE_NONE
 from ..io import _loc_to_coil_trans, _coil_trans_to_loc, BaseRaw
 from ..io.pick import pick_types, pick_info
-from ..utils import verbose, logger, _clean_names, warn, _time_mask, _pl
+from ..parallel import parallel_func
+from ..utils import (verbose, logger, _clean_names, warn, _time_mask, _pl,
+                     object_hash)
 from ..fixes import _get_args, _safe_svd, _get_sph_harm, einsum
 from ..externals.six import string_types
 from ..channels.channels import _get_T1T2_mag_inds
@@ -46,7 +51,8 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
                    st_correlation=0.98, coord_frame='head', destination=None,
                    regularize='in', ignore_ref=False, bad_condition='error',
                    head_pos=None, st_fixed=True, st_only=False, mag_scale=100.,
-                   skip_by_annotation=('edge', 'bad_acq_skip'), verbose=None):
+                   skip_by_annotation=('edge', 'bad_acq_skip'), cache_dir=None,
+                   head_pos_tol=None, n_jobs=1, verbose=None):
     u"""Apply Maxwell filter to data using multipole moments.
 
     .. warning:: Automatic bad channel detection is not currently implemented.
@@ -160,6 +166,37 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
         or :meth:`mne.io.Raw.append`, or separated during acquisition.
         To disable, provide an empty list.
 
+        .. versionadded:: 0.17
+    cache_dir : str | None
+        If not None, a directory in which to store the SSS decompositions
+        (bases, regularization, and pseudo-inverses) and from which to
+        reuse them. Only the decomposition for the head position in
+        ``raw.info['dev_head_t']`` is cached (not those computed for each
+        position of ``head_pos``). Decompositions are keyed by the sensor
+        geometry, head position, origin, expansion orders, regularization,
+        fine calibration, and good channels, so runs of one session recorded
+        with the same head position only compute them once. The directory
+        is created if it does not exist. Cached files are not removed
+        automatically.
+
+        .. versionadded:: 0.17
+    head_pos_tol : tuple of float | None
+        Tolerance ``(dist, angle)`` in mm and degrees for movement
+        compensation. If not None, the decomposition of the last head
+        position for which one was computed is reused until the head has
+        moved by more than ``dist`` or rotated by more than ``angle`` from
+        that position. This approximates movement compensation with
+        densely sampled positions (e.g., from continuous HPI) at a fraction
+        of the cost. The default (None) computes a decomposition for every
+        head position.
+
+        .. versionadded:: 0.17
+    n_jobs : int
+        Number of jobs to run in parallel. The tSSS projectors of
+        ``n_jobs`` consecutive ``st_duration`` windows are computed at a
+        time, so memory usage grows with ``n_jobs``. The output does not
+        depend on ``n_jobs``.
+
         .. versionadded:: 0.17
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
@@ -281,15 +318,8 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
     # triage inputs ASAP to avoid late-thrown errors
     if not isinstance(raw, BaseRaw):
         raise TypeError('raw must be Raw, not %s' % type(raw))
-    _check_usable(raw)
-    _check_regularize(regularize)
-    st_correlation = float(st_correlation)
-    if st_correlation <= 0. or st_correlation > 1.:
-        raise ValueError('Need 0 < st_correlation <= 1., got %s'
-                         % st_correlation)
-    if coord_frame not in ('head', 'meg'):
-        raise ValueError('coord_frame must be either "head" or "meg", not "%s"'
-                         % coord_frame)
+    st_correlation = _check_maxwell_params(
+        raw.info, regularize, st_correlation, coord_frame, bad_condition)
     head_frame = True if coord_frame == 'head' else False
     recon_trans = _check_destination(destination, raw.info, head_frame)
     onsets, ends = _annotations_starts_stops(
@@ -306,19 +336,22 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
         st_duration = int(round(st_duration * raw.info['sfreq']))
         if not 0. < st_correlation <= 1:
             raise ValueError('st_correlation must be between 0. and 1.')
-    if not isinstance(bad_condition, string_types) or \
-            bad_condition not in ['error', 'warning', 'ignore', 'info']:
-        raise ValueError('bad_condition must be "error", "warning", "info", or'
-                         ' "ignore", not %s' % bad_condition)
-    if raw.info['dev_head_t'] is None and coord_frame == 'head':
-        raise RuntimeError('coord_frame cannot be "head" because '
-                           'info["dev_head_t"] is None; if this is an '
-                           'empty room recording, consider using '
-                           'coord_frame="meg"')
     if st_only and st_duration is None:
         raise ValueError('st_duration must not be None if st_only is True')
+    if cache_dir is not None:
+        if not isinstance(cache_dir, string_types):
+            raise TypeError('cache_dir must be a str or None, got %s'
+                            % type(cache_dir))
+        if not op.isdir(cache_dir):
+            os.makedirs(cache_dir)
     head_pos = _check_pos(head_pos, head_frame, raw, st_fixed,
                           raw.info['sfreq'])
+    if head_pos_tol is not None:
+        head_pos_tol = np.array(head_pos_tol, float)
+        if head_pos_tol.shape != (2,) or (head_pos_tol < 0).any():
+            raise ValueError('head_pos_tol must be None or a tuple of two '
+                             'non-negative floats (dist, angle), got %s'
+                             % (head_pos_tol,))
     _check_info(raw.info, sss=not st_only, tsss=st_duration is not None,
                 calibration=not st_only and calibration is not None,
                 ctc=not st_only and cross_talk is not None)
@@ -334,78 +367,13 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
         # remove MEG projectors, they won't apply now
         _remove_meg_projs(raw_sss)
     info = raw_sss.info
-    meg_picks, mag_picks, grad_picks, good_picks, mag_or_fine = \
-        _get_mf_picks(info, int_order, ext_order, ignore_ref)
-
-    # Magnetometers are scaled to improve numerical stability
-    coil_scale, mag_scale = _get_coil_scale(
-        meg_picks, mag_picks, grad_picks, mag_scale, info)
-
-    #
-    # Fine calibration processing (load fine cal and overwrite sensor geometry)
-    #
-    sss_cal = dict()
-    if calibration is not None:
-        calibration, sss_cal = _update_sensor_geometry(info, calibration,
-                                                       ignore_ref)
-        mag_or_fine.fill(True)  # all channels now have some mag-type data
-
-    # Determine/check the origin of the expansion
-    origin = _check_origin(origin, info, coord_frame, disp=True)
-    # Convert to the head frame
-    if coord_frame == 'meg' and info['dev_head_t'] is not None:
-        origin_head = apply_trans(info['dev_head_t'], origin)
-    else:
-        origin_head = origin
-    orig_origin, orig_coord_frame = origin, coord_frame
-    del origin, coord_frame
-    origin_head.setflags(write=False)
-    n_in, n_out = _get_n_moments([int_order, ext_order])
-
-    #
-    # Cross-talk processing
-    #
-    if cross_talk is not None:
-        sss_ctc = _read_ctc(cross_talk)
-        ctc_chs = sss_ctc['proj_items_chs']
-        meg_ch_names = [info['ch_names'][p] for p in meg_picks]
-        # checking for extra space ambiguity in channel names
-        # between old and new fif files
-        if meg_ch_names[0] not in ctc_chs:
-            ctc_chs = _clean_names(ctc_chs, remove_whitespace=True)
-        missing = sorted(list(set(meg_ch_names) - set(ctc_chs)))
-        if len(missing) != 0:
-            raise RuntimeError('Missing MEG channels in cross-talk matrix:\n%s'
-                               % missing)
-        missing = sorted(list(set(ctc_chs) - set(meg_ch_names)))
-        if len(missing) > 0:
-            warn('Not all cross-talk channels in raw:\n%s' % missing)
-        ctc_picks = [ctc_chs.index(info['ch_names'][c])
-                     for c in meg_picks[good_picks]]
-        assert len(ctc_picks) == len(good_picks)  # otherwise we errored
-        ctc = sss_ctc['decoupler'][ctc_picks][:, ctc_picks]
-        # I have no idea why, but MF transposes this for storage..
-        sss_ctc['decoupler'] = sss_ctc['decoupler'].T.tocsc()
-    else:
-        sss_ctc = dict()
-
-    #
-    # Translate to destination frame (always use non-fine-cal bases)
-    #
-    exp = dict(origin=origin_head, int_order=int_order, ext_order=0)
-    all_coils = _prep_mf_coils(info, ignore_ref)
-    S_recon = _trans_sss_basis(exp, all_coils, recon_trans, coil_scale)
-    exp['ext_order'] = ext_order
-    # Reconstruct data from internal space only (Eq. 38), and rescale S_recon
-    S_recon /= coil_scale
-    if recon_trans is not None:
-        # warn if we have translated too far
-        diff = 1000 * (info['dev_head_t']['trans'][:3, 3] -
-                       recon_trans['trans'][:3, 3])
-        dist = np.sqrt(np.sum(_sq(diff)))
-        if dist > 25.:
-            warn('Head position change is over 25 mm (%s) = %0.1f mm'
-                 % (', '.join('%0.1f' % x for x in diff), dist))
+    params = _prep_maxwell_filter(
+        info, origin, int_order, ext_order, calibration, cross_talk,
+        coord_frame, recon_trans, regularize, ignore_ref, bad_condition,
+        mag_scale)
+    meg_picks, good_picks, ctc, S_recon, _get_this_decomp_trans = [
+        params[key] for key in ('meg_picks', 'good_picks', 'ctc', 'S_recon',
+                                'get_decomp')]
 
     # Reconstruct raw file object with spatiotemporal processed data
     max_st = dict()
@@ -468,122 +436,295 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
             np.zeros(3)])
     else:
         this_pos_quat = None
-    _get_this_decomp_trans = partial(
-        _get_decomp, all_coils=all_coils,
-        cal=calibration, regularize=regularize,
-        exp=exp, ignore_ref=ignore_ref, coil_scale=coil_scale,
-        grad_picks=grad_picks, mag_picks=mag_picks, good_picks=good_picks,
-        mag_or_fine=mag_or_fine, bad_condition=bad_condition,
-        mag_scale=mag_scale)
+    # only the decomposition of the initial head position is cached on disk,
+    # those of each head position or tSSS window are seldom reused
     S_decomp, pS_decomp, reg_moments, n_use_in = _get_this_decomp_trans(
-        info['dev_head_t'], t=0.)
+        info['dev_head_t'], t=0., cache_dir=cache_dir)
     reg_moments_0 = reg_moments.copy()
-    # Loop through buffer windows of data
-    n_sig = int(np.floor(np.log10(max(len(starts), 0)))) + 1
-    logger.info('    Processing %s data chunk%s' % (len(starts), _pl(starts)))
-    for ii, (start, stop) in enumerate(zip(starts, stops)):
-        tsss_valid = (stop - start) >= st_duration
-        rel_times = raw_sss.times[start:stop]
-        t_str = '%8.3f - %8.3f sec' % tuple(rel_times[[0, -1]])
-        t_str += ('(#%d/%d)' % (ii + 1, len(starts))).rjust(2 * n_sig + 5)
+    # The decomposition in use, the head position it was computed for, and
+    # the approximations made with head_pos_tol
+    state = dict(S_decomp=S_decomp, pS_decomp=pS_decomp,
+                 reg_moments=reg_moments, n_use_in=n_use_in,
+                 decomp_quat=this_pos_quat, this_pos_quat=this_pos_quat,
+                 n_reused=0, n_decomp=0, max_dist=0., max_angle=0.)
+    del S_decomp, pS_decomp, reg_moments, n_use_in
+
+    def _prep_window(ii, start, stop):
+        """Get the data of a window, and do pre-tSSS or set up post-tSSS."""
+        w = dict(start=start, stop=stop, resid=None, orig_in_data=None,
+                 tsss_valid=(stop - start) >= st_duration,
+                 rel_times=raw_sss.times[start:stop])
+        t_str = '%8.3f - %8.3f sec' % tuple(w['rel_times'][[0, -1]])
+        w['t_str'] = t_str + ('(#%d/%d)' % (ii + 1, len(starts))).rjust(
+            2 * n_sig + 5)
 
         # Get original data
         orig_data = raw_sss._data[meg_picks[good_picks], start:stop]
         # This could just be np.empty if not st_only, but shouldn't be slow
         # this way so might as well just always take the original data
-        out_meg_data = raw_sss._data[meg_picks, start:stop]
+        w['out_meg_data'] = raw_sss._data[meg_picks, start:stop]
         # Apply cross-talk correction
         if cross_talk is not None:
             orig_data = ctc.dot(orig_data)
-        out_pos_data = np.empty((len(pos_picks), stop - start))
+        w['orig_data'] = orig_data
+        w['out_pos_data'] = np.empty((len(pos_picks), stop - start))
 
         # Figure out which positions to use
-        t_s_s_q_a = _trans_starts_stops_quats(head_pos, start, stop,
-                                              this_pos_quat)
-        n_positions = len(t_s_s_q_a[0])
+        w['t_s_s_q_a'] = _trans_starts_stops_quats(
+            head_pos, start, stop, state['this_pos_quat'])
+        w['n_positions'] = len(w['t_s_s_q_a'][0])
+        # the last position of this window starts the next one
+        state['this_pos_quat'] = w['t_s_s_q_a'][3][-1]
 
         # Set up post-tSSS or do pre-tSSS
         if st_correlation is not None:
             # If doing tSSS before movecomp...
-            resid = orig_data.copy()  # to be safe let's operate on a copy
+            w['resid'] = orig_data.copy()  # to be safe operate on a copy
             if st_when == 'after':
-                orig_in_data = np.empty((len(meg_picks), stop - start))
+                w['orig_in_data'] = np.empty((len(meg_picks), stop - start))
             else:  # 'before'
-                avg_trans = t_s_s_q_a[-1]
+                avg_trans = w['t_s_s_q_a'][-1]
                 if avg_trans is not None:
                     # if doing movecomp
                     S_decomp_st, pS_decomp_st, _, n_use_in_st = \
-                        _get_this_decomp_trans(avg_trans, t=rel_times[0])
+                        _get_this_decomp_trans(avg_trans,
+                                               t=w['rel_times'][0])
                 else:
-                    S_decomp_st, pS_decomp_st = S_decomp, pS_decomp
-                    n_use_in_st = n_use_in
-                orig_in_data = np.dot(np.dot(S_decomp_st[:, :n_use_in_st],
-                                             pS_decomp_st[:n_use_in_st]),
-                                      resid)
+                    S_decomp_st, pS_decomp_st = \
+                        state['S_decomp'], state['pS_decomp']
+                    n_use_in_st = state['n_use_in']
+                resid = w['resid']
+                w['orig_in_data'] = np.dot(
+                    np.dot(S_decomp_st[:, :n_use_in_st],
+                           pS_decomp_st[:n_use_in_st]), resid)
                 resid -= np.dot(np.dot(S_decomp_st[:, n_use_in_st:],
                                        pS_decomp_st[n_use_in_st:]), resid)
-                resid -= orig_in_data
+                resid -= w['orig_in_data']
+        return w
+
+    def _movecomp_window(w):
+        """Do movement compensation (and set up post-tSSS) for a window."""
+        orig_data, out_meg_data = w['orig_data'], w['out_meg_data']
+        for trans, rel_start, rel_stop, this_pos_quat in \
+                zip(*w['t_s_s_q_a'][:4]):
+            # Recalculate bases if necessary (trans will be None iff the
+            # first position in this interval is the same as last of the
+            # previous interval)
+            if trans is not None and head_pos_tol is not None:
+                dist = 1000 * np.sqrt(np.sum(_sq(
+                    this_pos_quat[3:6] - state['decomp_quat'][3:6])))
+                angle = np.rad2deg(_angle_between_quats(
+                    this_pos_quat[:3], state['decomp_quat'][:3]))
+                if dist <= head_pos_tol[0] and angle <= head_pos_tol[1]:
+                    trans = None  # close enough, use the last one
+                    state['n_reused'] += 1
+                    state['max_dist'] = max(state['max_dist'], dist)
+                    state['max_angle'] = max(state['max_angle'], angle)
+            if trans is not None:
+                (state['S_decomp'], state['pS_decomp'], state['reg_moments'],
+                 state['n_use_in']) = _get_this_decomp_trans(
+                    trans, t=w['rel_times'][rel_start])
+                state['decomp_quat'] = this_pos_quat
+                state['n_decomp'] += 1
+            S_decomp, pS_decomp = state['S_decomp'], state['pS_decomp']
+            n_use_in = state['n_use_in']
+
+            # Determine multipole moments for this interval
+            mm_in = np.dot(pS_decomp[:n_use_in],
+                           orig_data[:, rel_start:rel_stop])
+
+            # Our output data
+            if not st_only:
+                out_meg_data[:, rel_start:rel_stop] = np.dot(
+                    S_recon.take(state['reg_moments'][:n_use_in], axis=1),
+                    mm_in)
+            if len(pos_picks) > 0:
+                w['out_pos_data'][:, rel_start:rel_stop] = \
+                    this_pos_quat[:, np.newaxis]
+
+            # Transform orig_data to store just the residual
+            if st_when == 'after':
+                # Reconstruct data using original location from external
+                # and internal spaces and compute residual
+                rel_resid_data = w['resid'][:, rel_start:rel_stop]
+                w['orig_in_data'][:, rel_start:rel_stop] = \
+                    np.dot(S_decomp[:, :n_use_in], mm_in)
+                rel_resid_data -= np.dot(np.dot(S_decomp[:, n_use_in:],
+                                                pS_decomp[n_use_in:]),
+                                         rel_resid_data)
+                rel_resid_data -= w['orig_in_data'][:, rel_start:rel_stop]
+
+    # Loop through buffer windows of data. The tSSS projectors of n_jobs
+    # windows at a time are computed in parallel, everything else (which
+    # depends on the previous windows) is done in order.
+    parallel, p_fun, n_jobs = parallel_func(_get_tSSS_proj, n_jobs)
+    n_sig = int(np.floor(np.log10(max(len(starts), 0)))) + 1
+    logger.info('    Processing %s data chunk%s' % (len(starts), _pl(starts)))
+    for batch_start in range(0, len(starts), n_jobs):
+        windows = list()
+        for ii in range(batch_start, min(batch_start + n_jobs, len(starts))):
+            w = _prep_window(ii, starts[ii], stops[ii])
+            if st_when == 'after':
+                _movecomp_window(w)
+            windows.append(w)
+        if st_correlation is not None:
+            t_projs = parallel(
+                p_fun(w['orig_in_data'], w['resid'], st_correlation,
+                      w['tsss_valid']) for w in windows)
+        else:
+            t_projs = [None] * len(windows)
+        for w, t_proj in zip(windows, t_projs):
+            if st_when == 'before':
                 # Here we operate on our actual data
-                proc = out_meg_data if st_only else orig_data
-                _do_tSSS(proc, orig_in_data, resid, st_correlation,
-                         n_positions, t_str, tsss_valid)
-
-        if not st_only or st_when == 'after':
-            # Do movement compensation on the data
-            for trans, rel_start, rel_stop, this_pos_quat in \
-                    zip(*t_s_s_q_a[:4]):
-                # Recalculate bases if necessary (trans will be None iff the
-                # first position in this interval is the same as last of the
-                # previous interval)
-                if trans is not None:
-                    S_decomp, pS_decomp, reg_moments, n_use_in = \
-                        _get_this_decomp_trans(trans, t=rel_times[rel_start])
-
-                # Determine multipole moments for this interval
-                mm_in = np.dot(pS_decomp[:n_use_in],
-                               orig_data[:, rel_start:rel_stop])
-
-                # Our output data
-                if not st_only:
-                    out_meg_data[:, rel_start:rel_stop] = \
-                        np.dot(S_recon.take(reg_moments[:n_use_in], axis=1),
-                               mm_in)
-                if len(pos_picks) > 0:
-                    out_pos_data[:, rel_start:rel_stop] = \
-                        this_pos_quat[:, np.newaxis]
-
-                # Transform orig_data to store just the residual
-                if st_when == 'after':
-                    # Reconstruct data using original location from external
-                    # and internal spaces and compute residual
-                    rel_resid_data = resid[:, rel_start:rel_stop]
-                    orig_in_data[:, rel_start:rel_stop] = \
-                        np.dot(S_decomp[:, :n_use_in], mm_in)
-                    rel_resid_data -= np.dot(np.dot(S_decomp[:, n_use_in:],
-                                                    pS_decomp[n_use_in:]),
-                                             rel_resid_data)
-                    rel_resid_data -= orig_in_data[:, rel_start:rel_stop]
-
-        # If doing tSSS at the end
-        if st_when == 'after':
-            _do_tSSS(out_meg_data, orig_in_data, resid, st_correlation,
-                     n_positions, t_str, tsss_valid)
-        elif st_when == 'never' and head_pos[0] is not None:
-            logger.info('        Used % 2d head position%s for %s'
-                        % (n_positions, _pl(n_positions), t_str))
-        raw_sss._data[meg_picks, start:stop] = out_meg_data
-        raw_sss._data[pos_picks, start:stop] = out_pos_data
+                proc = w['out_meg_data'] if st_only else w['orig_data']
+                _do_tSSS(proc, t_proj, w['n_positions'], w['t_str'])
+            if not st_only and st_when != 'after':
+                _movecomp_window(w)
+            # If doing tSSS at the end
+            if st_when == 'after':
+                _do_tSSS(w['out_meg_data'], t_proj, w['n_positions'],
+                         w['t_str'])
+            elif st_when == 'never' and head_pos[0] is not None:
+                logger.info('        Used % 2d head position%s for %s'
+                            % (w['n_positions'], _pl(w['n_positions']),
+                               w['t_str']))
+            raw_sss._data[meg_picks, w['start']:w['stop']] = \
+                w['out_meg_data']
+            raw_sss._data[pos_picks, w['start']:w['stop']] = \
+                w['out_pos_data']
+        del windows, t_projs
+    if head_pos_tol is not None and head_pos[0] is not None:
+        logger.info('    Reused decompositions for %d/%d head position%s '
+                    '(max error %0.1f mm, %0.1f°)'
+                    % (state['n_reused'], state['n_reused'] +
+                       state['n_decomp'],
+                       _pl(state['n_reused'] + state['n_decomp']),
+                       state['max_dist'], state['max_angle']))
 
     # Update info
     if not st_only:
         info['dev_head_t'] = recon_trans  # set the reconstruction transform
-    _update_sss_info(raw_sss, orig_origin, int_order, ext_order,
-                     len(good_picks), orig_coord_frame, sss_ctc, sss_cal,
+    _update_sss_info(raw_sss.info, params['origin'], int_order, ext_order,
+                     len(good_picks), coord_frame, params['sss_ctc'],
+                     params['sss_cal'],
                      max_st, reg_moments_0, st_only)
     logger.info('[done]')
     return raw_sss
 
 
+def _check_maxwell_params(info, regularize, st_correlation, coord_frame,
+                          bad_condition):
+    """Check the parameters shared by maxwell_filter and RtMaxwellFilter."""
+    _check_usable(info)
+    _check_regularize(regularize)
+    st_correlation = float(st_correlation)
+    if st_correlation <= 0. or st_correlation > 1.:
+        raise ValueError('Need 0 < st_correlation <= 1., got %s'
+                         % st_correlation)
+    if coord_frame not in ('head', 'meg'):
+        raise ValueError('coord_frame must be either "head" or "meg", not "%s"'
+                         % coord_frame)
+    if not isinstance(bad_condition, string_types) or \
+            bad_condition not in ['error', 'warning', 'ignore', 'info']:
+        raise ValueError('bad_condition must be "error", "warning", "info", or'
+                         ' "ignore", not %s' % bad_condition)
+    if info['dev_head_t'] is None and coord_frame == 'head':
+        raise RuntimeError('coord_frame cannot be "head" because '
+                           'info["dev_head_t"] is None; if this is an '
+                           'empty room recording, consider using '
+                           'coord_frame="meg"')
+    return st_correlation
+
+
+def _prep_maxwell_filter(info, origin, int_order, ext_order, calibration,
+                         cross_talk, coord_frame, recon_trans, regularize,
+                         ignore_ref, bad_condition, mag_scale):
+    """Set up everything that only depends on the measurement info.
+
+    The sensor geometry in ``info`` is updated inplace by fine calibration.
+    """
+    meg_picks, mag_picks, grad_picks, good_picks, mag_or_fine = \
+        _get_mf_picks(info, int_order, ext_order, ignore_ref)
+
+    # Magnetometers are scaled to improve numerical stability
+    coil_scale, mag_scale = _get_coil_scale(
+        meg_picks, mag_picks, grad_picks, mag_scale, info)
+
+    #
+    # Fine calibration processing (load fine cal and overwrite sensor geometry)
+    #
+    sss_cal = dict()
+    if calibration is not None:
+        calibration, sss_cal = _update_sensor_geometry(info, calibration,
+                                                       ignore_ref)
+        mag_or_fine.fill(True)  # all channels now have some mag-type data
+
+    # Determine/check the origin of the expansion
+    origin = _check_origin(origin, info, coord_frame, disp=True)
+    # Convert to the head frame
+    if coord_frame == 'meg' and info['dev_head_t'] is not None:
+        origin_head = apply_trans(info['dev_head_t'], origin)
+    else:
+        origin_head = origin
+    origin_head.setflags(write=False)
+
+    #
+    # Cross-talk processing
+    #
+    if cross_talk is not None:
+        sss_ctc = _read_ctc(cross_talk)
+        ctc_chs = sss_ctc['proj_items_chs']
+        meg_ch_names = [info['ch_names'][p] for p in meg_picks]
+        # checking for extra space ambiguity in channel names
+        # between old and new fif files
+        if meg_ch_names[0] not in ctc_chs:
+            ctc_chs = _clean_names(ctc_chs, remove_whitespace=True)
+        missing = sorted(list(set(meg_ch_names) - set(ctc_chs)))
+        if len(missing) != 0:
+            raise RuntimeError('Missing MEG channels in cross-talk matrix:\n%s'
+                               % missing)
+        missing = sorted(list(set(ctc_chs) - set(meg_ch_names)))
+        if len(missing) > 0:
+            warn('Not all cross-talk channels in raw:\n%s' % missing)
+        ctc_picks = [ctc_chs.index(info['ch_names'][c])
+                     for c in meg_picks[good_picks]]
+        assert len(ctc_picks) == len(good_picks)  # otherwise we errored
+        ctc = sss_ctc['decoupler'][ctc_picks][:, ctc_picks]
+        # I have no idea why, but MF transposes this for storage..
+        sss_ctc['decoupler'] = sss_ctc['decoupler'].T.tocsc()
+    else:
+        sss_ctc = dict()
+        ctc = None
+
+    #
+    # Translate to destination frame (always use non-fine-cal bases)
+    #
+    exp = dict(origin=origin_head, int_order=int_order, ext_order=0)
+    all_coils = _prep_mf_coils(info, ignore_ref)
+    S_recon = _trans_sss_basis(exp, all_coils, recon_trans, coil_scale)
+    exp['ext_order'] = ext_order
+    # Reconstruct data from internal space only (Eq. 38), and rescale S_recon
+    S_recon /= coil_scale
+    if recon_trans is not None:
+        # warn if we have translated too far
+        diff = 1000 * (info['dev_head_t']['trans'][:3, 3] -
+                       recon_trans['trans'][:3, 3])
+        dist = np.sqrt(np.sum(_sq(diff)))
+        if dist > 25.:
+            warn('Head position change is over 25 mm (%s) = %0.1f mm'
+                 % (', '.join('%0.1f' % x for x in diff), dist))
+    get_decomp = partial(
+        _get_decomp, all_coils=all_coils,
+        cal=calibration, regularize=regularize,
+        exp=exp, ignore_ref=ignore_ref, coil_scale=coil_scale,
+        grad_picks=grad_picks, mag_picks=mag_picks, good_picks=good_picks,
+        mag_or_fine=mag_or_fine, bad_condition=bad_condition,
+        mag_scale=mag_scale)
+    return dict(meg_picks=meg_picks, good_picks=good_picks, origin=origin,
+                sss_cal=sss_cal, sss_ctc=sss_ctc, ctc=ctc, S_recon=S_recon,
+                get_decomp=get_decomp)
+
+
 def _get_coil_scale(meg_picks, mag_picks, grad_picks, mag_scale, info):
     """Get the magnetometer scale factor."""
     if isinstance(mag_scale, string_types):
@@ -737,14 +878,16 @@ def _trans_starts_stops_quats(pos, start, stop, this_pos_data):
     return trans, rel_starts, rel_stops, quats, avg_trans
 
 
-def _do_tSSS(clean_data, orig_in_data, resid, st_correlation,
-             n_positions, t_str, tsss_valid):
-    """Compute and apply SSP-like projection vectors based on min corr."""
+def _get_tSSS_proj(orig_in_data, resid, st_correlation, tsss_valid):
+    """Compute SSP-like projection vectors based on min corr."""
     if not tsss_valid:
-        t_proj = np.empty((clean_data.shape[1], 0))
-    else:
-        np.asarray_chkfinite(resid)
-        t_proj = _overlap_projector(orig_in_data, resid, st_correlation)
+        return np.empty((resid.shape[1], 0))
+    np.asarray_chkfinite(resid)
+    return _overlap_projector(orig_in_data, resid, st_correlation)
+
+
+def _do_tSSS(clean_data, t_proj, n_positions, t_str):
+    """Apply SSP-like projection vectors."""
     # Apply projector according to Eq. 12 in [2]_
     msg = ('        Projecting %2d intersecting tSSS component%s '
            'for %s' % (t_proj.shape[1], _pl(t_proj.shape[1], ' '), t_str))
@@ -835,20 +978,49 @@ def _check_pos(pos, head_frame, raw, st_fixed, sfreq):
 
 def _get_decomp(trans, all_coils, cal, regularize, exp, ignore_ref,
                 coil_scale, grad_picks, mag_picks, good_picks, mag_or_fine,
-                bad_condition, t, mag_scale):
+                bad_condition, t, mag_scale, cache_dir=None):
     """Get a decomposition matrix and pseudoinverse matrices."""
-    #
-    # Fine calibration processing (point-like magnetometers and calib. coeffs)
-    #
-    S_decomp = _get_s_decomp(exp, all_coils, trans, coil_scale, cal,
-                             ignore_ref, grad_picks, mag_picks, good_picks,
-                             mag_scale)
-
-    #
-    # Regularization
-    #
-    S_decomp, pS_decomp, sing, reg_moments, n_use_in = _regularize(
-        regularize, exp, S_decomp, mag_or_fine, t=t)
+    fname = None
+    if cache_dir is not None:
+        key = _get_decomp_key(trans, all_coils, cal, regularize, exp,
+                              ignore_ref, coil_scale, grad_picks, mag_picks,
+                              good_picks, mag_or_fine, mag_scale)
+        fname = op.join(cache_dir, 'sss_decomp_%032x.npz' % (key,))
+    if fname is not None and op.isfile(fname):
+        with np.load(fname) as fid:
+            S_decomp, pS_decomp, sing, reg_moments = [
+                fid[name] for name in ('S_decomp', 'pS_decomp', 'sing',
+                                       'reg_moments')]
+            n_use_in = int(fid['n_use_in'])
+        logger.info('        Using cached decomposition for %8.3f' % (t,))
+    else:
+        #
+        # Fine calibration processing (point-like magnetometers and calib.
+        # coeffs)
+        #
+        S_decomp = _get_s_decomp(exp, all_coils, trans, coil_scale, cal,
+                                 ignore_ref, grad_picks, mag_picks,
+                                 good_picks, mag_scale)
+
+        #
+        # Regularization
+        #
+        S_decomp, pS_decomp, sing, reg_moments, n_use_in = _regularize(
+            regularize, exp, S_decomp, mag_or_fine, t=t)
+        if fname is not None:
+            # write to a temporary file first so that concurrent runs never
+            # read a partial file
+            tmp_fname = '%s.%d.tmp' % (fname, os.getpid())
+            with open(tmp_fname, 'wb') as fid:
+                np.savez(fid, S_decomp=S_decomp, pS_decomp=pS_decomp,
+                         sing=sing, reg_moments=reg_moments,
+                         n_use_in=n_use_in)
+            try:
+                os.rename(tmp_fname, fname)
+            except OSError:  # on Windows, if another run wrote it already
+                if not op.isfile(fname):
+                    raise
+                os.remove(tmp_fname)
 
     # Pseudo-inverse of total multipolar moment basis set (Part of Eq. 37)
     cond = sing[0] / sing[-1]
@@ -868,6 +1040,27 @@ def _get_decomp(trans, all_coils, cal, regularize, exp, ignore_ref,
     return S_decomp, pS_decomp, reg_moments, n_use_in
 
 
+def _get_decomp_key(trans, all_coils, cal, regularize, exp, ignore_ref,
+                    coil_scale, grad_picks, mag_picks, good_picks,
+                    mag_or_fine, mag_scale):
+    """Hash everything that determines the decomposition."""
+    if isinstance(trans, Transform):
+        trans = trans['trans']
+    # the last element of the coil tuples is a (derived) dict of slices
+    if cal is not None:
+        cal = dict(grad_imbalances=cal['grad_imbalances'],
+                   mag_cals=cal['mag_cals'],
+                   grad_coilsets=[coils[:-1]
+                                  for coils in cal['grad_coilsets']])
+    return object_hash(dict(
+        version=__version__, trans=trans, all_coils=all_coils[:-1], cal=cal,
+        regularize=regularize, origin=exp['origin'],
+        int_order=exp['int_order'], ext_order=exp['ext_order'],
+        ignore_ref=ignore_ref, coil_scale=coil_scale, grad_picks=grad_picks,
+        mag_picks=mag_picks, good_picks=good_picks, mag_or_fine=mag_or_fine,
+        mag_scale=mag_scale))
+
+
 def _get_s_decomp(exp, all_coils, trans, coil_scale, cal, ignore_ref,
                   grad_picks, mag_picks, good_picks, mag_scale):
     """Get S_decomp."""
@@ -972,12 +1165,13 @@ def _check_regularize(regularize):
         raise ValueError('regularize must be None or "in"')
 
 
-def _check_usable(inst):
+def _check_usable(info):
     """Ensure our data are clean."""
-    if inst.proj:
+    projs = info['projs']
+    if len(projs) > 0 and all(proj['active'] for proj in projs):
         raise RuntimeError('Projectors cannot be applied to data during '
                            'Maxwell filtering.')
-    current_comp = inst.compensation_grade
+    current_comp = get_current_comp(info)
     if current_comp not in (0, None):
         raise RuntimeError('Maxwell filter cannot be done on compensated '
                            'channels, but data have been compensated with '
@@ -1430,14 +1624,14 @@ def _check_info(info, sss=True, tsss=True, calibration=True, ctc=True):
                                    'been applied, cannot reapply' % msg)
 
 
-def _update_sss_info(raw, origin, int_order, ext_order, nchan, coord_frame,
+def _update_sss_info(info, origin, int_order, ext_order, nchan, coord_frame,
                      sss_ctc, sss_cal, max_st, reg_moments, st_only):
     """Update info inplace after Maxwell filtering.
 
     Parameters
     ----------
-    raw : instance of mne.io.Raw
-        Data to be filtered
+    info : instance of Info
+        The measurement info of the filtered data.
     origin : array-like, shape (3,)
         Origin of internal and external multipolar moment space in head coords
         and in millimeters
@@ -1459,7 +1653,7 @@ def _update_sss_info(raw, origin, int_order, ext_order, nchan, coord_frame,
         Whether tSSS only was performed.
     """
     n_in, n_out = _get_n_moments([int_order, ext_order])
-    raw.info['maxshield'] = False
+    info['maxshield'] = False
     components = np.zeros(n_in + n_out).astype('int32')
     components[reg_moments] = 1
     sss_info_dict = dict(in_order=int_order, out_order=ext_order,
@@ -1474,9 +1668,9 @@ def _update_sss_info(raw, origin, int_order, ext_order, nchan, coord_frame,
         max_info_dict.update(sss_info=sss_info_dict, sss_cal=sss_cal,
                              sss_ctc=sss_ctc)
         # Reset 'bads' for any MEG channels since they've been reconstructed
-        _reset_meg_bads(raw.info)
+        _reset_meg_bads(info)
     block_id = _generate_meas_id()
-    raw.info['proc_history'].insert(0, dict(
+    info['proc_history'].insert(0, dict(
         max_info=max_info_dict, block_id=block_id, date=DATE_NONE,
         creator='mne-python v%s' % __version__, experimenter=''))
 
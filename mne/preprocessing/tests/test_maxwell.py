@@ -2,6 +2,7 @@
 #
 # License: BSD (3-clause)
 
+import os
 import os.path as op
 import numpy as np
 
@@ -12,7 +13,7 @@ from scipy import sparse
 import mne
 from mne import compute_raw_covariance, pick_types, concatenate_raws
 from mne.annotations import _annotations_starts_stops
-from mne.chpi import read_head_pos, filter_chpi
+from mne.chpi import read_head_pos, filter_chpi, rot_to_quat
 from mne.forward import _prep_meg_channels
 from mne.cov import _estimate_rank_meeg_cov
 from mne.datasets import testing
@@ -299,6 +300,99 @@ def test_other_systems():
     assert '80/80 in, 12/15 out' in log.getvalue()  # homogeneous fields
 
 
+def test_decomp_cache():
+    """Test caching of SSS decompositions on disk."""
+    tempdir = _TempDir()
+    cache_dir = op.join(tempdir, 'sss_cache')
+    raw = read_crop(fname_ctf_raw).apply_gradient_compensation(0)
+    kwargs = dict(origin=(0., 0., 0.04), ignore_ref=True, verbose=True)
+    raw_sss = maxwell_filter(raw, **kwargs)
+    with catch_logging() as log:
+        raw_sss_cache = maxwell_filter(raw, cache_dir=cache_dir, **kwargs)
+    assert 'cached' not in log.getvalue()
+    assert len(os.listdir(cache_dir)) == 1
+    assert_allclose(raw_sss_cache._data, raw_sss._data)
+    # a second run reuses the decomposition
+    with catch_logging() as log:
+        raw_sss_cache = maxwell_filter(raw, cache_dir=cache_dir, **kwargs)
+    assert 'Using cached decomposition' in log.getvalue()
+    assert_allclose(raw_sss_cache._data, raw_sss._data)
+    assert len(os.listdir(cache_dir)) == 1
+    # different parameters or bads get their own decomposition
+    maxwell_filter(raw, cache_dir=cache_dir, int_order=6, **kwargs)
+    raw.info['bads'] = [raw.ch_names[pick_types(raw.info, meg=True,
+                                                ref_meg=False)[0]]]
+    with catch_logging() as log:
+        maxwell_filter(raw, cache_dir=cache_dir, **kwargs)
+    assert 'cached' not in log.getvalue()
+    assert len(os.listdir(cache_dir)) == 3
+    # with movement compensation only the initial decomposition is cached
+    times = raw._first_time + np.arange(0, raw.times[-1], 0.1)
+    head_pos = np.zeros((len(times), 10))
+    head_pos[:, 0] = times
+    head_pos[:, 1:4] = rot_to_quat(raw.info['dev_head_t']['trans'][:3, :3])
+    head_pos[:, 4:7] = raw.info['dev_head_t']['trans'][:3, 3]
+    head_pos[:, 4] += np.linspace(0, 0.01, len(times))
+    maxwell_filter(raw, cache_dir=cache_dir, head_pos=head_pos, **kwargs)
+    assert len(os.listdir(cache_dir)) == 3
+    with pytest.raises(TypeError, match='cache_dir must be'):
+        maxwell_filter(raw, cache_dir=1, **kwargs)
+
+
+def test_head_pos_tol():
+    """Test reusing decompositions for small head movements."""
+    raw = read_crop(fname_ctf_raw).apply_gradient_compensation(0)
+    raw.load_data()
+    rng = np.random.RandomState(0)
+    # positions every 10 ms, jittered by up to 0.2 mm
+    times = raw._first_time + np.arange(0, raw.times[-1], 0.01)
+    head_pos = np.zeros((len(times), 10))
+    head_pos[:, 0] = times
+    head_pos[:, 1:4] = rot_to_quat(raw.info['dev_head_t']['trans'][:3, :3])
+    head_pos[:, 4:7] = raw.info['dev_head_t']['trans'][:3, 3]
+    head_pos[:, 4:7] += rng.uniform(-1e-4, 1e-4, (len(times), 3))
+    kwargs = dict(origin=(0., 0., 0.04), ignore_ref=True, head_pos=head_pos)
+    raw_sss = maxwell_filter(raw, **kwargs)
+    with catch_logging() as log:
+        raw_sss_0 = maxwell_filter(raw, head_pos_tol=(0., 0.), verbose=True,
+                                   **kwargs)
+    assert 'Reused decompositions for 0/%d' % len(times) in log.getvalue()
+    assert_allclose(raw_sss_0._data, raw_sss._data)
+    with catch_logging() as log:
+        raw_sss_tol = maxwell_filter(raw, head_pos_tol=(1., 1.), verbose=True,
+                                     **kwargs)
+    log = log.getvalue()
+    assert 'Reused decompositions for %d/%d' % ((len(times),) * 2) in log
+    assert '(max error 0.' in log
+    assert_meg_snr(raw_sss_tol, raw_sss, 20., 100.)
+    with pytest.raises(ValueError, match='head_pos_tol must be'):
+        maxwell_filter(raw, head_pos_tol=(1., -1.), **kwargs)
+
+
+@pytest.mark.parametrize('st_fixed, st_only', [(True, False), (False, False),
+                                               (True, True)])
+def test_tsss_n_jobs(st_fixed, st_only):
+    """Test that tSSS windows processed in parallel give the same result."""
+    raw = read_crop(fname_ctf_raw).apply_gradient_compensation(0)
+    raw.load_data()
+    head_pos = np.zeros((3, 10))
+    head_pos[:, 0] = raw._first_time + np.array([0., 0.15, 0.3])
+    head_pos[:, 1:4] = rot_to_quat(raw.info['dev_head_t']['trans'][:3, :3])
+    head_pos[:, 4:7] = raw.info['dev_head_t']['trans'][:3, 3]
+    head_pos[:, 4] += [0., 1e-3, 2e-3]
+    kwargs = dict(origin=(0., 0., 0.04), ignore_ref=True, st_duration=0.1,
+                  head_pos=head_pos, st_fixed=st_fixed, st_only=st_only)
+    if st_fixed:
+        raw_sss = maxwell_filter(raw, **kwargs)
+        raw_sss_par = maxwell_filter(raw, n_jobs=2, **kwargs)
+    else:
+        with pytest.warns(RuntimeWarning, match='untested'):
+            raw_sss = maxwell_filter(raw, **kwargs)
+        with pytest.warns(RuntimeWarning, match='untested'):
+            raw_sss_par = maxwell_filter(raw, n_jobs=2, **kwargs)
+    assert_array_equal(raw_sss_par._data, raw_sss._data)
+
+
 def test_spherical_conversions():
     """Test spherical harmonic conversions."""
     # Test our real<->complex conversion functions
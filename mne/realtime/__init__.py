@@ -10,5 +10,7 @@
 from .client import RtClient
 from .epochs import RtEpochs
 from .mockclient import MockRtClient
+from .maxwell import RtMaxwellFilter
+from .chpi import RtHeadPosition
 from .fieldtrip_client import FieldTripClient
 from .stim_server_client import StimServer, StimClient
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# License: BSD (3-clause)
+
+import copy
+import time
+
+import numpy as np
+
+from ..chpi import (_prep_chpi_positions, _fit_cHPI_amplitudes_data,
+                    _fit_chpi_position)
+from ..transforms import apply_trans, quat_to_rot
+from ..utils import logger, verbose
+from .utils import _LatencyMixin
+
+
+class RtHeadPosition(_LatencyMixin):
+    u"""Estimate the head position from streaming cHPI data.
+
+    The cHPI model is computed once from the measurement info. The last
+    ``t_window`` seconds of data are kept, and the head position is fit
+    every ``t_step`` seconds as soon as the data of its time window have
+    been received, starting from the previous fit. The head positions are
+    thus available with a delay of at most ``t_window`` seconds plus the
+    duration of a buffer (and the time taken to fit them).
+
+    Parameters
+    ----------
+    info : instance of Info
+        The measurement info of the data as they are received, e.g., from
+        ``client.get_measurement_info()``. It must contain the cHPI
+        information and the initial fit of the cHPI coils.
+    t_window : float
+        Time window in seconds used to estimate each head position.
+    t_step : float
+        Time step in seconds between head positions.
+    dist_limit : float
+        Minimum distance (m) to accept for coil position fitting.
+    gof_limit : float
+        Minimum goodness of fit to accept.
+    use_distances : bool
+        Use ``dist_limit`` to choose "good" coils based on pairwise
+        distances.
+    too_close : str
+        How to handle HPI positions too close to the sensors,
+        can be 'raise', 'warning', or 'info'.
+    solver : str
+        The solver used to fit the position of each coil, can be
+        ``'lm'`` (default) to use the Levenberg-Marquardt algorithm, which
+        is the fastest, or ``'cobyla'`` to use the same solver as for the
+        head positions computed offline.
+    latency : float | None
+        The time budget in seconds for processing a buffer. Buffers that
+        take longer are counted in ``n_late``. None (default) means no
+        budget.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see :func:`mne.verbose`
+        and :ref:`Logging documentation <tut_logging>` for more).
+
+    Attributes
+    ----------
+    info : instance of Info
+        The measurement info.
+    pos : ndarray, shape (n_pos, 10)
+        The ``[t, q1, q2, q3, x, y, z, gof, err, v]`` of each head position
+        fit so far (see :func:`mne.chpi.read_head_pos`). The time ``t`` is
+        the start of the fit window, in seconds since the first sample
+        processed. Windows whose fit failed are skipped.
+    n_buffers : int
+        The number of buffers processed.
+    n_late : int
+        The number of buffers that took longer than ``latency`` to process.
+    max_latency : float
+        The longest time in seconds taken to process a buffer.
+
+    See Also
+    --------
+    mne.realtime.RtEpochs
+    mne.realtime.RtMaxwellFilter
+
+    Notes
+    -----
+    .. versionadded:: 0.17
+    """
+
+    @verbose
+    def __init__(self, info, t_window=0.2, t_step=0.1, dist_limit=0.005,
+                 gof_limit=0.98, use_distances=True, too_close='raise',
+                 solver='lm', latency=None, verbose=None):  # noqa: D102
+        if t_step <= 0:
+            raise ValueError('t_step must be positive, got %s' % (t_step,))
+        if int(round(t_window * info['sfreq'])) < 1:
+            raise ValueError('t_window must be at least one sample long, got '
+                             '%s' % (t_window,))
+        self.info = copy.deepcopy(info)
+        hpi, self._hpi_dig_head_rrs, self._hpi_coil_dists, self._last = \
+            _prep_chpi_positions(self.info, t_window, t_step, too_close,
+                                 solver)
+        self._hpi = hpi
+        self._ref_dev_rrs = self._last['coil_dev_rrs']
+        self._fit_kwargs = dict(
+            t_window=t_window, dist_limit=dist_limit, gof_limit=gof_limit,
+            use_distances=use_distances, too_close=too_close, solver=solver)
+        self._n_step = max(int(round(t_step * self.info['sfreq'])), 1)
+        self._picks = hpi['meg_picks']
+        if hpi['hpi_pick'] is not None:
+            self._picks = np.append(self._picks, hpi['hpi_pick'])
+        self._init_latency(latency)
+        self.verbose = verbose
+        # the data kept, from sample self._n_samp - self._buffer.shape[1]
+        self._buffer = np.zeros((len(self._picks), 0))
+        self._n_samp = self._next_start = 0
+        self._pos = list()
+        logger.info('Prepared real-time head position estimation with %d '
+                    'cHPI coils' % hpi['n_freqs'])
+
+    @property
+    def pos(self):
+        """The head positions fit so far."""
+        return np.array(self._pos, np.float64).reshape(-1, 10)
+
+    @verbose
+    def process(self, data, verbose=None):
+        """Fit the head positions of the time windows completed by a buffer.
+
+        Parameters
+        ----------
+        data : array, shape (n_channels, n_times)
+            The buffer of data for all channels in ``info``, in SI units
+            (i.e., with the calibration applied).
+        verbose : bool, str, int, or None
+            If not None, override default verbose level (see
+            :func:`mne.verbose` and
+            :ref:`Logging documentation <tut_logging>` for more).
+            Defaults to self.verbose.
+
+        Returns
+        -------
+        pos : ndarray, shape (n_pos, 10)
+            The head positions of the windows completed by this buffer,
+            see ``pos``.
+        """
+        t_start = time.time()
+        data = np.asarray(data, float)
+        if data.ndim != 2 or data.shape[0] != self.info['nchan']:
+            raise ValueError('data must have shape (%d, n_times), got %s'
+                             % (self.info['nchan'], data.shape))
+        hpi = self._hpi
+        self._buffer = np.concatenate([self._buffer, data[self._picks]],
+                                      axis=1)
+        self._n_samp += data.shape[1]
+        offset = self._n_samp - self._buffer.shape[1]
+        starts = np.arange(self._next_start,
+                           self._n_samp - hpi['n_window'] + 1, self._n_step)
+        pos = list()
+        if len(starts) > 0:
+            time_sls = [slice(start - offset, start - offset + hpi['n_window'])
+                        for start in starts]
+            fit_times = starts / self.info['sfreq']
+            if hpi['hpi_pick'] is not None:
+                meg_data, chpi_data = self._buffer[:-1], self._buffer[-1:]
+            else:
+                meg_data, chpi_data = self._buffer, None
+            sin_fits = _fit_cHPI_amplitudes_data(meg_data, chpi_data,
+                                                 time_sls, hpi, fit_times)
+            for fit_time, sin_fit in zip(fit_times, sin_fits):
+                if sin_fit is None:
+                    continue
+                quat = _fit_chpi_position(
+                    sin_fit, fit_time, self._last, hpi,
+                    self._hpi_dig_head_rrs, self._hpi_coil_dists,
+                    **self._fit_kwargs)
+                if quat is not None:
+                    pos.append(quat)
+            self._next_start = starts[-1] + self._n_step
+        # only keep the data of the windows still to fit
+        self._buffer = self._buffer[:, max(self._next_start - offset, 0):]
+        self._pos.extend(pos)
+        self._update_latency(t_start)
+        return np.array(pos, np.float64).reshape(-1, 10)
+
+    def _get_displacement(self, tmin, tmax):
+        """Get the largest coil displacement (m) of the fits during a span.
+
+        The displacement of each coil is measured with respect to its
+        position in ``info['dev_head_t']``, using the fits whose time window
+        overlaps with ``[tmin, tmax]`` (0 if there are none).
+        """
+        pos = self.pos
+        pos = pos[(pos[:, 0] <= tmax) &
+                  (pos[:, 0] + self._fit_kwargs['t_window'] >= tmin)]
+        disp = 0.
+        for quat in pos[:, 1:7]:
+            trans = np.eye(4)
+            trans[:3, :3] = quat_to_rot(quat[:3])
+            trans[:3, 3] = quat[3:]
+            head_rrs = apply_trans(trans, self._ref_dev_rrs)
+            disp = max(disp, np.linalg.norm(
+                head_rrs - self._hpi_dig_head_rrs, axis=1).max())
+        return disp
+
+    def __repr__(self):  # noqa: D105
+        s = '%d cHPI coils, %d positions' % (self._hpi['n_freqs'],
+                                             len(self._pos))
+        s += self._latency_repr()
+        return '<RtHeadPosition | %s>' % s
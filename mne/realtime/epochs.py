@@ -109,6 +109,31 @@ class RtEpochs(BaseEpochs):
                                verbose='ERROR')
 
         See :func:`mne.find_events` for detailed explanation of these options.
+    sss : instance of RtMaxwellFilter | None
+        If not None, each raw buffer is Maxwell filtered with
+        :meth:`sss.process <mne.realtime.RtMaxwellFilter.process>` before
+        the epochs are extracted, and the measurement info of the epochs is
+        ``sss.info``. It must have been created from the measurement info
+        of ``client``.
+
+        .. versionadded:: 0.17
+    head_pos : instance of RtHeadPosition | None
+        If not None, each raw buffer is passed to
+        :meth:`head_pos.process <mne.realtime.RtHeadPosition.process>`
+        (before Maxwell filtering) to track the head position. It must have
+        been created from the measurement info of ``client``.
+
+        .. versionadded:: 0.17
+    reject_move : float | None
+        If not None, reject the epochs during which the head moved by more
+        than ``reject_move`` meters, i.e., the epochs for which a cHPI coil
+        is further than that from its position in ``info['dev_head_t']``
+        according to a head position of ``head_pos`` whose time window
+        overlaps with the epoch. Only the head positions available when the
+        epoch is received are used (the end of the epoch may not have been
+        fit yet). Requires ``head_pos``.
+
+        .. versionadded:: 0.17
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more). Defaults to
@@ -141,11 +166,32 @@ class RtEpochs(BaseEpochs):
                  sleep_time=0.1, baseline=(None, 0), picks=None,
                  reject=None, flat=None, proj=True,
                  decim=1, reject_tmin=None, reject_tmax=None, detrend=None,
-                 isi_max=2., find_events=None, verbose=None):  # noqa: D102
+                 isi_max=2., find_events=None, sss=None, head_pos=None,
+                 reject_move=None, verbose=None):  # noqa: D102
         info = client.get_measurement_info()
 
         # the measurement info of the data as we receive it
         self._client_info = copy.deepcopy(info)
+        if sss is not None:
+            if sss.info['ch_names'] != info['ch_names']:
+                raise ValueError('The channels of sss.info do not match the '
+                                 'channels of the client')
+            # the measurement info of the data after Maxwell filtering
+            info = copy.deepcopy(sss.info)
+        self._sss = sss
+        if head_pos is not None and \
+                head_pos.info['ch_names'] != self._client_info['ch_names']:
+            raise ValueError('The channels of head_pos.info do not match the '
+                             'channels of the client')
+        if reject_move is not None:
+            if head_pos is None:
+                raise ValueError('head_pos is required to use reject_move')
+            reject_move = float(reject_move)
+            if reject_move <= 0:
+                raise ValueError('reject_move must be positive, got %s'
+                                 % (reject_move,))
+        self._head_pos = head_pos
+        self.reject_move = reject_move
 
         verbose = client.verbose if verbose is None else verbose
 
@@ -408,6 +454,12 @@ class RtEpochs(BaseEpochs):
         # apply calibration without inplace modification
         raw_buffer = self._cals * raw_buffer
 
+        # track the head position and Maxwell filter the calibrated data
+        if self._head_pos is not None:
+            self._head_pos.process(raw_buffer)
+        if self._sss is not None:
+            raw_buffer = self._sss.process(raw_buffer)
+
         # detect events
         data = np.abs(raw_buffer[self._stim_picks]).astype(np.int)
         # if there is a previous buffer check the last samples from it too
@@ -515,6 +567,13 @@ class RtEpochs(BaseEpochs):
         # Decide if this is a good epoch
         is_good, offending_reasons = self._is_good_epoch(epoch,
                                                          verbose='ERROR')
+        if is_good and self.reject_move is not None:
+            sfreq = self._client_info['sfreq']
+            tmin = event_samp / sfreq + self.tmin
+            tmax = tmin + (len(self._raw_times) - 1) / sfreq
+            if self._head_pos._get_displacement(tmin, tmax) > \
+                    self.reject_move:
+                is_good, offending_reasons = False, ['MOVEMENT']
 
         if is_good:
             self._epoch_queue.append(epoch)
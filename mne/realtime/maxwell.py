@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# License: BSD (3-clause)
+
+import copy
+import time
+
+import numpy as np
+
+from ..io.pick import pick_types
+from ..preprocessing.maxwell import (_check_maxwell_params, _check_destination,
+                                     _check_info, _prep_maxwell_filter,
+                                     _get_tSSS_proj, _update_sss_info)
+from ..utils import logger, verbose
+from .utils import _LatencyMixin
+
+
+class RtMaxwellFilter(_LatencyMixin):
+    u"""Maxwell filter streaming MEG data one buffer at a time.
+
+    The SSS bases and their decomposition are computed once from the
+    measurement info, so that cleaning a buffer only takes one matrix
+    product. Optionally, temporal SSS (tSSS) is applied using the most
+    recent ``st_duration`` seconds of data, which makes each buffer more
+    expensive to process.
+
+    Parameters
+    ----------
+    info : instance of Info
+        The measurement info of the data as they are received, e.g., from
+        ``client.get_measurement_info()``.
+    origin : array-like, shape (3,) | str
+        Origin of internal and external multipolar moment space in meters.
+        See :func:`mne.preprocessing.maxwell_filter`.
+    int_order : int
+        Order of internal component of spherical expansion.
+    ext_order : int
+        Order of external component of spherical expansion.
+    calibration : str | None
+        Path to the ``'.dat'`` file with fine calibration coefficients.
+    cross_talk : str | None
+        Path to the FIF file with cross-talk correction information.
+    st_duration : float | None
+        If not None, apply tSSS using the last ``st_duration`` seconds of
+        data received (or the current buffer, if it is longer). tSSS is
+        only applied once that much data has been received.
+    st_correlation : float
+        Correlation limit between inner and outer subspaces used to reject
+        overlapping intersecting inner/outer signals during tSSS.
+    coord_frame : str
+        The coordinate frame that the ``origin`` is specified in, either
+        ``'meg'`` or ``'head'``.
+    destination : str | array-like, shape (3,) | None
+        The destination location for the head.
+        See :func:`mne.preprocessing.maxwell_filter`.
+    regularize : str | None
+        Basis regularization type, must be "in" or None.
+    ignore_ref : bool
+        If True, do not include reference channels in compensation.
+    bad_condition : str
+        How to deal with ill-conditioned SSS matrices. Can be "error"
+        (default), "warning", "info", or "ignore".
+    mag_scale : float | str
+        The magenetometer scale-factor, see
+        :func:`mne.preprocessing.maxwell_filter`.
+    latency : float | None
+        The time budget in seconds for processing a buffer. Buffers that
+        take longer are counted in ``n_late``. None (default) means no
+        budget.
+    verbose : bool, str, int, or None
+        If not None, override default verbose level (see :func:`mne.verbose`
+        and :ref:`Logging documentation <tut_logging>` for more).
+
+    Attributes
+    ----------
+    info : instance of Info
+        The measurement info of the filtered data, with MEG bad channels
+        reset (as they are reconstructed) and MEG projectors removed.
+    n_buffers : int
+        The number of buffers processed.
+    n_late : int
+        The number of buffers that took longer than ``latency`` to process.
+    max_latency : float
+        The longest time in seconds taken to process a buffer.
+
+    See Also
+    --------
+    mne.preprocessing.maxwell_filter
+    mne.realtime.RtEpochs
+
+    Notes
+    -----
+    Head movements are not compensated, the head position of ``info``
+    is used for all buffers.
+
+    .. versionadded:: 0.17
+    """
+
+    @verbose
+    def __init__(self, info, origin='auto', int_order=8, ext_order=3,
+                 calibration=None, cross_talk=None, st_duration=None,
+                 st_correlation=0.98, coord_frame='head', destination=None,
+                 regularize='in', ignore_ref=False, bad_condition='error',
+                 mag_scale=100., latency=None, verbose=None):  # noqa: D102
+        st_correlation = _check_maxwell_params(
+            info, regularize, st_correlation, coord_frame, bad_condition)
+        if st_duration is not None:
+            st_duration = float(st_duration)
+            if st_duration <= 0:
+                raise ValueError('st_duration must be positive, got %s'
+                                 % (st_duration,))
+            self._st_samp = max(int(round(st_duration * info['sfreq'])), 1)
+        else:
+            self._st_samp = None
+        _check_info(info, tsss=st_duration is not None,
+                    calibration=calibration is not None,
+                    ctc=cross_talk is not None)
+        self._st_correlation = st_correlation
+        self._init_latency(latency)
+
+        info = copy.deepcopy(info)
+        recon_trans = _check_destination(destination, info,
+                                         coord_frame == 'head')
+        params = _prep_maxwell_filter(
+            info, origin, int_order, ext_order, calibration, cross_talk,
+            coord_frame, recon_trans, regularize, ignore_ref, bad_condition,
+            mag_scale)
+        S_decomp, pS_decomp, reg_moments, n_use_in = params['get_decomp'](
+            info['dev_head_t'], t=0.)
+        self._n_chan = info['nchan']
+        self._meg_picks = params['meg_picks']
+        self._good_meg_picks = params['meg_picks'][params['good_picks']]
+        # Reconstruct data from internal space only (Eq. 38)
+        proj = np.dot(params['S_recon'].take(reg_moments[:n_use_in], axis=1),
+                      pS_decomp[:n_use_in])
+        # tSSS separates the internal space from the residual
+        in_op = np.dot(S_decomp[:, :n_use_in], pS_decomp[:n_use_in])
+        resid_op = np.eye(len(S_decomp)) - np.dot(S_decomp, pS_decomp)
+        ctc = params['ctc']
+        if ctc is not None:  # fold cross-talk correction into the operators
+            proj, in_op, resid_op = [ctc.T.dot(x.T).T
+                                     for x in (proj, in_op, resid_op)]
+        self._proj, self._in_op, self._resid_op = proj, in_op, resid_op
+        self.reset()
+
+        # the info of the output data
+        meg_names = set(info['ch_names'][pick]
+                        for pick in pick_types(info, meg=True, exclude=[]))
+        info['projs'] = [p for p in info['projs'] if not
+                         meg_names.intersection(p['data']['col_names'])]
+        max_st = dict()
+        if st_duration is not None:
+            max_st.update(job=10, subspcorr=st_correlation,
+                          buflen=self._st_samp / info['sfreq'])
+        info['dev_head_t'] = recon_trans
+        _update_sss_info(info, params['origin'], int_order, ext_order,
+                         len(self._good_meg_picks), coord_frame,
+                         params['sss_ctc'], params['sss_cal'], max_st,
+                         reg_moments, st_only=False)
+        self.info = info
+        logger.info('Prepared real-time Maxwell filtering of %d MEG channels'
+                    % len(self._meg_picks))
+
+    def reset(self):
+        """Discard the data kept for tSSS, e.g., after a gap in the data.
+
+        Returns
+        -------
+        sss : instance of RtMaxwellFilter
+            The object, modified inplace.
+        """
+        self._in_hist = self._resid_hist = self._out_hist = None
+        return self
+
+    def process(self, data):
+        """Maxwell filter a buffer of data.
+
+        Parameters
+        ----------
+        data : array, shape (n_channels, n_times)
+            The buffer of data for all channels in ``info``, in SI units
+            (i.e., with the calibration applied).
+
+        Returns
+        -------
+        data : array, shape (n_channels, n_times)
+            The filtered buffer. Non-MEG channels are copied unchanged.
+        """
+        t_start = time.time()
+        data = np.array(data, float)
+        if data.ndim != 2 or data.shape[0] != self._n_chan:
+            raise ValueError('data must have shape (%d, n_times), got %s'
+                             % (self._n_chan, data.shape))
+        orig_data = data[self._good_meg_picks]
+        out_meg_data = np.dot(self._proj, orig_data)
+        if self._st_samp is not None:
+            n_keep = max(self._st_samp, data.shape[1])
+            self._in_hist = _append_trim(
+                self._in_hist, np.dot(self._in_op, orig_data), n_keep)
+            self._resid_hist = _append_trim(
+                self._resid_hist, np.dot(self._resid_op, orig_data), n_keep)
+            self._out_hist = _append_trim(self._out_hist, out_meg_data,
+                                          n_keep)
+            if self._out_hist.shape[1] >= self._st_samp:
+                # Project the window, and keep the samples of this buffer
+                t_proj = _get_tSSS_proj(self._in_hist, self._resid_hist,
+                                        self._st_correlation, True)
+                out_meg_data -= np.dot(np.dot(self._out_hist, t_proj),
+                                       t_proj[-data.shape[1]:].T)
+        data[self._meg_picks] = out_meg_data
+        self._update_latency(t_start)
+        return data
+
+    def __repr__(self):  # noqa: D105
+        s = '%d MEG channels' % len(self._meg_picks)
+        if self._st_samp is not None:
+            s += ', tSSS over %d samples' % self._st_samp
+        s += self._latency_repr()
+        return '<RtMaxwellFilter | %s>' % s
+
+
+def _append_trim(hist, data, n_keep):
+    """Append data to a history buffer and keep the last n_keep samples."""
+    if hist is not None:
+        data = np.concatenate([hist, data], axis=1)
+    return data[:, -n_keep:]
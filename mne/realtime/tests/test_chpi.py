@@ -0,0 +1,118 @@
+import os.path as op
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from mne import (pick_types, pick_info, Dipole, make_sphere_model,
+                 make_forward_dipole, find_events)
+from mne.chpi import _calculate_chpi_positions
+from mne.io import read_info, RawArray
+from mne.realtime import MockRtClient, RtEpochs, RtHeadPosition
+from mne.simulation import simulate_raw
+from mne.transforms import rot_to_quat
+from mne.utils import run_tests_if_main
+
+base_dir = op.join(op.dirname(__file__), '..', '..', 'io', 'tests', 'data')
+raw_fname = op.join(base_dir, 'test_raw.fif')
+
+
+def _simulate_chpi_raw():
+    """Simulate cHPI data with a head movement of 6 mm at 3 s."""
+    info = read_info(raw_fname)
+    ncoil = len(info['hpi_results'][0]['order'])
+    info['hpi_subsystem'] = dict(
+        event_channel=u'STI201', ncoil=ncoil,
+        hpi_coils=[dict(event_bits=np.array([bit, 0, bit, bit], np.int32))
+                   for bit in (256, 512, 1024, 2048)])
+    for ci, freq in enumerate(10 + np.arange(ncoil) * 5):
+        info['hpi_meas'][0]['hpi_coils'][ci]['coil_freq'] = freq
+    picks = pick_types(info, meg=True, stim=True, eeg=False, exclude=[])
+    info['sfreq'] = 100.
+    info = pick_info(info, picks)
+    info['chs'][info['ch_names'].index('STI 001')]['ch_name'] = 'STI201'
+    info._update_redundant()
+    info['projs'] = []
+    trans = info['dev_head_t']['trans']
+    head_pos = np.zeros((2, 10))
+    head_pos[:, 0] = [0., 3.]
+    head_pos[:, 1:4] = rot_to_quat(trans[:3, :3])
+    head_pos[:, 4:7] = trans[:3, 3]
+    head_pos[1, 6] += 0.006
+    raw = RawArray(np.zeros((len(picks), 600)), info)
+    dip = Dipole([0., 0.1, 0.2], np.zeros((3, 3)), 1e-9 * np.ones(3),
+                 np.eye(3), np.ones(3), 'dip')
+    sphere = make_sphere_model('auto', 'auto', info=info,
+                               relative_radii=(1.0, 0.9), sigmas=(0.33, 0.3))
+    fwd, stc = make_forward_dipole(dip, sphere, info)
+    stc.resample(info['sfreq'])
+    raw = simulate_raw(raw, stc, None, fwd['src'], sphere, cov=None,
+                       blink=False, ecg=False, chpi=True, head_pos=head_pos,
+                       mindist=1.0, interp='zero', use_cps=True)
+    # events before and after the movement
+    stim_pick = raw.ch_names.index('STI 014')
+    raw._data[stim_pick] = 0.
+    raw._data[stim_pick, [100, 200, 350, 450]] = 1.
+    return raw
+
+
+def test_rt_head_position():
+    """Test real-time head position estimation."""
+    raw = _simulate_chpi_raw()
+    quats = _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=0.1,
+                                      solver='lm')
+    head_pos = RtHeadPosition(raw.info)
+    assert '0 positions' in repr(head_pos)
+    data = raw.get_data()
+    pos = [head_pos.process(data[:, start:start + 37])
+           for start in range(0, data.shape[1], 37)]
+    # the positions are fit as soon as their windows are complete
+    assert len(pos[0]) == 2  # windows of 20 samples, every 10 samples
+    assert len(pos[1]) == 4
+    pos = np.concatenate(pos)
+    assert_allclose(head_pos.pos, pos)
+    # the same fits as offline (the last window is not fit online, though)
+    assert len(pos) == 59
+    assert_allclose(pos, quats[:len(pos)], rtol=1e-7, atol=1e-10)
+    assert head_pos.n_buffers == 17
+    assert '59 positions, 17 buffers' in repr(head_pos)
+    assert head_pos._get_displacement(0.5, 2.5) < 1e-3
+    assert_allclose(head_pos._get_displacement(3.5, 4.5), 0.006, atol=1e-3)
+    pytest.raises(ValueError, head_pos.process, data[:10])
+
+    # errors
+    pytest.raises(ValueError, RtHeadPosition, raw.info, t_step=0.)
+    pytest.raises(ValueError, RtHeadPosition, raw.info, t_window=0.001)
+    pytest.raises(ValueError, RtHeadPosition, raw.info, solver='foo')
+
+
+def test_rt_epochs_reject_move():
+    """Test RtEpochs with on-line movement rejection."""
+    raw = _simulate_chpi_raw()
+    events = find_events(raw)
+    assert len(events) == 4
+    event_id, tmin, tmax = 1, -0.1, 0.3
+    head_pos = RtHeadPosition(raw.info, t_step=0.2)
+    rt_client = MockRtClient(raw)
+    rt_epochs = RtEpochs(rt_client, event_id, tmin, tmax, baseline=None,
+                         isi_max=0.5, head_pos=head_pos, reject_move=0.003)
+    rt_epochs.start()
+    rt_client.send_data(rt_epochs, np.arange(len(raw.ch_names)), tmin=0,
+                        tmax=6, buffer_size=50)
+    assert len(head_pos.pos) == 30
+    # the epochs after the head moved are dropped
+    assert len(rt_epochs.get_data()) == 2
+    assert_allclose(rt_epochs.events[:, 0], events[:2, 0])
+    assert rt_epochs.drop_log == [[], [], ['MOVEMENT'], ['MOVEMENT']]
+
+    # errors
+    pytest.raises(ValueError, RtEpochs, MockRtClient(raw), event_id, tmin,
+                  tmax, reject_move=0.003)
+    pytest.raises(ValueError, RtEpochs, MockRtClient(raw), event_id, tmin,
+                  tmax, head_pos=head_pos, reject_move=0.)
+    raw.pick_types(meg=True, stim=True, exclude=['STI201'])
+    pytest.raises(ValueError, RtEpochs, MockRtClient(raw), event_id, tmin,
+                  tmax, head_pos=head_pos)
+
+
+run_tests_if_main()
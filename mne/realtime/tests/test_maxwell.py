@@ -0,0 +1,120 @@
+import os.path as op
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from mne import Epochs, find_events, pick_types
+from mne.io import read_raw_fif
+from mne.preprocessing import maxwell_filter
+from mne.realtime import MockRtClient, RtEpochs, RtMaxwellFilter
+from mne.utils import run_tests_if_main
+
+base_dir = op.join(op.dirname(__file__), '..', '..', 'io', 'tests', 'data')
+raw_fname = op.join(base_dir, 'test_raw.fif')
+origin = (0., 0., 0.04)
+
+
+def _get_raw():
+    """Get raw data that can be Maxwell filtered."""
+    raw = read_raw_fif(raw_fname).crop(0, 5)
+    raw.load_data()
+    raw.info['projs'] = []  # they are active
+    raw.info['bads'] = ['MEG 2443']
+    return raw
+
+
+def _process(sss, data, buffer_size):
+    """Process data one buffer at a time."""
+    return np.concatenate([sss.process(data[:, start:start + buffer_size])
+                           for start in range(0, data.shape[1], buffer_size)],
+                          axis=1)
+
+
+def test_rt_maxwell_filter():
+    """Test real-time Maxwell filtering against maxwell_filter."""
+    raw = _get_raw()
+    meg_picks = pick_types(raw.info, meg=True, exclude=[])
+    raw_sss = maxwell_filter(raw, origin=origin)
+    sss = RtMaxwellFilter(raw.info, origin=origin, latency=10.)
+    assert 'MEG 2443' in raw.info['bads']
+    assert sss.info['bads'] == []
+    assert sss.info['proc_history'][0]['max_info']['sss_info']['nfree'] == \
+        raw_sss.info['proc_history'][0]['max_info']['sss_info']['nfree']
+    data = _process(sss, raw.get_data(), 123)
+    assert_allclose(data[meg_picks], raw_sss.get_data()[meg_picks],
+                    rtol=1e-6, atol=1e-20)
+    # other channels are left alone
+    non_meg = np.setdiff1d(np.arange(len(raw.ch_names)), meg_picks)
+    assert_allclose(data[non_meg], raw.get_data()[non_meg])
+    assert sss.n_buffers == 25
+    assert sss.n_late == 0
+    assert 0 < sss.max_latency < 10.
+    assert '25 buffers' in repr(sss)
+    pytest.raises(ValueError, sss.process, raw.get_data()[:10])
+
+    # tSSS with buffers that line up with the tSSS windows of maxwell_filter
+    n_samp = 600
+    st_duration = n_samp / raw.info['sfreq']
+    raw_tsss = maxwell_filter(raw, origin=origin, st_duration=st_duration)
+    sss = RtMaxwellFilter(raw.info, origin=origin, st_duration=st_duration)
+    assert 'tSSS over 600 samples' in repr(sss)
+    # the last window of maxwell_filter differs (it has leftover samples)
+    n_comp = 3 * n_samp
+    data = _process(sss, raw.get_data()[:, :n_comp], n_samp)
+    assert_allclose(data[meg_picks], raw_tsss.get_data()[meg_picks, :n_comp],
+                    rtol=1e-6, atol=1e-20)
+    # shorter buffers use a sliding window, and tSSS kicks in after a while
+    sss.reset()
+    data = _process(sss, raw.get_data()[:, :n_comp], 200)
+    assert_allclose(data[meg_picks, :400], raw_sss.get_data()[meg_picks, :400],
+                    rtol=1e-6, atol=1e-20)
+    assert_allclose(data[meg_picks, 400:n_samp],
+                    raw_tsss.get_data()[meg_picks, 400:n_samp],
+                    rtol=1e-6, atol=1e-20)
+    diff = data[meg_picks, n_samp:] - raw_tsss[meg_picks, n_samp:n_comp][0]
+    assert np.abs(diff).max() > 1e-3 * np.abs(data[meg_picks]).max()
+
+    # errors
+    pytest.raises(ValueError, RtMaxwellFilter, raw.info, st_duration=-1.)
+    pytest.raises(ValueError, RtMaxwellFilter, raw.info, st_correlation=0.)
+    pytest.raises(ValueError, RtMaxwellFilter, raw.info, coord_frame='foo')
+    raw_proj = read_raw_fif(raw_fname)
+    pytest.raises(RuntimeError, RtMaxwellFilter, raw_proj.info)
+
+
+def test_rt_epochs_maxwell_filter():
+    """Test RtEpochs with real-time Maxwell filtering."""
+    raw = _get_raw()
+    stim_channel = 'STI 001'
+    events = find_events(raw, stim_channel=stim_channel)
+    event_id, tmin, tmax = 5, -0.1, 0.3
+    raw_sss = maxwell_filter(raw, origin=origin)
+    picks = pick_types(raw_sss.info, meg=True, stim=True)
+    epochs = Epochs(raw_sss, events, event_id, tmin, tmax, picks=picks,
+                    baseline=None)
+    data = epochs.get_data()
+    assert len(data) == 4
+
+    sss = RtMaxwellFilter(raw.info, origin=origin)
+    rt_client = MockRtClient(raw)
+    rt_epochs = RtEpochs(rt_client, event_id, tmin, tmax, picks=picks,
+                         baseline=None, stim_channel=stim_channel,
+                         isi_max=0.5, sss=sss)
+    assert rt_epochs.info['bads'] == []
+    assert rt_epochs.info['proc_history'][0]['max_info']['sss_info']
+    rt_epochs.start()
+    # all channels must be sent to keep the calibration of each of them
+    rt_client.send_data(rt_epochs, np.arange(len(raw.ch_names)), tmin=0,
+                        tmax=5, buffer_size=100)
+    rt_data = rt_epochs.get_data()
+    assert_allclose(rt_data, data, rtol=1e-6, atol=1e-20)
+    assert sss.n_buffers == 31
+
+    # channel mismatch
+    raw.pick_types(meg=True, stim=True)
+    pytest.raises(ValueError, RtEpochs, MockRtClient(raw), event_id, tmin,
+                  tmax, stim_channel=stim_channel, sss=sss)
+
+
+run_tests_if_main()
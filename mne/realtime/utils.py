@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# License: BSD (3-clause)
+
+import time
+
+
+class _LatencyMixin(object):
+    """Keep track of the time taken to process each buffer."""
+
+    def _init_latency(self, latency):
+        self.latency = latency
+        self.n_buffers = self.n_late = 0
+        self.max_latency = 0.
+
+    def _update_latency(self, t_start):
+        """Count a buffer whose processing started at time t_start."""
+        latency = time.time() - t_start
+        self.n_buffers += 1
+        self.max_latency = max(self.max_latency, latency)
+        if self.latency is not None and latency > self.latency:
+            self.n_late += 1
+
+    def _latency_repr(self):
+        s = ', %d buffers (max latency %0.1f ms' % (
+            self.n_buffers, 1000 * self.max_latency)
+        if self.latency is not None:
+            s += ', %d over %0.1f ms' % (self.n_late, 1000 * self.latency)
+        return s + ')'
@@ -10,6 +10,10 @@
 #
 # License: Simplified BSD
 
+import os
+import os.path as op
+import sys
+
 import numpy as np
 from scipy import sparse
 
@@ -20,6 +24,11 @@ from ..utils import (split_list, logger, verbose, ProgressBar, warn, _pl,
 from ..source_estimate import SourceEstimate
 from ..externals.six import string_types
 
+# maximum number of statistics to compute at once for batches of permutations
+_PERM_BATCH_SIZE = 2 ** 22
+# number of permutations between writes of the checkpoint file
+_CHECKPOINT_SIZE = 1000
+
 
 def _get_clusters_spatial(s, neighbors):
     """Form spatial clusters using neighbor lists.
@@ -207,10 +216,30 @@ def _get_clusters_st(x_in, neighbors, max_step=1):
 
 def _get_components(x_in, connectivity, return_list=True):
     """Get connected components from a mask and a connectivity matrix."""
+    from scipy.sparse.csgraph import connected_components
+    if connectivity is not False and return_list:
+        # only label the subgraph of the points in the mask
+        idx = np.flatnonzero(x_in)
+        if len(idx) == 0:
+            return []
+        mask = np.logical_and(x_in[connectivity.row], x_in[connectivity.col])
+        lookup = np.empty(len(x_in), int)
+        lookup[idx] = np.arange(len(idx))
+        graph = sparse.coo_matrix(
+            (np.ones(np.count_nonzero(mask), np.int8),
+             (lookup[connectivity.row[mask]], lookup[connectivity.col[mask]])),
+            shape=(len(idx), len(idx)))
+        _, components = connected_components(graph, directed=False)
+        # components are numbered in the order of their first point
+        idx = idx[np.argsort(components, kind='mergesort')]
+        bounds = np.concatenate((
+            [0], np.flatnonzero(np.diff(np.sort(components))) + 1,
+            [len(idx)]))
+        return [idx[start:stop]
+                for start, stop in zip(bounds[:-1], bounds[1:])]
     if connectivity is False:
         components = np.arange(len(x_in))
     else:
-        from scipy.sparse.csgraph import connected_components
         mask = np.logical_and(x_in[connectivity.row], x_in[connectivity.col])
         data = connectivity.data[mask]
         row = connectivity.row[mask]
@@ -327,7 +356,6 @@ def _find_clusters(x, threshold, tail=0, connectivity=None, max_step=1,
                             'computation (h_power=%0.2f, e_power=%0.2f)'
                             % (len(thresholds), thresholds[0], thresholds[-1],
                                h_power, e_power))
-        scores = np.zeros(x.size)
     else:
         thresholds = [threshold]
         tfce = False
@@ -341,6 +369,22 @@ def _find_clusters(x, threshold, tail=0, connectivity=None, max_step=1,
     if tail == -1 and not np.all(np.diff(thresholds) < 0):
         raise ValueError('Thresholds must be monotonically decreasing')
 
+    if tfce is True:
+        # all thresholds are handled at once, see _tfce_1dir
+        heights = np.abs(np.diff(np.concatenate([[0.], thresholds])))
+        heights **= h_power
+        edges = _get_edges(x.shape, connectivity, max_step)
+        x_flat, include_flat = x.ravel(), include.ravel()
+        if tail == 0:
+            x_signs = [x_flat, -x_flat]
+        elif tail == -1:
+            x_signs, thresholds = [-x_flat], -thresholds
+        else:  # tail == 1
+            x_signs = [x_flat]
+        scores = sum(_tfce_1dir(x_sign, include_flat, thresholds, heights,
+                                e_power, edges) for x_sign in x_signs)
+        thresholds = []
+
     # set these here just in case thresholds == []
     clusters = list()
     sums = np.empty(0)
@@ -363,25 +407,6 @@ def _find_clusters(x, threshold, tail=0, connectivity=None, max_step=1,
                                                 ndimage)
                 clusters += out[0]
                 sums = np.concatenate((sums, out[1]))
-        if tfce is True:
-            # the score of each point is the sum of the h^H * e^E for each
-            # supporting section "rectangle" h x e.
-            if ti == 0:
-                h = abs(thresh)
-            else:
-                h = abs(thresh - thresholds[ti - 1])
-            h = h ** h_power
-            for c in clusters:
-                # triage based on cluster storage type
-                if isinstance(c, slice):
-                    len_c = c.stop - c.start
-                elif isinstance(c, tuple):
-                    len_c = len(c)
-                elif c.dtype == bool:
-                    len_c = np.sum(c)
-                else:
-                    len_c = len(c)
-                scores[c] += h * (len_c ** e_power)
     if tfce is True:
         # each point gets treated independently
         clusters = np.arange(x.size)
@@ -399,12 +424,124 @@ def _find_clusters(x, threshold, tail=0, connectivity=None, max_step=1,
     return clusters, sums
 
 
+def _get_edges(shape, connectivity, max_step):
+    """Get the pairs of connected points in the raveled data."""
+    if connectivity is None:  # lattice, as used by ndimage.label
+        idx = np.arange(np.prod(shape)).reshape(shape)
+        edges = [(np.take(idx, np.arange(n - 1), axis=ai).ravel(),
+                  np.take(idx, np.arange(1, n), axis=ai).ravel())
+                 for ai, n in enumerate(shape)]
+    elif connectivity is False:
+        edges = list()
+    elif isinstance(connectivity, list):  # spatial neighbors and time steps
+        n_src = len(connectivity)
+        n_times = int(np.prod(shape)) // n_src
+        row = np.repeat(np.arange(n_src),
+                        [len(neighbors) for neighbors in connectivity])
+        col = np.concatenate([np.asarray(neighbors, int)
+                              for neighbors in connectivity] + [[]])
+        offsets = np.arange(n_times)[:, np.newaxis] * n_src
+        edges = [((row + offsets).ravel(), (col + offsets).ravel())]
+        for step in range(1, max_step + 1):
+            idx = np.arange(n_src * max(n_times - step, 0))
+            edges.append((idx, idx + step * n_src))
+    else:
+        edges = [(connectivity.row, connectivity.col)]
+    if len(edges) == 0:
+        return np.empty(0, int), np.empty(0, int)
+    return (np.concatenate([edge[0] for edge in edges]).astype(int),
+            np.concatenate([edge[1] for edge in edges]).astype(int))
+
+
+def _find_roots(parents, nodes):
+    """Find the roots of nodes in a union-find forest, compressing paths."""
+    roots = parents[nodes]
+    while True:
+        up = parents[roots]
+        if np.array_equal(up, roots):
+            break
+        roots = up
+    parents[nodes] = roots
+    return roots
+
+
+def _tfce_1dir(x, include, thresholds, heights, e_power, edges):
+    """Compute the TFCE scores for all (increasing) thresholds at once.
+
+    The points exceeding a threshold form clusters that only grow when the
+    threshold is lowered, so they are merged with union-find in a single
+    sweep from the highest to the lowest threshold. Each cluster, while it
+    exists, adds ``height * size ** e_power`` for each of its
+    thresholds to the scores of all of its points, so the scores are the
+    sums of these contributions along the paths of the merge tree.
+    """
+    from scipy.sparse.csgraph import connected_components
+    n = len(x)
+    # number of thresholds exceeded by each point
+    levels = np.where(include, np.searchsorted(thresholds, x, 'left'), 0)
+    cum_heights = np.concatenate([[0.], np.cumsum(heights)])
+    # an edge connects its points for the thresholds both points exceed
+    edge_levels = np.minimum(levels[edges[0]], levels[edges[1]])
+    order = np.argsort(-edge_levels, kind='mergesort')
+    order = order[edge_levels[order] > 0]
+    edge_levels = edge_levels[order]
+    edges = (edges[0][order], edges[1][order])
+
+    # the merge tree has the points as leaves, the sentinel 2n is the parent
+    # of the roots
+    parents = np.full(2 * n, 2 * n)
+    union = np.arange(2 * n)
+    sizes = np.ones(2 * n)
+    tops = np.zeros(2 * n, int)  # the node exists below this level...
+    tops[:n] = levels
+    bottoms = np.zeros(2 * n, int)  # ... down to this one
+    groups = list()  # nodes created at each level
+    n_nodes = n
+    bounds = np.flatnonzero(np.diff(np.concatenate([[-1], edge_levels, [-1]])))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        level = edge_levels[start]
+        roots = [_find_roots(union, edge[start:stop]) for edge in edges]
+        mask = roots[0] != roots[1]
+        if not mask.any():
+            continue
+        roots, inverse = np.unique(np.concatenate(
+            [roots[0][mask], roots[1][mask]]), return_inverse=True)
+        inverse = inverse.reshape(2, -1)
+        graph = sparse.coo_matrix(
+            (np.ones(inverse.shape[1], np.int8), (inverse[0], inverse[1])),
+            shape=(len(roots), len(roots)))
+        n_new, labels = connected_components(graph, directed=False)
+        new_nodes = np.arange(n_nodes, n_nodes + n_new)
+        n_nodes += n_new
+        parents[roots] = union[roots] = new_nodes[labels]
+        bottoms[roots] = level
+        sizes[new_nodes] = np.bincount(labels, sizes[roots])
+        tops[new_nodes] = level
+        groups.append(new_nodes)
+    contributions = sizes ** e_power * (cum_heights[tops] -
+                                        cum_heights[bottoms])
+    # accumulate from the roots down to the leaves
+    scores = np.zeros(2 * n + 1)
+    for nodes in groups[::-1] + [np.arange(n)]:
+        scores[nodes] = contributions[nodes] + scores[parents[nodes]]
+    return scores[:n]
+
+
 def _find_clusters_1dir_parts(x, x_in, connectivity, max_step, partitions,
                               t_power, ndimage):
     """Deal with partitions, and pass the work to _find_clusters_1dir."""
     if partitions is None:
         clusters, sums = _find_clusters_1dir(x, x_in, connectivity, max_step,
                                              t_power, ndimage)
+    elif isinstance(connectivity, sparse.spmatrix):
+        # clusters cannot span partitions, so find them all at once and
+        # only sort them by partition
+        clusters, sums = _find_clusters_1dir(x, x_in, connectivity, max_step,
+                                             t_power, ndimage)
+        order = np.argsort([partitions[c[0]] for c in clusters],
+                           kind='mergesort')
+        clusters = [clusters[ii] for ii in order]
+        sums = sums[order]
     else:
         # cluster each partition separately
         clusters = list()
@@ -459,11 +596,14 @@ def _find_clusters_1dir(x, x_in, connectivity, max_step, t_power, ndimage):
             clusters = _get_clusters_st(x_in, connectivity, max_step)
         else:
             raise ValueError('Connectivity must be a sparse matrix or list')
-        if t_power == 1:
-            sums = np.array([np.sum(x[c]) for c in clusters])
+        if t_power != 1:
+            x = np.sign(x) * np.abs(x) ** t_power
+        if len(clusters) == 0:
+            sums = np.empty(0)
         else:
-            sums = np.array([np.sum(np.sign(x[c]) * np.abs(x[c]) ** t_power)
-                            for c in clusters])
+            # sum all the clusters at once
+            starts = np.cumsum([0] + [len(c) for c in clusters[:-1]])
+            sums = np.add.reduceat(x[np.concatenate(clusters)], starts)
 
     return clusters, np.atleast_1d(sums)
 
@@ -504,41 +644,86 @@ def _pval_from_histogram(T, H0, tail):
     return pval
 
 
-def _setup_connectivity(connectivity, n_vertices, n_times):
+def _setup_connectivity(connectivity, n_vertices, n_times, max_step=1):
     if not sparse.issparse(connectivity):
         raise ValueError("If connectivity matrix is given, it must be a"
                          "scipy sparse matrix.")
     if connectivity.shape[0] == n_vertices:  # use global algorithm
         connectivity = connectivity.tocoo()
-        n_times = None
     else:  # use temporal adjacency algorithm
         if not round(n_vertices / float(connectivity.shape[0])) == n_times:
             raise ValueError('connectivity must be of the correct size')
-        # we claim to only use upper triangular part... not true here
-        connectivity = (connectivity + connectivity.transpose()).tocsr()
-        connectivity = [connectivity.indices[connectivity.indptr[i]:
-                        connectivity.indptr[i + 1]] for i in
-                        range(len(connectivity.indptr) - 1)]
+        connectivity = _spatio_temporal_connectivity(connectivity, n_times,
+                                                     max_step)
     return connectivity
 
 
+def _spatio_temporal_connectivity(connectivity, n_times, max_step):
+    """Build the graph of all spatio-temporal points (time x space).
+
+    Each point is connected to its spatial neighbors at the same time point
+    and to itself up to max_step time points away. Only the upper triangular
+    part of the graph is kept, so that each edge is stored once.
+    """
+    n_src = connectivity.shape[0]
+    spatial = sparse.triu(connectivity + connectivity.transpose(), k=1)
+    spatial = sparse.coo_matrix((np.ones(spatial.nnz, np.int8),
+                                 (spatial.row, spatial.col)), spatial.shape)
+    graph = sparse.kron(sparse.eye(n_times, dtype=np.int8), spatial)
+    for step in range(1, max_step + 1):
+        graph = graph + sparse.kron(
+            sparse.eye(n_times, k=step, dtype=np.int8),
+            sparse.eye(n_src, dtype=np.int8))
+    return graph.tocsr().tocoo()
+
+
 def _do_permutations(X_full, slices, threshold, tail, connectivity, stat_fun,
                      max_step, include, partitions, t_power, orders,
                      sample_shape, buffer_size, progress_bar):
+    if stat_fun is f_oneway:
+        # compute the statistics of many permutations at once
+        stats = _f_oneway_batches(X_full, slices, orders)
+    else:
+        stats = _perm_stats(X_full, slices, stat_fun, orders, buffer_size)
+
+    # allocate space for output
+    max_cluster_sums = np.empty(len(orders), dtype=np.double)
+
+    for seed_idx, t_obs_surr in enumerate(stats):
+        # The stat should have the same shape as the samples for no conn.
+        if connectivity is None:
+            t_obs_surr.shape = sample_shape
+
+        # Find cluster on randomized stats
+        out = _find_clusters(t_obs_surr, threshold=threshold, tail=tail,
+                             max_step=max_step, connectivity=connectivity,
+                             partitions=partitions, include=include,
+                             t_power=t_power)
+        perm_clusters_sums = out[1]
+
+        if len(perm_clusters_sums) > 0:
+            max_cluster_sums[seed_idx] = np.max(perm_clusters_sums)
+        else:
+            max_cluster_sums[seed_idx] = 0
+
+        progress_bar.update(seed_idx + 1)
+
+    return max_cluster_sums
+
+
+def _perm_stats(X_full, slices, stat_fun, orders, buffer_size):
+    """Compute the statistic of each permutation of the samples."""
     n_samp, n_vars = X_full.shape
 
     if buffer_size is not None and n_vars <= buffer_size:
         buffer_size = None  # don't use buffer for few variables
 
-    # allocate space for output
-    max_cluster_sums = np.empty(len(orders), dtype=np.double)
-
     if buffer_size is not None:
         # allocate buffer, so we don't need to allocate memory during loop
         X_buffer = [np.empty((len(X_full[s]), buffer_size), dtype=X_full.dtype)
                     for s in slices]
 
-    for seed_idx, order in enumerate(orders):
+    for order in orders:
         # shuffle sample indices
         assert order is not None
         idx_shuffle_list = [order[s] for s in slices]
@@ -563,7 +748,52 @@ def _do_permutations(X_full, slices, threshold, tail, connectivity, stat_fun,
                 # apply stat_fun and store result
                 tmp = stat_fun(*X_buffer)
                 t_obs_surr[pos: pos + n_var_loop] = tmp[:n_var_loop]
+        yield t_obs_surr
+
+
+def _f_oneway_batches(X_full, slices, orders):
+    """Compute the F-values of batches of permutations (see f_oneway).
+
+    The sums over all samples do not depend on the permutation, so only the
+    sums of each group need to be computed, as one matrix product of the
+    group membership of the permuted samples with the data for each group.
+    """
+    n_samp, n_vars = X_full.shape
+    sum_alldata = np.sum(X_full, axis=0)
+    square_of_sums_alldata = sum_alldata ** 2 / float(n_samp)
+    sstot = np.sum(X_full ** 2, axis=0) - square_of_sums_alldata
+    dfbn = len(slices) - 1
+    dfwn = n_samp - len(slices)
+    n_batch = max(_PERM_BATCH_SIZE // max(n_vars, n_samp), 1)
+    for start in range(0, len(orders), n_batch):
+        batch = np.array(orders[start:start + n_batch])
+        rows = np.arange(len(batch))[:, np.newaxis]
+        ssbn = -square_of_sums_alldata
+        for s in slices:
+            members = np.zeros((len(batch), n_samp), X_full.dtype)
+            members[rows, batch[:, s]] = 1.
+            n_group = float(s.stop - s.start)
+            ssbn = ssbn + np.dot(members, X_full) ** 2 / n_group
+        sswn = sstot - ssbn
+        f = (ssbn / float(dfbn)) / (sswn / float(dfwn))
+        for t_obs_surr in f:
+            yield t_obs_surr
+
+
+def _do_1samp_permutations(X, slices, threshold, tail, connectivity, stat_fun,
+                           max_step, include, partitions, t_power, orders,
+                           sample_shape, buffer_size, progress_bar):
+    assert slices is None  # should be None for the 1 sample case
+    if stat_fun is ttest_1samp_no_p:
+        # compute the statistics of many permutations at once
+        stats = _ttest_1samp_batches(X, orders)
+    else:
+        stats = _1samp_perm_stats(X, stat_fun, orders, buffer_size)
+
+    # allocate space for output
+    max_cluster_sums = np.empty(len(orders), dtype=np.double)
 
+    for seed_idx, t_obs_surr in enumerate(stats):
         # The stat should have the same shape as the samples for no conn.
         if connectivity is None:
             t_obs_surr.shape = sample_shape
@@ -574,9 +804,10 @@ def _do_permutations(X_full, slices, threshold, tail, connectivity, stat_fun,
                              partitions=partitions, include=include,
                              t_power=t_power)
         perm_clusters_sums = out[1]
-
         if len(perm_clusters_sums) > 0:
-            max_cluster_sums[seed_idx] = np.max(perm_clusters_sums)
+            # get max with sign info
+            idx_max = np.argmax(np.abs(perm_clusters_sums))
+            max_cluster_sums[seed_idx] = perm_clusters_sums[idx_max]
         else:
             max_cluster_sums[seed_idx] = 0
 
@@ -585,29 +816,30 @@ def _do_permutations(X_full, slices, threshold, tail, connectivity, stat_fun,
     return max_cluster_sums
 
 
-def _do_1samp_permutations(X, slices, threshold, tail, connectivity, stat_fun,
-                           max_step, include, partitions, t_power, orders,
-                           sample_shape, buffer_size, progress_bar):
+def _get_signs(orders, n_samp):
+    """Convert sign-flip orders to signs."""
+    signs = 2 * np.array(orders, int).reshape(-1, n_samp) - 1
+    if not np.all(np.equal(np.abs(signs), 1)):
+        raise ValueError('signs from rng must be +/- 1')
+    return signs
+
+
+def _1samp_perm_stats(X, stat_fun, orders, buffer_size):
+    """Compute the statistic of each sign flip of the samples."""
     n_samp, n_vars = X.shape
-    assert slices is None  # should be None for the 1 sample case
 
     if buffer_size is not None and n_vars <= buffer_size:
         buffer_size = None  # don't use buffer for few variables
 
-    # allocate space for output
-    max_cluster_sums = np.empty(len(orders), dtype=np.double)
-
     if buffer_size is not None:
         # allocate a buffer so we don't need to allocate memory in loop
         X_flip_buffer = np.empty((n_samp, buffer_size), dtype=X.dtype)
 
-    for seed_idx, order in enumerate(orders):
+    for order in orders:
         assert isinstance(order, np.ndarray)
         # new surrogate data with specified sign flip
         assert order.size == n_samp  # should be guaranteed by parent
-        signs = 2 * order[:, None].astype(int) - 1
-        if not np.all(np.equal(np.abs(signs), 1)):
-            raise ValueError('signs from rng must be +/- 1')
+        signs = _get_signs(order, n_samp).T
 
         if buffer_size is None:
             # be careful about non-writable memmap (GH#1507)
@@ -633,27 +865,31 @@ def _do_1samp_permutations(X, slices, threshold, tail, connectivity, stat_fun,
                 # apply stat_fun and store result
                 tmp = stat_fun(X_flip_buffer)
                 t_obs_surr[pos: pos + n_var_loop] = tmp[:n_var_loop]
+        yield t_obs_surr
 
-        # The stat should have the same shape as the samples for no conn.
-        if connectivity is None:
-            t_obs_surr.shape = sample_shape
-
-        # Find cluster on randomized stats
-        out = _find_clusters(t_obs_surr, threshold=threshold, tail=tail,
-                             max_step=max_step, connectivity=connectivity,
-                             partitions=partitions, include=include,
-                             t_power=t_power)
-        perm_clusters_sums = out[1]
-        if len(perm_clusters_sums) > 0:
-            # get max with sign info
-            idx_max = np.argmax(np.abs(perm_clusters_sums))
-            max_cluster_sums[seed_idx] = perm_clusters_sums[idx_max]
-        else:
-            max_cluster_sums[seed_idx] = 0
 
-        progress_bar.update(seed_idx + 1)
+def _ttest_1samp_batches(X, orders):
+    """Compute the t-values of batches of sign flips (see ttest_1samp_no_p).
 
-    return max_cluster_sums
+    The means are computed as one matrix product of the signs with the data.
+    As in ttest_1samp_no_p, the variances are computed from the centered
+    data (not from the sum of squares, which is inaccurate when the mean is
+    large compared to the spread).
+    """
+    n_samp, n_vars = X.shape
+    # the centered data of a batch have n_batch * n_samp * n_vars values
+    n_batch = max(_PERM_BATCH_SIZE // (n_vars * n_samp), 1)
+    for start in range(0, len(orders), n_batch):
+        signs = _get_signs(orders[start:start + n_batch],
+                           n_samp).astype(X.dtype)
+        mean = np.dot(signs, X) / n_samp
+        # s * x - m == s * (x - s * m) as s ** 2 == 1
+        dev = X - signs[:, :, np.newaxis] * mean[:, np.newaxis]
+        var = np.sum(dev * dev, axis=1) / (n_samp - 1)
+        del dev
+        t = mean / np.sqrt(var / n_samp)
+        for t_obs_surr in t:
+            yield t_obs_surr
 
 
 def bin_perm_rep(ndim, a=0, b=1):
@@ -736,7 +972,8 @@ def _get_1samp_orders(n_samples, n_permutations, tail, rng):
 def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
                               connectivity, n_jobs, seed, max_step,
                               exclude, step_down_p, t_power, out_type,
-                              check_disjoint, buffer_size):
+                              check_disjoint, buffer_size, early_stop=None,
+                              checkpoint=None, split=None):
     n_jobs = check_n_jobs(n_jobs)
     """Aux Function.
 
@@ -767,7 +1004,8 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
     n_tests = X[0].shape[1]
 
     if connectivity is not None and connectivity is not False:
-        connectivity = _setup_connectivity(connectivity, n_tests, n_times)
+        connectivity = _setup_connectivity(connectivity, n_tests, n_times,
+                                           max_step)
 
     if (exclude is not None) and not exclude.size == n_tests:
         raise ValueError('exclude must be the same shape as X[0]')
@@ -835,6 +1073,14 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
     extra = ''
     rng = check_random_state(seed)
     del seed
+    split = _check_split(split, step_down_p, early_stop)
+    state = None
+    if checkpoint is not None:
+        state = _read_checkpoint(checkpoint)
+        if state is not None:
+            # use the random state of the interrupted run
+            rng.set_state(state['rng_state'])
+        rng_state = rng.get_state()
     if len(X) == 1:  # 1-sample test
         do_perm_func = _do_1samp_permutations
         X_full = X[0]
@@ -852,8 +1098,24 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
         orders = [rng.permutation(len(X_full))
                   for _ in range(n_permutations - 1)]
     del rng
+    n_orders = len(orders)
+    if split is not None:
+        orders = orders[split[0]::split[1]]
     parallel, my_do_perm_func, _ = parallel_func(
         do_perm_func, n_jobs, verbose=False)
+    early_stop = _check_early_stop(early_stop)
+    if early_stop and extra:
+        logger.info('Ignoring early_stop for the exact test')
+        early_stop = None
+    if state is not None:
+        _check_checkpoint(state, checkpoint, n_orders, tail, split,
+                          cluster_stats)
+        H0_steps = np.split(state['H0'], np.cumsum(state['H0_lengths'])[:-1])
+        logger.info('Resuming from checkpoint %s with %d permutation%s done'
+                    % (checkpoint, len(state['H0']) - len(H0_steps),
+                       _pl(len(state['H0']) - len(H0_steps))))
+    else:
+        H0_steps = list()
 
     if len(clusters) == 0:
         warn('No clusters found, returning empty H0, clusters, and cluster_pv')
@@ -876,14 +1138,6 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
                 this_include = include
         else:
             this_include = step_down_include
-        logger.info('Permuting %d times%s...' % (len(orders), extra))
-        with ProgressBar(len(orders), verbose_bool='auto') as progress_bar:
-            H0 = parallel(my_do_perm_func(X_full, slices, threshold, tail,
-                          connectivity, stat_fun, max_step, this_include,
-                          partitions, t_power, order, sample_shape,
-                          buffer_size, progress_bar.subset(idx))
-                          for idx, order in split_list(
-                              orders, n_jobs, idx=True))
         # include original (true) ordering
         if tail == -1:  # up tail
             orig = cluster_stats.min()
@@ -891,8 +1145,44 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
             orig = cluster_stats.max()
         else:
             orig = abs(cluster_stats).max()
-        H0.insert(0, [orig])
+        if len(H0_steps) > n_step_downs:  # restored from the checkpoint
+            H0 = [H0_steps[n_step_downs]]
+        else:
+            H0 = [np.array([orig])]
+        n_done = len(H0[0]) - 1
+        logger.info('Permuting %s%d times%s...'
+                    % ('at most ' if early_stop else '', len(orders), extra))
+        checks = _get_perm_bounds(len(orders), early_stop)
+        bounds = checks
+        if checkpoint is not None:
+            bounds = np.union1d(bounds, np.arange(
+                0, len(orders), _CHECKPOINT_SIZE)).astype(int).tolist()
+        with ProgressBar(len(orders), verbose_bool='auto') as progress_bar:
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                if stop > n_done:
+                    H0 += parallel(my_do_perm_func(
+                        X_full, slices, threshold, tail, connectivity,
+                        stat_fun, max_step, this_include, partitions,
+                        t_power, order, sample_shape, buffer_size,
+                        progress_bar.subset(start + idx))
+                        for idx, order in split_list(
+                            orders[start:stop], n_jobs, idx=True))
+                    if checkpoint is not None:
+                        _write_checkpoint(
+                            checkpoint, H0_steps[:n_step_downs] +
+                            [np.concatenate(H0)], rng_state, n_orders, tail,
+                            split, cluster_stats)
+                # checks before the restored permutations already failed
+                if stop >= n_done and stop in checks[1:-1] and \
+                        _pvals_resolved(cluster_stats, np.concatenate(H0),
+                                        tail, len(checks) - 1, **early_stop):
+                    logger.info('Stopping early, all cluster p-values are '
+                                'resolved after %d permutations'
+                                % (stop + 1,))
+                    break
         H0 = np.concatenate(H0)
+        del H0_steps[n_step_downs:]
+        H0_steps.append(H0)
         logger.info('Computing cluster p-values')
         cluster_pv = _pval_from_histogram(cluster_stats, H0, tail)
 
@@ -918,6 +1208,127 @@ def _permutation_cluster_test(X, threshold, n_permutations, tail, stat_fun,
     return t_obs, clusters, cluster_pv, H0
 
 
+def _check_early_stop(early_stop):
+    """Check the early_stop parameter, filling in the defaults."""
+    if early_stop is None:
+        return None
+    if not isinstance(early_stop, dict):
+        raise TypeError('early_stop must be a dict or None, got %s'
+                        % (type(early_stop),))
+    unknown = sorted(set(early_stop) - set(['alpha', 'confidence']))
+    if len(unknown) > 0:
+        raise KeyError('early_stop can only have the keys "alpha" and '
+                       '"confidence", got %s' % (unknown,))
+    out = dict(alpha=0.05, confidence=0.99)
+    out.update(early_stop)
+    for key, val in out.items():
+        if not 0 < val < 1:
+            raise ValueError('early_stop["%s"] must be between 0 and 1, got '
+                             '%s' % (key, val))
+    return out
+
+
+def _get_perm_bounds(n_orders, early_stop):
+    """Get the numbers of permutations after which p-values are checked."""
+    bounds = [0]
+    if early_stop:
+        # check after 100, 200, 400, ... permutations (including the
+        # original data)
+        n_perm = 100
+        while n_perm - 1 < n_orders:
+            bounds.append(n_perm - 1)
+            n_perm *= 2
+    bounds.append(n_orders)
+    return bounds
+
+
+def _pvals_resolved(cluster_stats, H0, tail, n_checks, alpha, confidence):
+    """Check if all cluster p-values are known to be below or above alpha.
+
+    This uses Clopper-Pearson intervals for the p-values, with the error
+    rate ``1 - confidence`` split across the ``n_checks`` checks.
+    """
+    from scipy.stats import beta
+    n = len(H0)
+    k = np.round(_pval_from_histogram(cluster_stats, H0, tail) * n)
+    err = (1. - confidence) / n_checks / 2.
+    with np.errstate(invalid='ignore'):
+        lower = np.where(k > 0, beta.ppf(err, k, n - k + 1), 0.)
+        upper = np.where(k < n, beta.ppf(1. - err, k + 1, n - k), 1.)
+    return bool(np.all((upper < alpha) | (lower > alpha)))
+
+
+def _check_split(split, step_down_p, early_stop):
+    """Check the split parameter."""
+    if split is None:
+        return None
+    try:
+        split = tuple(int(ii) for ii in split)
+    except (TypeError, ValueError):
+        raise TypeError('split must be a tuple of two int or None, got %s'
+                        % (split,))
+    if len(split) != 2 or not 0 <= split[0] < split[1]:
+        raise ValueError('split must be (index, n_splits) with '
+                         '0 <= index < n_splits, got %s' % (split,))
+    if step_down_p > 0 or early_stop is not None:
+        raise ValueError('split cannot be used with step_down_p > 0 or '
+                         'early_stop, as these need all permutations')
+    return split
+
+
+def _read_checkpoint(fname):
+    """Read the state of a permutation run, or None if there is none."""
+    if not op.isfile(fname):
+        # interrupted between removing the old checkpoint and renaming the
+        # new one (Python 2 on Windows), the latter is complete
+        fname = fname + '.tmp'
+        if sys.platform.startswith('win') and not hasattr(os, 'replace') \
+                and op.isfile(fname):
+            logger.info('Using temporary checkpoint file %s' % fname)
+        else:
+            return None
+    with np.load(fname) as fid:
+        state = dict((key, fid[key]) for key in fid.files)
+    state['rng_state'] = (str(state['rng_name']), state['rng_keys'],
+                          int(state['rng_pos']), int(state['rng_has_gauss']),
+                          float(state['rng_cached_gaussian']))
+    return state
+
+
+def _write_checkpoint(fname, H0_steps, rng_state, n_orders, tail, split,
+                      cluster_stats):
+    """Write the state of a permutation run."""
+    state = dict(
+        H0=np.concatenate(H0_steps),
+        H0_lengths=np.array([len(H0) for H0 in H0_steps]),
+        rng_name=rng_state[0], rng_keys=rng_state[1], rng_pos=rng_state[2],
+        rng_has_gauss=rng_state[3], rng_cached_gaussian=rng_state[4],
+        n_orders=n_orders, tail=tail,
+        split=(0, 1) if split is None else split,
+        cluster_stats=cluster_stats)
+    # write to a temporary file first so an interruption cannot corrupt it
+    tmp_fname = fname + '.tmp'
+    with open(tmp_fname, 'wb') as fid:
+        np.savez(fid, **state)
+    if hasattr(os, 'replace'):  # Python 3
+        os.replace(tmp_fname, fname)
+    else:
+        if sys.platform.startswith('win') and op.isfile(fname):
+            os.remove(fname)  # rename cannot overwrite, see _read_checkpoint
+        os.rename(tmp_fname, fname)
+
+
+def _check_checkpoint(state, fname, n_orders, tail, split, cluster_stats):
+    """Check that a checkpoint was written by the same permutation run."""
+    split = (0, 1) if split is None else split
+    if state['n_orders'] != n_orders or state['tail'] != tail or \
+            tuple(state['split']) != split or \
+            state['cluster_stats'].shape != cluster_stats.shape or \
+            not np.allclose(state['cluster_stats'], cluster_stats):
+        raise ValueError('The checkpoint file %s was written by a different '
+                         'permutation test, remove it to start over' % fname)
+
+
 def _check_fun(X, stat_fun, threshold, tail=0, kind='within'):
     """Check the stat_fun and threshold values."""
     from scipy import stats
@@ -957,7 +1368,8 @@ def permutation_cluster_test(
         X, threshold=None, n_permutations=1024, tail=0, stat_fun=None,
         connectivity=None, n_jobs=1, seed=None, max_step=1, exclude=None,
         step_down_p=0, t_power=1, out_type='mask', check_disjoint=False,
-        buffer_size=1000, verbose=None):
+        buffer_size=1000, early_stop=None, checkpoint=None, split=None,
+        verbose=None):
     """Cluster-level statistical permutation test.
 
     For a list of nd-arrays of data, e.g. 2d for time series or 3d for
@@ -1042,6 +1454,33 @@ def permutation_cluster_test(
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
         for a small block of variables.
+    early_stop : dict | None
+        If a dict, stop permuting once the p-value of every cluster is known
+        to be below or above ``early_stop['alpha']`` (default 0.05) with
+        probability ``early_stop['confidence']`` (default 0.99), so that
+        ``n_permutations`` is only the maximum number of permutations. The
+        p-values are checked after 100, 200, 400, ... permutations and
+        ``H0`` only contains the permutations that were run. Ignored for
+        exact tests. If None (default), all permutations are run.
+
+        .. versionadded:: 0.17
+    checkpoint : str | None
+        If a filename, the permutation results and the random state are
+        written to this file every 1000 permutations. If the file exists,
+        e.g. because a previous run was interrupted, the permutations are
+        resumed from it, giving the same results as an uninterrupted run.
+        If None (default), no file is written.
+
+        .. versionadded:: 0.17
+    split : tuple of int | None
+        If ``(index, n_splits)``, only run every ``n_splits``-th permutation
+        starting at ``index``, e.g. to spread the permutations across nodes
+        that use the same ``seed``. The results of all splits can be
+        combined with :func:`mne.stats.merge_cluster_splits`. Cannot be used
+        with ``step_down_p > 0`` or ``early_stop``. If None (default), all
+        permutations are run.
+
+        .. versionadded:: 0.17
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more).
@@ -1069,7 +1508,8 @@ def permutation_cluster_test(
         stat_fun=stat_fun, connectivity=connectivity, n_jobs=n_jobs, seed=seed,
         max_step=max_step, exclude=exclude, step_down_p=step_down_p,
         t_power=t_power, out_type=out_type, check_disjoint=check_disjoint,
-        buffer_size=buffer_size)
+        buffer_size=buffer_size, early_stop=early_stop,
+        checkpoint=checkpoint, split=split)
 
 
 @verbose
@@ -1077,7 +1517,8 @@ def permutation_cluster_1samp_test(
         X, threshold=None, n_permutations=1024, tail=0, stat_fun=None,
         connectivity=None, verbose=None, n_jobs=1, seed=None, max_step=1,
         exclude=None, step_down_p=0, t_power=1, out_type='mask',
-        check_disjoint=False, buffer_size=1000):
+        check_disjoint=False, buffer_size=1000, early_stop=None,
+        checkpoint=None, split=None):
     """Non-parametric cluster-level 1 sample t-test.
 
     From a array of observations, e.g. signal amplitudes or power spectrum
@@ -1163,6 +1604,33 @@ def permutation_cluster_1samp_test(
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
         for a small block of variables.
+    early_stop : dict | None
+        If a dict, stop permuting once the p-value of every cluster is known
+        to be below or above ``early_stop['alpha']`` (default 0.05) with
+        probability ``early_stop['confidence']`` (default 0.99), so that
+        ``n_permutations`` is only the maximum number of permutations. The
+        p-values are checked after 100, 200, 400, ... permutations and
+        ``H0`` only contains the permutations that were run. Ignored for
+        exact tests. If None (default), all permutations are run.
+
+        .. versionadded:: 0.17
+    checkpoint : str | None
+        If a filename, the permutation results and the random state are
+        written to this file every 1000 permutations. If the file exists,
+        e.g. because a previous run was interrupted, the permutations are
+        resumed from it, giving the same results as an uninterrupted run.
+        If None (default), no file is written.
+
+        .. versionadded:: 0.17
+    split : tuple of int | None
+        If ``(index, n_splits)``, only run every ``n_splits``-th permutation
+        starting at ``index``, e.g. to spread the permutations across nodes
+        that use the same ``seed``. The results of all splits can be
+        combined with :func:`mne.stats.merge_cluster_splits`. Cannot be used
+        with ``step_down_p > 0`` or ``early_stop``. If None (default), all
+        permutations are run.
+
+        .. versionadded:: 0.17
 
     Returns
     -------
@@ -1197,7 +1665,8 @@ def permutation_cluster_1samp_test(
         stat_fun=stat_fun, connectivity=connectivity, n_jobs=n_jobs, seed=seed,
         max_step=max_step, exclude=exclude, step_down_p=step_down_p,
         t_power=t_power, out_type=out_type, check_disjoint=check_disjoint,
-        buffer_size=buffer_size)
+        buffer_size=buffer_size, early_stop=early_stop,
+        checkpoint=checkpoint, split=split)
 
 
 @verbose
@@ -1206,7 +1675,7 @@ def spatio_temporal_cluster_1samp_test(
         stat_fun=None, connectivity=None, n_jobs=1, seed=None,
         max_step=1, spatial_exclude=None, step_down_p=0, t_power=1,
         out_type='indices', check_disjoint=False, buffer_size=1000,
-        verbose=None):
+        early_stop=None, checkpoint=None, split=None, verbose=None):
     """Non-parametric cluster-level 1 sample t-test for spatio-temporal data.
 
     This function provides a convenient wrapper for data organized in the form
@@ -1283,6 +1752,33 @@ def spatio_temporal_cluster_1samp_test(
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
         for a small block of variables.
+    early_stop : dict | None
+        If a dict, stop permuting once the p-value of every cluster is known
+        to be below or above ``early_stop['alpha']`` (default 0.05) with
+        probability ``early_stop['confidence']`` (default 0.99), so that
+        ``n_permutations`` is only the maximum number of permutations. The
+        p-values are checked after 100, 200, 400, ... permutations and
+        ``H0`` only contains the permutations that were run. Ignored for
+        exact tests. If None (default), all permutations are run.
+
+        .. versionadded:: 0.17
+    checkpoint : str | None
+        If a filename, the permutation results and the random state are
+        written to this file every 1000 permutations. If the file exists,
+        e.g. because a previous run was interrupted, the permutations are
+        resumed from it, giving the same results as an uninterrupted run.
+        If None (default), no file is written.
+
+        .. versionadded:: 0.17
+    split : tuple of int | None
+        If ``(index, n_splits)``, only run every ``n_splits``-th permutation
+        starting at ``index``, e.g. to spread the permutations across nodes
+        that use the same ``seed``. The results of all splits can be
+        combined with :func:`mne.stats.merge_cluster_splits`. Cannot be used
+        with ``step_down_p > 0`` or ``early_stop``. If None (default), all
+        permutations are run.
+
+        .. versionadded:: 0.17
     verbose : bool, str, int, or None
         If not None, override default verbose level (see :func:`mne.verbose`
         and :ref:`Logging documentation <tut_logging>` for more).
@@ -1329,7 +1825,8 @@ def spatio_temporal_cluster_1samp_test(
         n_permutations=n_permutations, connectivity=connectivity,
         n_jobs=n_jobs, seed=seed, max_step=max_step, exclude=exclude,
         step_down_p=step_down_p, t_power=t_power, out_type=out_type,
-        check_disjoint=check_disjoint, buffer_size=buffer_size)
+        check_disjoint=check_disjoint, buffer_size=buffer_size,
+        early_stop=early_stop, checkpoint=checkpoint, split=split)
 
 
 @verbose
@@ -1337,7 +1834,8 @@ def spatio_temporal_cluster_test(
         X, threshold=None, n_permutations=1024, tail=0, stat_fun=None,
         connectivity=None, verbose=None, n_jobs=1, seed=None, max_step=1,
         spatial_exclude=None, step_down_p=0, t_power=1, out_type='indices',
-        check_disjoint=False, buffer_size=1000):
+        check_disjoint=False, buffer_size=1000, early_stop=None,
+        checkpoint=None, split=None):
     """Non-parametric cluster-level test for spatio-temporal data.
 
     This function provides a convenient wrapper for data organized in the form
@@ -1410,6 +1908,33 @@ def spatio_temporal_cluster_test(
         processes is enabled (see set_cache_dir()), as X will be shared
         between processes and each process only needs to allocate space
         for a small block of variables.
+    early_stop : dict | None
+        If a dict, stop permuting once the p-value of every cluster is known
+        to be below or above ``early_stop['alpha']`` (default 0.05) with
+        probability ``early_stop['confidence']`` (default 0.99), so that
+        ``n_permutations`` is only the maximum number of permutations. The
+        p-values are checked after 100, 200, 400, ... permutations and
+        ``H0`` only contains the permutations that were run. Ignored for
+        exact tests. If None (default), all permutations are run.
+
+        .. versionadded:: 0.17
+    checkpoint : str | None
+        If a filename, the permutation results and the random state are
+        written to this file every 1000 permutations. If the file exists,
+        e.g. because a previous run was interrupted, the permutations are
+        resumed from it, giving the same results as an uninterrupted run.
+        If None (default), no file is written.
+
+        .. versionadded:: 0.17
+    split : tuple of int | None
+        If ``(index, n_splits)``, only run every ``n_splits``-th permutation
+        starting at ``index``, e.g. to spread the permutations across nodes
+        that use the same ``seed``. The results of all splits can be
+        combined with :func:`mne.stats.merge_cluster_splits`. Cannot be used
+        with ``step_down_p > 0`` or ``early_stop``. If None (default), all
+        permutations are run.
+
+        .. versionadded:: 0.17
 
     Returns
     -------
@@ -1440,7 +1965,8 @@ def spatio_temporal_cluster_test(
         n_permutations=n_permutations, connectivity=connectivity,
         n_jobs=n_jobs, seed=seed, max_step=max_step, exclude=exclude,
         step_down_p=step_down_p, t_power=t_power, out_type=out_type,
-        check_disjoint=check_disjoint, buffer_size=buffer_size)
+        check_disjoint=check_disjoint, buffer_size=buffer_size,
+        early_stop=early_stop, checkpoint=checkpoint, split=split)
 
 
 def _st_mask_from_s_inds(n_times, n_vertices, vertices, set_as=True):
@@ -1516,6 +2042,56 @@ def _reshape_clusters(clusters, sample_shape):
     return clusters
 
 
+def merge_cluster_splits(results):
+    """Merge the results of cluster permutation tests run in splits.
+
+    Parameters
+    ----------
+    results : list of tuple
+        The outputs of a cluster permutation test for all
+        ``split=(index, n_splits)`` values, sorted by ``index``. All splits
+        must have used the same data, parameters and ``seed``.
+
+    Returns
+    -------
+    T_obs : array
+        T-statistic observed for all variables.
+    clusters : list
+        List type defined by out_type above.
+    cluster_pv : array
+        P-value for each cluster, computed from all permutations.
+    H0 : array
+        Max cluster level stats observed under permutation, in the same
+        order as for a test run without splitting.
+
+    Notes
+    -----
+    .. versionadded:: 0.17
+    """
+    t_obs, clusters, _, H0 = results[0]
+    for result in results[1:]:
+        if result[0].shape != t_obs.shape or \
+                not np.array_equal(result[0], t_obs) or \
+                len(result[1]) != len(clusters) or \
+                len(result[3]) > 0 and result[3][0] != H0[0]:
+            raise ValueError('All results must come from the same test')
+    if len(clusters) == 0:
+        return results[0]
+    # each split includes the original statistic at the start of its H0
+    counts = sum(np.round(result[2] * len(result[3])) - 1
+                 for result in results) + 1
+    n_perms = [len(result[3]) - 1 for result in results]
+    H0 = np.empty(sum(n_perms) + 1)
+    H0[0] = results[0][3][0]
+    for index, result in enumerate(results):
+        if len(H0[1 + index::len(results)]) != n_perms[index]:
+            raise ValueError('results must contain all splits sorted by '
+                             'their index')
+        H0[1 + index::len(results)] = result[3][1:]
+    cluster_pv = counts / len(H0)
+    return t_obs, clusters, cluster_pv, H0
+
+
 def summarize_clusters_stc(clu, p_thresh=0.05, tstep=1e-3, tmin=0,
                            subject='fsaverage', vertices=None):
     """Assemble summary SourceEstimate from spatiotemporal cluster results.
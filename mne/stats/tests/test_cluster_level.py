@@ -9,7 +9,7 @@ import os
 import numpy as np
 from scipy import sparse, linalg, stats
 from numpy.testing import (assert_equal, assert_array_equal,
-                           assert_array_almost_equal)
+                           assert_array_almost_equal, assert_allclose)
 import pytest
 
 from mne.parallel import _force_serial
@@ -17,7 +17,12 @@ from mne.stats.cluster_level import (permutation_cluster_test, f_oneway,
                                      permutation_cluster_1samp_test,
                                      spatio_temporal_cluster_test,
                                      spatio_temporal_cluster_1samp_test,
-                                     ttest_1samp_no_p, summarize_clusters_stc)
+                                     ttest_1samp_no_p, summarize_clusters_stc,
+                                     _setup_connectivity, _get_components,
+                                     _get_clusters_st, _find_clusters,
+                                     _get_partitions_from_connectivity,
+                                     merge_cluster_splits,
+                                     _ttest_1samp_batches)
 from mne.utils import run_tests_if_main, _TempDir, catch_logging
 
 
@@ -128,6 +133,192 @@ def test_permutation_large_n_samples():
             assert len(np.unique(H0)) >= 1024 - (H0 == 0).sum()
 
 
+@pytest.mark.parametrize('batch_size', (1, 1000, 2 ** 22))
+def test_permutation_batches(batch_size, monkeypatch):
+    """Test that batches of permutations give the same H0."""
+    monkeypatch.setattr('mne.stats.cluster_level._PERM_BATCH_SIZE',
+                        batch_size)
+    condition1_1d, condition2_1d, condition1_2d, condition2_2d = \
+        _get_conditions()
+    kwargs = dict(n_permutations=50, seed=0, buffer_size=None)
+    for X in (condition1_1d, condition1_2d):
+        # the partial functions are not computed in batches
+        H0 = permutation_cluster_1samp_test(
+            X, stat_fun=ttest_1samp_no_p, threshold=1.67, **kwargs)[-1]
+        H0_single = permutation_cluster_1samp_test(
+            X, stat_fun=partial(ttest_1samp_no_p), threshold=1.67,
+            **kwargs)[-1]
+        assert_allclose(H0, H0_single, rtol=1e-10)
+    # sign flips that keep a large mean do not lose precision
+    X = condition1_2d.reshape(len(condition1_2d), -1) + 1e6
+    orders = np.ones((3, len(X)), int)
+    orders[1, 0] = orders[2, :2] = 0
+    want = [ttest_1samp_no_p(X * (2 * order - 1)[:, np.newaxis])
+            for order in orders]
+    assert_allclose(list(_ttest_1samp_batches(X, orders)), want, rtol=1e-10)
+    X = [condition1_1d, condition2_1d, condition1_1d[::-1] + 1]
+    H0 = permutation_cluster_test(
+        X, stat_fun=f_oneway, threshold=3., **kwargs)[-1]
+    H0_single = permutation_cluster_test(
+        X, stat_fun=partial(f_oneway), threshold=3., **kwargs)[-1]
+    assert_allclose(H0, H0_single, rtol=1e-10)
+
+
+def test_permutation_early_stop():
+    """Test early stopping of the permutations."""
+    rng = np.random.RandomState(0)
+    X = rng.randn(20, 50)
+    X[:, 10:20] += 2.  # strong effect
+    kwargs = dict(threshold=2., n_permutations=2000, seed=0, tail=1,
+                  buffer_size=None)
+    T_obs, clusters, p_full, H0_full = \
+        permutation_cluster_1samp_test(X, **kwargs)
+    with catch_logging() as log:
+        T_obs_es, clusters_es, p_es, H0_es = permutation_cluster_1samp_test(
+            X, early_stop=dict(), verbose=True, **kwargs)
+    assert 'Stopping early' in log.getvalue()
+    assert len(H0_es) < len(H0_full) == 2000
+    assert_array_equal(T_obs, T_obs_es)
+    assert_equal(len(clusters), len(clusters_es))
+    assert_array_equal(p_full < 0.05, p_es < 0.05)
+    # the permutations that are run are the same
+    assert_allclose(H0_es, H0_full[:len(H0_es)], rtol=1e-10)
+    # a small budget runs all permutations
+    kwargs['n_permutations'] = 50
+    H0 = permutation_cluster_1samp_test(X, early_stop=dict(), **kwargs)[-1]
+    assert_equal(len(H0), 50)
+    with pytest.raises(TypeError, match='dict or None'):
+        permutation_cluster_1samp_test(X, early_stop=0.05, **kwargs)
+    with pytest.raises(KeyError, match='can only have'):
+        permutation_cluster_1samp_test(X, early_stop=dict(foo=1), **kwargs)
+    with pytest.raises(ValueError, match='between 0 and 1'):
+        permutation_cluster_1samp_test(X, early_stop=dict(alpha=2), **kwargs)
+
+
+def test_permutation_checkpoint(monkeypatch):
+    """Test resuming and splitting permutations."""
+    import mne.stats.cluster_level as cl
+    monkeypatch.setattr(cl, '_CHECKPOINT_SIZE', 20)
+    write_checkpoint = cl._write_checkpoint
+
+    def _interrupt(n_writes):
+        calls = list()
+
+        def _write(*args):
+            write_checkpoint(*args)
+            calls.append(None)
+            if len(calls) == n_writes:
+                raise RuntimeError('Interrupted')
+        monkeypatch.setattr(cl, '_write_checkpoint', _write)
+
+    tempdir = _TempDir()
+    rng = np.random.RandomState(0)
+    X = rng.randn(9, 2, 10)
+    X[:, 0:2, 0:2] += 2
+    X[:, 1, 5:9] += 0.5
+    kwargs = dict(threshold=2, n_permutations=100, buffer_size=None)
+    # there are 5 writes per step, step_down_p=0.05 takes several steps
+    for ii, (step_down_p, n_writes_list) in enumerate(
+            ((0., (2,)), (0.05, (2, 7)))):
+        fname = os.path.join(tempdir, 'perm%d.npz' % ii)
+        t, clusters, p, H0 = permutation_cluster_1samp_test(
+            X, seed=0, step_down_p=step_down_p, **kwargs)
+        for n_writes in n_writes_list:
+            _interrupt(n_writes)
+            with pytest.raises(RuntimeError, match='Interrupted'):
+                permutation_cluster_1samp_test(
+                    X, seed=0, step_down_p=step_down_p, checkpoint=fname,
+                    **kwargs)
+            monkeypatch.setattr(cl, '_write_checkpoint', write_checkpoint)
+            # the random state is restored from the checkpoint
+            with catch_logging() as log:
+                t_2, clusters_2, p_2, H0_2 = permutation_cluster_1samp_test(
+                    X, seed=1, step_down_p=step_down_p, checkpoint=fname,
+                    verbose=True, **kwargs)
+            assert 'Resuming from checkpoint' in log.getvalue()
+            assert_array_equal(t, t_2)
+            assert_array_equal(p, p_2)
+            assert_allclose(H0, H0_2, rtol=1e-10)
+            os.remove(fname)
+    # a finished checkpoint gives the same results again
+    H0 = permutation_cluster_1samp_test(
+        X, seed=0, checkpoint=fname, **kwargs)[-1]
+    H0_2 = permutation_cluster_1samp_test(
+        X, seed=0, checkpoint=fname, **kwargs)[-1]
+    assert_array_equal(H0, H0_2)
+    with pytest.raises(ValueError, match='different permutation test'):
+        permutation_cluster_1samp_test(X, seed=0, checkpoint=fname, tail=1,
+                                       **kwargs)
+
+    # splits
+    kwargs['n_permutations'] = 101
+    Y = [X.reshape(len(X), -1), X.reshape(len(X), -1)[:, ::-1] + 0.5]
+    for func, X_ in ((permutation_cluster_1samp_test, X),
+                     (permutation_cluster_test, Y)):
+        out = func(X_, seed=0, **kwargs)
+        splits = [func(X_, seed=0, split=(ii, 3), **kwargs)
+                  for ii in range(3)]
+        assert_equal([len(split[-1]) for split in splits], [35, 34, 34])
+        t_2, clusters_2, p_2, H0_2 = merge_cluster_splits(splits)
+        assert_array_equal(out[0], t_2)
+        assert_allclose(out[2], p_2, rtol=1e-10)
+        assert_allclose(out[3], H0_2, rtol=1e-10)
+        with pytest.raises(ValueError, match='sorted by their index'):
+            merge_cluster_splits(splits[::-1])
+    with pytest.raises(ValueError, match='0 <= index < n_splits'):
+        permutation_cluster_1samp_test(X, split=(3, 3), **kwargs)
+    with pytest.raises(ValueError, match='step_down_p'):
+        permutation_cluster_1samp_test(X, split=(0, 3), step_down_p=0.05,
+                                       **kwargs)
+
+
+@pytest.mark.parametrize('max_step', (0, 1, 2))
+def test_spatio_temporal_components(max_step):
+    """Test clustering with the spatio-temporal graph."""
+    rng = np.random.RandomState(0)
+    n_times, n_src = 5, 30
+    # two disjoint chains of vertices
+    edges = [(ii, ii + 1) for ii in range(n_src - 1) if ii != 14]
+    row, col = np.array(edges).T
+    connectivity = sparse.coo_matrix((np.ones(len(row)), (row, col)),
+                                     (n_src, n_src))
+    graph = _setup_connectivity(connectivity, n_times * n_src, n_times,
+                                max_step)
+    assert graph.shape == (n_times * n_src,) * 2
+    assert np.all(graph.row < graph.col)  # each edge once
+    connectivity = (connectivity + connectivity.T).tocsr()
+    neighbors = [connectivity.indices[connectivity.indptr[ii]:
+                                      connectivity.indptr[ii + 1]]
+                 for ii in range(n_src)]
+    partitions = _get_partitions_from_connectivity(graph, n_times)
+    halves = np.tile(np.arange(n_src) > 14, n_times)
+    if max_step > 0:
+        assert_array_equal(partitions, halves)
+    else:  # each time point is separate
+        assert_array_equal(partitions, np.repeat(np.arange(n_times), n_src) *
+                           2 + halves)
+    for _ in range(10):
+        x = rng.randn(n_times * n_src)
+        x_in = x > 0.
+        clusters = _get_components(x_in, graph)
+        want = _get_clusters_st(x_in, neighbors, max_step)
+        assert (sorted(tuple(np.sort(c)) for c in clusters) ==
+                sorted(tuple(np.sort(c)) for c in want))
+        # clusters are ordered by their first point, with sorted points
+        assert_array_equal([c[0] for c in clusters],
+                           np.sort([c.min() for c in clusters]))
+        for c in clusters:
+            assert_array_equal(c, np.sort(c))
+        # partitions sort the same clusters by partition
+        _, sums = _find_clusters(x, 0., 1, graph)
+        clusters_parts, sums_parts = _find_clusters(
+            x, 0., 1, graph, partitions=partitions)
+        assert_allclose(np.sort(sums), np.sort(sums_parts))
+        assert np.all(np.diff([partitions[c[0]]
+                               for c in clusters_parts]) >= 0)
+        assert_allclose(sums, [x[c].sum() for c in clusters])
+
+
 def test_permutation_step_down_p():
     """Test cluster level permutations with step_down_p."""
     try:
@@ -569,4 +760,35 @@ def test_tfce_thresholds():
                   threshold=dict(start=1, step=-0.5))
 
 
+@pytest.mark.parametrize('tail', (-1, 0, 1))
+def test_tfce_scores(tail):
+    """Test TFCE scores against clustering at each threshold."""
+    rng = np.random.RandomState(0)
+    n_times, n_src = 4, 12
+    connectivity = sparse.coo_matrix(
+        (np.ones(n_src - 1), (np.arange(n_src - 1), np.arange(1, n_src))),
+        (n_src, n_src))
+    graph = _setup_connectivity(connectivity, n_times * n_src, n_times)
+    step = -0.25 if tail == -1 else 0.25
+    threshold = dict(start=0, step=step, h_power=2, e_power=0.5)
+    for shape, conn in (((50,), None), ((6, 8), None), ((50,), False),
+                        ((n_times * n_src,), graph)):
+        x = rng.randn(*shape) * 2
+        include = rng.rand(*shape) > 0.1
+        _, scores = _find_clusters(x, threshold, tail, conn, include=include)
+        want = np.zeros(x.size)
+        stop = np.abs(x).max() if tail == 0 else tail * (tail * x).max()
+        # the first threshold (0) has a height of 0
+        for thresh in np.arange(0, stop, step)[1:]:
+            # at each threshold, all points of a cluster get h ** 2 * e ** .5
+            for sign in ((1, -1) if tail == 0 else (tail,)):
+                clusters, _ = _find_clusters(sign * x, abs(thresh), 1, conn,
+                                             include=include)
+                for c in clusters:
+                    mask = np.zeros(x.size, bool)
+                    mask[c] = True
+                    want[mask] += step ** 2 * mask.sum() ** 0.5
+        assert_allclose(scores, want, atol=1e-12)
+
+
 run_tests_if_main()
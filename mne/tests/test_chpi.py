@@ -17,7 +17,9 @@ from mne.io.constants import FIFF
 from mne.chpi import (_calculate_chpi_positions, _calculate_chpi_coil_locs,
                       _calculate_head_pos_ctf, head_pos_to_trans_rot_t,
                       read_head_pos, write_head_pos, filter_chpi,
-                      _get_hpi_info, _get_hpi_initial_fit)
+                      _get_hpi_info, _get_hpi_initial_fit,
+                      _setup_hpi_struct, _fit_cHPI_amplitudes,
+                      _iter_cHPI_amplitudes)
 from mne.transforms import rot_to_quat, _angle_between_quats
 from mne.simulation import simulate_raw
 from mne.utils import run_tests_if_main, _TempDir, catch_logging
@@ -341,6 +343,28 @@ def test_simulate_calculate_chpi_positions():
         t_step_max=raw.info['sfreq'] * head_pos_sfreq_quotient, t_window=1.0)
     _assert_quats(quats, dev_head_pos, dist_tol=0.001, angle_tol=1.)
 
+    # parallel fitting and the LM solver give (nearly) the same positions
+    for kwargs in (dict(n_jobs=2), dict(solver='lm')):
+        quats_2 = _calculate_chpi_positions(
+            raw, t_step_min=raw.info['sfreq'] * head_pos_sfreq_quotient,
+            t_step_max=raw.info['sfreq'] * head_pos_sfreq_quotient,
+            t_window=1.0, **kwargs)
+        _assert_quats(quats_2, quats, dist_tol=1e-4, angle_tol=0.1)
+    pytest.raises(ValueError, _calculate_chpi_positions, raw, solver='foo')
+
+    # amplitudes fit for many windows at once match those of single windows
+    hpi = _setup_hpi_struct(raw.info, 100)
+    fit_idxs = np.arange(0, len(raw.times) + 50, 30)  # partial windows, too
+    n_fit = 0
+    for midpt, (fit_time, sin_fit) in zip(
+            fit_idxs, _iter_cHPI_amplitudes(raw, fit_idxs, hpi)):
+        time_sl = slice(max(midpt - 50, 0), min(midpt + 50, len(raw.times)))
+        assert_allclose(fit_time, (midpt - 50) / raw.info['sfreq'])
+        assert_allclose(sin_fit, _fit_cHPI_amplitudes(raw, time_sl, hpi, 0.),
+                        atol=1e-10)
+        n_fit += 1
+    assert n_fit == len(fit_idxs)
+
 
 @testing.requires_testing_data
 def test_calculate_chpi_coil_locs():
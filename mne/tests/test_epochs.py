@@ -886,6 +886,34 @@ def test_split_saving(tmpdir):
         assert_array_equal(epochs.events, epochs2.events)
 
 
+def test_chunked_saving(tmpdir):
+    """Test saving non-preloaded epochs chunk by chunk."""
+    tempdir = str(tmpdir)
+    raw, events, picks = _get_data()
+    epochs = Epochs(raw, events, None, tmin, tmax, picks=picks,
+                    reject=reject, flat=flat)
+    epochs_data = epochs.copy().get_data()
+    fname = op.join(tempdir, 'test-epo.fif')
+    for chunk_size in (None, 1, 4):
+        epochs.save(fname, fmt='double', chunk_size=chunk_size)
+        assert not epochs.preload
+        assert epochs._data is None
+        epochs_read = read_epochs(fname)
+        assert_allclose(epochs_read.get_data(), epochs_data, rtol=1e-7)
+        assert_array_equal(epochs_read.events, epochs.events)
+        assert_equal(epochs_read.drop_log, epochs.drop_log)
+    # splits
+    epochs.save(fname, split_size='1MB', chunk_size=3)
+    assert op.isfile(fname[:-4] + '-1.fif')
+    epochs_read = read_epochs(fname)
+    assert_allclose(epochs_read.get_data(), epochs_data, rtol=1e-6,
+                    atol=1e-20)
+    # preloaded data are not modified when saving
+    epochs.load_data()
+    epochs.save(fname, chunk_size=2)
+    assert_array_equal(epochs.get_data(), epochs_data)
+
+
 def test_epochs_proj(tmpdir):
     """Test handling projection (apply proj in Raw or in Epochs)."""
     tempdir = str(tmpdir)
@@ -1120,6 +1148,42 @@ def test_preload_epochs():
                               epochs.average().data, 18)
 
 
+def test_batched_epochs_reading():
+    """Test that epochs read in batches match one-at-a-time reading."""
+    raw, events, picks = _get_data()
+    onset = (events[5, 0] - raw.first_samp) / raw.info['sfreq']
+    raw.set_annotations(Annotations([onset, onset + 5.], [0.1, 0.5],
+                                    ['BAD_a', 'foo']))
+    events = events.copy()
+    # one epoch starting before the data and one going past the end
+    events[0, 0] = raw.first_samp + 10
+    events[-1, 0] = raw.last_samp - 10
+    for kwargs in (dict(), dict(detrend=1, decim=3),
+                   dict(proj='delayed', reject=reject, flat=flat),
+                   dict(reject=reject, reject_tmin=0., reject_tmax=0.1)):
+        epochs = Epochs(raw, events, None, tmin, tmax, picks=picks,
+                        **kwargs)
+        expected, drop_log = list(), deepcopy(epochs.drop_log)
+        for idx, sel in enumerate(epochs.selection):
+            epoch_noproj = epochs._detrend_offset_decim(
+                epochs._get_epoch_from_raw(idx))
+            epoch = epochs._project_epoch(epoch_noproj)
+            is_good, reason = epochs._is_good_epoch(epoch)
+            if is_good:
+                expected.append(epoch_noproj if epochs._do_delayed_proj
+                                else epoch)
+            else:
+                drop_log[sel] += reason
+        data = epochs.get_data()
+        assert_equal(epochs.drop_log, drop_log)
+        assert 'BAD_a' in sum(epochs.drop_log, [])
+        assert ['NO_DATA'] in epochs.drop_log
+        assert ['TOO_SHORT'] in epochs.drop_log
+        assert_allclose(data, np.array(expected), rtol=1e-7, atol=1e-20)
+        # reading again after dropping uses the batches as well
+        assert_allclose(epochs.get_data(), data, rtol=1e-7, atol=1e-20)
+
+
 def test_indexing_slicing():
     """Test of indexing and slicing operations."""
     raw, events, picks = _get_data()
@@ -7,12 +7,15 @@ import pytest
 from scipy.signal import resample as sp_resample, butter
 from scipy.fftpack import fft, fftfreq
 
-from mne import create_info
+from mne import create_info, EpochsArray
+from mne.cuda import _setup_cuda_fft_multiply_repeated
 from mne.io import RawArray, read_raw_fif
 from mne.filter import (filter_data, resample, _resample_stim_channels,
                         construct_iir_filter, notch_filter, detrend,
                         _overlap_add_filter, _smart_pad, design_mne_c_filter,
-                        estimate_ringing_samples, create_filter, _Interp2)
+                        _1d_overlap_filter,
+                        estimate_ringing_samples, create_filter, _Interp2,
+                        get_filter_cache_info, set_filter_cache_size)
 
 from mne.utils import (sum_squared, run_tests_if_main,
                        catch_logging, requires_version, _TempDir,
@@ -274,6 +277,39 @@ def test_resample_scipy():
                 assert_allclose(x_p5, x_p5_sp, atol=1e-12, err_msg=err_msg)
 
 
+@requires_version('scipy', '0.18')
+def test_resample_polyphase(monkeypatch):
+    """Test polyphase resampling."""
+    from scipy.signal import resample_poly
+    x = rng.randn(2, 3, 1001)
+    for up, down, (p, q) in ((1., 4., (1, 4)), (3., 2., (3, 2)),
+                             (256., 1000., (32, 125))):
+        want = resample_poly(x, p, q, axis=-1)  # zero padded
+        for block_size in (2 ** 20, 10):
+            monkeypatch.setattr('mne.filter._BLOCK_SIZE', block_size)
+            got = resample(x, up, down, pad='constant', method='polyphase')
+            assert got.shape == x.shape[:2] + (int(round(1001 * p / q)),)
+            assert_allclose(got, want[..., :got.shape[-1]], atol=1e-12)
+    x_rs = resample(x, 1, 2, axis=1, method='polyphase')
+    assert x_rs.shape == (2, 2, 1001)
+    # low-frequency signals survive, including at the edges
+    sfreq = 1000.
+    times = np.arange(10000) / sfreq
+    x = 1. + np.sin(2 * np.pi * 10. * times)
+    x_rs = resample(x, 250., sfreq, method='polyphase')
+    assert_allclose(x_rs, x[::4], atol=2e-3)
+    pytest.raises(ValueError, resample, x, 200., 600.614990234375,
+                  method='polyphase')
+    pytest.raises(ValueError, resample, x, 1, 2, method='foo')
+    # through Raw and Epochs
+    raw = RawArray(x[np.newaxis], create_info(1, sfreq, 'eeg'))
+    raw_rs = raw.copy().resample(250., method='polyphase')
+    assert_allclose(raw_rs.get_data(), x_rs[np.newaxis])
+    epochs = EpochsArray(x.reshape(10, 1, 1000), raw.info)
+    epochs.resample(250., method='polyphase')
+    assert epochs.get_data().shape == (10, 1, 250)
+
+
 def test_resamp_stim_channel():
     """Test resampling of stim channels."""
     # Downsampling
@@ -572,4 +608,80 @@ def test_interp2():
     assert_allclose(out, expected, atol=1e-7)
 
 
+@pytest.mark.parametrize('phase', ('zero', 'zero-double', 'minimum'))
+@pytest.mark.parametrize('n_times', (5, 300, 10000))
+def test_overlap_add_blocks(phase, n_times, monkeypatch):
+    """Test overlap-add filtering of blocks of channels at once."""
+    x = rng.randn(5, n_times)
+    h = create_filter(None, 1000., 1., 40., phase=phase)
+    picks = [0, 2, 3]
+    n_fft = 16384
+    h_use = np.convolve(h, h[::-1]) if phase == 'zero-double' else h
+    n_edge = max(min(len(h), n_times) - 1, 0)
+    _, cuda_dict = _setup_cuda_fft_multiply_repeated(1, h_use, n_fft)
+    want = x.copy()
+    for p in picks:
+        want[p] = _1d_overlap_filter(x[p], len(h_use), n_edge, phase,
+                                     cuda_dict, 'reflect_limited', n_fft)
+    for n_jobs in (1, 2):
+        got = _overlap_add_filter(x, h, n_fft, phase, picks, n_jobs)
+        assert_allclose(got, want, rtol=1e-7, atol=1e-12)
+    monkeypatch.setattr('mne.filter._BLOCK_SIZE', 1)  # row by row
+    got = _overlap_add_filter(x, h, n_fft, phase, picks)
+    assert_allclose(got, want, rtol=1e-7, atol=1e-12)
+    # without multi-threaded FFTs the blocks are processed in parallel
+    monkeypatch.setattr('mne.filter._has_fft_workers', lambda: False)
+    got = _overlap_add_filter(x, h, n_fft, phase, picks, n_jobs=2)
+    assert_allclose(got, want, rtol=1e-7, atol=1e-12)
+
+
+def test_filter_cache():
+    """Test caching of filter designs and their FFTs."""
+    set_filter_cache_size(64)  # start from an empty cache
+    sfreq = 1000.
+    x = rng.randn(2, 5000)
+    h = create_filter(x, sfreq, 1., 40., fir_design='firwin')
+    assert get_filter_cache_info() == dict(hits=0, misses=1, size=1,
+                                           max_size=64)
+    h_2 = create_filter(x, sfreq, 1., 40., fir_design='firwin')
+    assert get_filter_cache_info()['hits'] == 1
+    assert_array_equal(h, h_2)
+    h_2[:] = 0.  # must not modify the cached filter
+    assert_array_equal(create_filter(x, sfreq, 1., 40.), h)
+    assert get_filter_cache_info()['hits'] == 2
+    create_filter(x, sfreq, 1., 30.)
+    assert get_filter_cache_info()['misses'] == 2
+    # the FFT of the filter is cached, too
+    x_filt = filter_data(x, sfreq, 1., 40.)
+    info = get_filter_cache_info()
+    assert (info['hits'], info['misses'], info['size']) == (3, 3, 3)
+    assert_array_equal(filter_data(x, sfreq, 1., 40.), x_filt)
+    assert get_filter_cache_info()['hits'] == 5
+    # IIR designs and their padding
+    iir_params = dict(order=4, ftype='butter')
+    params = create_filter(x, sfreq, 1., 40., method='iir',
+                           iir_params=iir_params)
+    assert get_filter_cache_info()['misses'] == 5
+    params_2 = create_filter(x, sfreq, 1., 40., method='iir',
+                             iir_params=iir_params)
+    assert get_filter_cache_info()['hits'] == 7
+    assert_array_equal(params['sos'], params_2['sos'])
+    assert params['padlen'] == params_2['padlen']
+    assert params['sos'] is not params_2['sos']
+    # least recently used entries are dropped
+    set_filter_cache_size(2)
+    for h_freq in (10., 20., 30.):
+        create_filter(x, sfreq, None, h_freq)
+    assert get_filter_cache_info() == dict(hits=0, misses=3, size=2,
+                                           max_size=2)
+    create_filter(x, sfreq, None, 10.)
+    assert get_filter_cache_info()['misses'] == 4
+    # disabling the cache
+    set_filter_cache_size(0)
+    assert_array_equal(filter_data(x, sfreq, 1., 40.), x_filt)
+    assert get_filter_cache_info()['size'] == 0
+    pytest.raises(ValueError, set_filter_cache_size, -1)
+    set_filter_cache_size(64)
+
+
 run_tests_if_main()
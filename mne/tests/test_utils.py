@@ -15,7 +15,7 @@ from mne.datasets import testing
 from mne.externals.six.moves import StringIO
 from mne.io import show_fiff, read_raw_fif
 from mne.epochs import _segment_raw
-from mne.parallel import parallel_func
+from mne.parallel import parallel_func, check_n_jobs
 from mne.time_frequency import tfr_morlet
 from mne.utils import (set_log_level, set_log_file, _TempDir,
                        get_config, set_config, deprecated, _fetch_file,
@@ -31,7 +31,8 @@ from mne.utils import (set_log_level, set_log_file, _TempDir,
                        check_fname, get_config_path, warn,
                        object_size, buggy_mkl_svd, _get_inst_data,
                        copy_doc, copy_function_doc_to_method_doc, ProgressBar,
-                       linkcode_resolve, array_split_idx, filter_out_warnings)
+                       linkcode_resolve, array_split_idx, filter_out_warnings,
+                       requires_version, use_threads)
 
 
 base_dir = op.join(op.dirname(__file__), '..', 'io', 'tests', 'data')
@@ -855,6 +856,46 @@ def test_progressbar_parallel_more(capsys):
     assert '100.00%' in capsys.readouterr().out
 
 
+def _get_pid_and_sum(x):
+    return os.getpid(), x.sum()
+
+
+@requires_version('joblib', '0.8')
+def test_parallel_backend(monkeypatch):
+    """Test choosing the backend of parallel_func."""
+    data = [np.arange(10) * ii for ii in range(4)]
+    for kwargs in (dict(backend='threading'), dict()):
+        if len(kwargs) == 0:
+            monkeypatch.setenv('MNE_PARALLEL_BACKEND', 'threading')
+        parallel, p_fun, _ = parallel_func(_get_pid_and_sum, 2, **kwargs)
+        out = parallel(p_fun(x) for x in data)
+        assert [o[0] for o in out] == [os.getpid()] * len(data)
+        assert [o[1] for o in out] == [x.sum() for x in data]
+    pytest.raises(TypeError, parallel_func, _get_pid_and_sum, 2, backend=1)
+
+
+@requires_version('joblib', '0.8')
+def test_use_threads():
+    """Test limiting the total number of threads."""
+    data = [np.arange(10) * ii for ii in range(4)]
+    with use_threads(3):
+        assert check_n_jobs(8) == 3
+        assert check_n_jobs(-1) <= 3
+        assert check_n_jobs(2) == 2
+        with use_threads(1):
+            assert check_n_jobs(8) == 1
+        assert check_n_jobs(8) == 3
+        for backend in ('threading', None):
+            parallel, p_fun, n_jobs = parallel_func(
+                _get_pid_and_sum, 8, backend=backend)
+            assert n_jobs == 3
+            out = parallel(p_fun(x) for x in data)
+            assert [o[1] for o in out] == [x.sum() for x in data]
+    assert check_n_jobs(8) == 8
+    for n_threads in (0, 1.5, None):
+        pytest.raises(ValueError, use_threads, n_threads)
+
+
 def test_open_docs():
     """Test doc launching."""
     old_tab = webbrowser.open_new_tab
@@ -595,8 +595,14 @@ def tfr_array_multitaper(epoch_data, sfreq, freqs, n_cycles=7.0,
 
     Parameters
     ----------
-    epoch_data : array of shape (n_epochs, n_channels, n_times)
-        The epochs.
+    epoch_data : array of shape (n_epochs, n_channels, n_times) | iterable
+        The epochs. If output is 'avg_power', 'itc', 'avg_power_itc' or
+        'var_power', it can also be an iterable (e.g., a generator) of arrays
+        of shape (n_channels, n_times), which are then averaged in chunks
+        without holding all epochs in memory.
+
+        .. versionchanged:: 0.17
+           Support for iterables of epochs.
     sfreq : float | int
         Sampling frequency of the data.
     freqs : array-like of floats, shape (n_freqs)
@@ -631,6 +637,10 @@ def tfr_array_multitaper(epoch_data, sfreq, freqs, n_cycles=7.0,
         * 'itc' : inter-trial coherence.
         * 'avg_power_itc' : average of single trial power and inter-trial
           coherence across trials.
+        * 'var_power' : variance of single trial power across trials,
+          computed with Welford's algorithm.
+
+          .. versionadded:: 0.17
 
     n_jobs : int
         The number of epochs to process at the same time. The parallelization
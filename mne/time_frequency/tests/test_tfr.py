@@ -2,7 +2,7 @@ import numpy as np
 import os.path as op
 
 from numpy.testing import (assert_array_almost_equal, assert_array_equal,
-                           assert_equal)
+                           assert_equal, assert_allclose)
 import pytest
 
 import mne
@@ -12,7 +12,7 @@ from mne.utils import _TempDir, run_tests_if_main, requires_h5py, grand_average
 from mne.time_frequency.tfr import (morlet, tfr_morlet, _make_dpss,
                                     tfr_multitaper, AverageTFR, read_tfrs,
                                     write_tfrs, combine_tfr, cwt, _compute_tfr,
-                                    EpochsTFR)
+                                    EpochsTFR, _average_tfr)
 from mne.time_frequency import tfr_array_multitaper, tfr_array_morlet
 from mne.viz.utils import _fake_click
 from itertools import product
@@ -640,4 +640,92 @@ def test_compute_tfr():
             assert_array_equal(shape[1:], out.shape)
 
 
+@pytest.mark.parametrize('mode', ('same', 'valid', 'full'))
+def test_cwt_blocks(mode, monkeypatch):
+    """Test that _cwt gives the same results for any block of signals."""
+    rng = np.random.RandomState(0)
+    X = rng.randn(7, 200)
+    Ws = morlet(100., [10., 15., 30.], n_cycles=[2, 3, 5])
+    # direct convolution as reference
+    want = np.zeros((len(X), len(Ws), X.shape[1]), np.complex128)
+    for ii, W in enumerate(Ws):
+        for jj, x in enumerate(X):
+            ret = np.convolve(x, W)
+            if mode == 'valid':
+                sz = X.shape[1] - W.size + 1
+                offset = (X.shape[1] - sz) // 2
+                start = (W.size - 1 + X.shape[1] - sz) // 2
+                want[jj, ii, offset:offset + sz] = ret[start:start + sz]
+            else:
+                start = (W.size - 1) // 2
+                want[jj, ii] = ret[start:start + X.shape[1]]
+    for block_size in (1, 3 * 256 * 2, 2 ** 22):
+        monkeypatch.setattr('mne.time_frequency.tfr._BLOCK_SIZE', block_size)
+        got = cwt(X, Ws, mode=mode)
+        assert_allclose(got, want, atol=1e-10)
+        # complex signals use a complex FFT
+        got = cwt(X + 1j * X[::-1], Ws, mode=mode)
+        assert_allclose(got, want + 1j * want[::-1], atol=1e-10)
+        if mode != 'valid':
+            got = cwt(X, Ws, mode=mode, decim=2)
+            assert_allclose(got, want[..., ::2], atol=1e-10)
+
+
+def test_average_tfr_chunks(monkeypatch):
+    """Test averaging TFRs over chunks of epochs."""
+    rng = np.random.RandomState(0)
+    data = rng.randn(10, 3, 200)
+    sfreq, freqs = 100., np.array([10., 20.])
+    kwargs = dict(sfreq=sfreq, freqs=freqs, n_cycles=2.)
+    power = tfr_array_morlet(data, output='power', **kwargs)
+    itc = tfr_array_morlet(data, output='itc', **kwargs)
+    Ws = [morlet(sfreq, freqs, n_cycles=2.)]
+    for block_size in (1, 3 * 200 * 4, 2 ** 22):
+        monkeypatch.setattr('mne.time_frequency.tfr._BLOCK_SIZE', block_size)
+        avg = _average_tfr(iter(data), Ws, True, slice(None),
+                           return_itc=True, return_var=True)
+        assert avg.n_epochs == len(data)
+        assert_allclose(avg.power, power.mean(axis=0))
+        assert_allclose(avg.var, power.var(axis=0, ddof=1))
+        assert_allclose(avg.itc, itc)
+        # generators of epochs
+        out = tfr_array_morlet((epoch for epoch in data), output='avg_power',
+                               **kwargs)
+        assert_allclose(out, power.mean(axis=0))
+        out = tfr_array_multitaper((epoch for epoch in data),
+                                   output='avg_power_itc', **kwargs)
+        assert_allclose(out, tfr_array_multitaper(data, output='avg_power_itc',
+                                                  **kwargs))
+        # variance of the power across epochs
+        out = tfr_array_morlet((epoch for epoch in data), output='var_power',
+                               **kwargs)
+        assert_allclose(out, power.var(axis=0, ddof=1))
+        out = tfr_array_multitaper(data, output='var_power', **kwargs)
+        assert_allclose(out, tfr_array_multitaper(
+            data, output='power', **kwargs).var(axis=0, ddof=1))
+    pytest.raises(ValueError, tfr_array_morlet, iter([]), output='itc',
+                  **kwargs)
+    pytest.raises(ValueError, tfr_array_morlet, iter(data[0]), output='itc',
+                  **kwargs)
+
+    # epochs are averaged without being loaded
+    raw = read_raw_fif(raw_fname)
+    events = read_events(event_fname)
+    epochs = Epochs(raw, events[:10], tmin=-0.1, tmax=0.4,
+                    picks=[0, 1, 2, 306, 307], reject=dict(grad=4000e-13))
+    kwargs = dict(freqs=freqs, n_cycles=2., use_fft=True, return_itc=True)
+    power, itc = tfr_morlet(epochs, **kwargs)
+    assert not epochs.preload
+    power_, itc_ = tfr_morlet(epochs.copy().load_data(), **kwargs)
+    assert power.nave == power_.nave
+    assert_allclose(power.data, power_.data)
+    assert_allclose(itc.data, itc_.data)
+    epochs.drop_bad()  # now read in batches
+    power, itc = tfr_morlet(epochs, **kwargs)
+    assert not epochs.preload
+    assert power.nave == len(epochs)
+    assert_allclose(power.data, power_.data)
+    assert_allclose(itc.data, itc_.data)
+
+
 run_tests_if_main()
@@ -11,6 +11,7 @@ Morlet code inspired by Matlab code from Sheraz Khan & Brainstorm & SPM
 
 from copy import deepcopy
 from functools import partial
+from itertools import chain
 from math import sqrt
 from warnings import warn
 
@@ -34,6 +35,9 @@ from ..viz.utils import (figure_nobar, plt_show, _setup_cmap,
 from ..externals.h5io import write_hdf5, read_hdf5
 from ..externals.six import string_types
 
+# maximum number of complex values to process at once in _cwt
+_BLOCK_SIZE = 2 ** 22
+
 
 # Make wavelet
 
@@ -188,6 +192,13 @@ def _cwt(X, Ws, mode="same", decim=1, use_fft=True):
     -------
     out : array, shape (n_signals, n_freqs, n_time_decim)
         The time-frequency transform of the signals.
+
+    Notes
+    -----
+    With ``use_fft=True``, the signals are processed in blocks: the FFTs of
+    a block of signals are multiplied by the FFTs of all wavelets and
+    transformed back with a single inverse FFT, using at most about
+    ``_BLOCK_SIZE`` complex values at once.
     """
     if mode not in ['same', 'valid', 'full']:
         raise ValueError("`mode` must be 'same', 'valid' or 'full', "
@@ -200,19 +211,8 @@ def _cwt(X, Ws, mode="same", decim=1, use_fft=True):
     n_times_out = X[:, decim].shape[1]
     n_freqs = len(Ws)
 
-    Ws_max_size = max(W.size for W in Ws)
-    size = n_times + Ws_max_size - 1
-    # Always use 2**n-sized FFT
-    fsize = 2 ** int(np.ceil(np.log2(size)))
-
-    # precompute FFTs of Ws
-    if use_fft:
-        fft_Ws = np.empty((n_freqs, fsize), dtype=np.complex128)
-
     warn_me = True
-    for i, W in enumerate(Ws):
-        if use_fft:
-            fft_Ws[i] = fft(W, fsize)
+    for W in Ws:
         if len(W) > n_times and warn_me:
             msg = ('At least one of the wavelets is longer than the signal. '
                    'Consider padding the signal or using shorter wavelets.')
@@ -222,38 +222,75 @@ def _cwt(X, Ws, mode="same", decim=1, use_fft=True):
             else:
                 raise ValueError(msg)
 
-    # Make generator looping across signals
-    tfr = np.zeros((n_freqs, n_times_out), dtype=np.complex128)
-    for x in X:
-        if use_fft:
-            fft_x = fft(x, fsize)
-
-        # Loop across wavelets
-        for ii, W in enumerate(Ws):
-            if use_fft:
-                ret = ifft(fft_x * fft_Ws[ii])[:n_times + W.size - 1]
-            else:
+    # Where each wavelet's convolution goes in the output
+    slices = list()
+    for W in Ws:
+        if mode == 'valid':
+            sz = int(abs(W.size - n_times)) + 1
+            offset = (n_times - sz) // 2
+            out_slice = slice(offset // decim.step,
+                              (offset + sz) // decim.step)
+            start = (n_times - 1 + W.size - sz) // 2  # as in _centered
+        elif mode == 'full' and not use_fft:
+            out_slice = slice(None)
+            sz = n_times + W.size - 1 - (W.size - 1) // 2 - W.size // 2
+            start = (W.size - 1) // 2
+        else:
+            out_slice = slice(None)
+            sz = n_times
+            start = (W.size - 1) // 2  # as in _centered
+        slices.append((out_slice, slice(start, start + sz)))
+
+    if not use_fft:
+        tfr = np.zeros((n_freqs, n_times_out), dtype=np.complex128)
+        for x in X:
+            # Loop across wavelets
+            for ii, W in enumerate(Ws):
                 ret = np.convolve(x, W, mode=mode)
+                if mode == 'valid':
+                    tfr[ii, slices[ii][0]] = ret[decim]
+                else:
+                    if mode == 'full':
+                        ret = ret[slices[ii][1]]
+                    tfr[ii, :] = ret[decim]
+            yield tfr
+        return
 
-            # Center and decimate decomposition
-            if mode == 'valid':
-                sz = int(abs(W.size - n_times)) + 1
-                offset = (n_times - sz) // 2
-                this_slice = slice(offset // decim.step,
-                                   (offset + sz) // decim.step)
-                if use_fft:
-                    ret = _centered(ret, sz)
-                tfr[ii, this_slice] = ret[decim]
-            elif mode == 'full' and not use_fft:
-                start = (W.size - 1) // 2
-                end = len(ret) - (W.size // 2)
-                ret = ret[start:end]
-                tfr[ii, :] = ret[decim]
-            else:
-                if use_fft:
-                    ret = _centered(ret, n_times)
-                tfr[ii, :] = ret[decim]
-        yield tfr
+    from ..filter import next_fast_len
+    Ws_max_size = max(W.size for W in Ws)
+    fsize = next_fast_len(n_times + Ws_max_size - 1)
+
+    # precompute FFTs of Ws
+    fft_Ws = np.empty((n_freqs, fsize), dtype=np.complex128)
+    for ii, W in enumerate(Ws):
+        fft_Ws[ii] = fft(W, fsize)
+
+    # Loop across blocks of signals, with a single inverse FFT for all the
+    # signals and wavelets of a block
+    n_block = int(min(max(_BLOCK_SIZE // (n_freqs * fsize), 1), n_signals))
+    tfr = np.zeros((n_block, n_freqs, n_times_out), dtype=np.complex128)
+    for start in range(0, n_signals, n_block):
+        x = X[start:start + n_block]
+        fft_x = _full_fft(x, fsize)
+        ret = ifft(fft_x[:, np.newaxis] * fft_Ws, axis=-1)
+        del fft_x
+        for ii, (out_slice, in_slice) in enumerate(slices):
+            tfr[:len(x), ii, out_slice] = ret[:, ii, in_slice][:, decim]
+        del ret
+        for this_tfr in tfr[:len(x)]:
+            yield this_tfr
+
+
+def _full_fft(x, fsize):
+    """Compute the FFT of the rows of x, using a real FFT for real data."""
+    if np.iscomplexobj(x):
+        return fft(x, fsize, axis=-1)
+    fft_x = np.empty((len(x), fsize), dtype=np.complex128)
+    n_half = fsize // 2 + 1
+    fft_x[:, :n_half] = np.fft.rfft(x, fsize, axis=-1)
+    # the negative frequencies are the conjugates of the positive ones
+    fft_x[:, n_half:] = np.conj(fft_x[:, (fsize - 1) // 2:0:-1])
+    return fft_x
 
 
 # Loop of convolution: single trial
@@ -267,8 +304,11 @@ def _compute_tfr(epoch_data, freqs, sfreq=1.0, method='morlet',
 
     Parameters
     ----------
-    epoch_data : array of shape (n_epochs, n_channels, n_times)
-        The epochs.
+    epoch_data : array of shape (n_epochs, n_channels, n_times) | iterable
+        The epochs. If output is 'avg_power', 'itc', 'avg_power_itc' or
+        'var_power', it can also be an iterable (e.g., a generator) of arrays
+        of shape (n_channels, n_times), which are processed in chunks of
+        epochs.
     freqs : array-like of floats, shape (n_freqs)
         The frequencies.
     sfreq : float | int, defaults to 1.0
@@ -309,6 +349,8 @@ def _compute_tfr(epoch_data, freqs, sfreq=1.0, method='morlet',
         * 'itc' : inter-trial coherence.
         * 'avg_power_itc' : average of single trial power and inter-trial
           coherence across trials.
+        * 'var_power' : variance of single trial power across trials,
+          computed with Welford's algorithm.
 
     n_jobs : int, defaults to 1
         The number of epochs to process at the same time. The parallelization
@@ -327,10 +369,24 @@ def _compute_tfr(epoch_data, freqs, sfreq=1.0, method='morlet',
         imaginary values code for the 'itc': out = avg_power + i * itc
     """
     # Check data
-    epoch_data = np.asarray(epoch_data)
-    if epoch_data.ndim != 3:
-        raise ValueError('epoch_data must be of shape '
-                         '(n_epochs, n_chans, n_times)')
+    average = output in ('avg_power', 'itc', 'avg_power_itc', 'var_power')
+    if average and not isinstance(epoch_data, (np.ndarray, list, tuple)):
+        epoch_data = iter(epoch_data)
+        first = next(epoch_data, None)
+        if first is None:
+            raise ValueError('epoch_data must contain at least one epoch')
+        first = np.asarray(first)
+        if first.ndim != 2:
+            raise ValueError('The epochs in epoch_data must be of shape '
+                             '(n_chans, n_times)')
+        epoch_data = chain([first], epoch_data)
+        n_chans, n_times = first.shape
+    else:
+        epoch_data = np.asarray(epoch_data)
+        if epoch_data.ndim != 3:
+            raise ValueError('epoch_data must be of shape '
+                             '(n_epochs, n_chans, n_times)')
+        n_chans, n_times = epoch_data.shape[1:]
 
     # Check params
     freqs, sfreq, zero_mean, n_cycles, time_bandwidth, decim = \
@@ -347,25 +403,31 @@ def _compute_tfr(epoch_data, freqs, sfreq=1.0, method='morlet',
                         time_bandwidth=time_bandwidth, zero_mean=zero_mean)
 
     # Check wavelets
-    if len(Ws[0][0]) > epoch_data.shape[2]:
+    if len(Ws[0][0]) > n_times:
         raise ValueError('At least one of the wavelets is longer than the '
                          'signal. Use a longer signal or shorter wavelets.')
 
-    # Initialize output
     decim = _check_decim(decim)
+    if average:
+        avg = _average_tfr(epoch_data, Ws, use_fft, decim,
+                           return_itc='itc' in output,
+                           return_var=output == 'var_power', n_jobs=n_jobs)
+        if output == 'avg_power':
+            return avg.power
+        elif output == 'itc':
+            return avg.itc
+        elif output == 'var_power':
+            return avg.var
+        else:
+            # avg_power_itc is stored as power + 1i * itc to keep a
+            # simple dimensionality
+            return avg.power + 1j * avg.itc
+
+    # Initialize output
     n_freqs = len(freqs)
     n_epochs, n_chans, n_times = epoch_data[:, :, decim].shape
-    if output in ('power', 'phase', 'avg_power', 'itc'):
-        dtype = np.float
-    elif output in ('complex', 'avg_power_itc'):
-        # avg_power_itc is stored as power + 1i * itc to keep a
-        # simple dimensionality
-        dtype = np.complex
-
-    if ('avg_' in output) or ('itc' in output):
-        out = np.empty((n_chans, n_freqs, n_times), dtype)
-    else:
-        out = np.empty((n_chans, n_epochs, n_freqs, n_times), dtype)
+    dtype = np.complex if output == 'complex' else np.float
+    out = np.empty((n_chans, n_epochs, n_freqs, n_times), dtype)
 
     # Parallel computation
     parallel, my_cwt, _ = parallel_func(_time_frequency_loop, n_jobs)
@@ -379,10 +441,169 @@ def _compute_tfr(epoch_data, freqs, sfreq=1.0, method='morlet',
     for channel_idx, tfr in enumerate(tfrs):
         out[channel_idx] = tfr
 
-    if ('avg_' not in output) and ('itc' not in output):
-        # This is to enforce that the first dimension is for epochs
-        out = out.transpose(1, 0, 2, 3)
-    return out
+    # This is to enforce that the first dimension is for epochs
+    return out.transpose(1, 0, 2, 3)
+
+
+def _average_tfr(epoch_data, Ws, use_fft, decim, return_itc=False,
+                 return_var=False, n_jobs=1):
+    """Average the TFR of epochs, processing them in chunks.
+
+    Parameters
+    ----------
+    epoch_data : array, shape (n_epochs, n_chans, n_times) | iterable
+        The epochs, or an iterable of arrays of shape (n_chans, n_times).
+    Ws : list, shape (n_tapers, n_wavelets, n_times)
+        The wavelets.
+    use_fft : bool
+        Use the FFT for convolutions or not.
+    decim : slice
+        The decimation slice: e.g. power[:, decim]
+    return_itc : bool
+        Whether to compute the inter-trial coherence.
+    return_var : bool
+        Whether to compute the variance of the power across epochs.
+    n_jobs : int
+        The number of jobs to run in parallel across channels.
+
+    Returns
+    -------
+    avg : instance of _TFRAverage
+        The average TFR. Only the sums of the current chunk of epochs and
+        of the average are kept in memory.
+    """
+    parallel, my_sums, _ = parallel_func(_tfr_sums, n_jobs)
+    avg = _TFRAverage()
+    for chunk in _iter_epoch_chunks(epoch_data):
+        sums = parallel(my_sums(channel, Ws, use_fft, 'same', decim,
+                                return_itc, return_var)
+                        for channel in chunk.transpose(1, 0, 2))
+        power, plf, m2 = [np.array([this_sums[ii] for this_sums in sums])
+                          if sums[0][ii] is not None else None
+                          for ii in range(3)]
+        avg.add(len(chunk), power, plf, m2)
+    return avg
+
+
+def _iter_epoch_chunks(epoch_data):
+    """Iterate over chunks of an array or an iterable of epochs."""
+    if isinstance(epoch_data, np.ndarray):
+        n_epochs = len(epoch_data)
+        epoch_data = iter(epoch_data)
+    else:
+        n_epochs = np.inf
+    n_chunk = None
+    chunk = list()
+    for epoch in epoch_data:
+        if n_chunk is None:
+            n_chunk = max(_BLOCK_SIZE // (epoch.shape[0] * epoch.shape[1]),
+                          1)
+            n_chunk = min(n_chunk, n_epochs)
+        chunk.append(epoch)
+        if len(chunk) == n_chunk:
+            yield np.array(chunk)
+            chunk = list()
+    if len(chunk) > 0:
+        yield np.array(chunk)
+
+
+def _tfr_sums(X, Ws, use_fft, mode, decim, return_itc, return_var):
+    """Aux. function to _average_tfr.
+
+    Computes the sums of the power and the phase of the TFR of a channel
+    across a chunk of epochs.
+
+    Parameters
+    ----------
+    X : array, shape (n_epochs, n_times)
+        The epochs data of a single channel.
+    Ws : list, shape (n_tapers, n_wavelets, n_times)
+        The wavelets.
+    use_fft : bool
+        Use the FFT for convolutions or not.
+    mode : {'full', 'valid', 'same'}
+        See numpy.convolve.
+    decim : slice
+        The decimation slice: e.g. power[:, decim]
+    return_itc : bool
+        Whether to compute the sum of the phase.
+    return_var : bool
+        Whether to compute the sum of the squared deviations of the power.
+
+    Returns
+    -------
+    power : array, shape (n_freqs, n_times)
+        The sum of the power, averaged across tapers, over epochs.
+    plf : array, shape (n_tapers, n_freqs, n_times) | None
+        The sum of the unit phase vectors over epochs, for each taper.
+    m2 : array, shape (n_freqs, n_times) | None
+        The sum of the squared deviations of the power from its mean.
+    """
+    n_epochs, n_times = X[:, decim].shape
+    n_freqs = len(Ws[0])
+    power = np.zeros((n_freqs, n_times))
+    plf = np.zeros((len(Ws), n_freqs, n_times), np.complex128) \
+        if return_itc else None
+    m2 = np.zeros((n_freqs, n_times)) if return_var else None
+    # transform all tapers of an epoch together to get its power at once
+    coefs = [_cwt(X, W, mode, decim=decim, use_fft=use_fft) for W in Ws]
+    for epoch_idx in range(n_epochs):
+        this_power = np.zeros((n_freqs, n_times))
+        for taper_idx, taper_coefs in enumerate(coefs):
+            tfr = next(taper_coefs)
+            tfr_abs = np.abs(tfr)
+            this_power += tfr_abs ** 2
+            if return_itc:
+                plf[taper_idx] += tfr / tfr_abs
+        this_power /= len(Ws)
+        if return_var:  # Welford's algorithm
+            delta = this_power - power / max(epoch_idx, 1)
+            power += this_power
+            m2 += delta * (this_power - power / (epoch_idx + 1))
+        else:
+            power += this_power
+    return power, plf, m2
+
+
+class _TFRAverage(object):
+    """Running average of the TFR power and phase across epochs.
+
+    The variance of the power is updated with the parallel version of
+    Welford's algorithm to stay accurate over many epochs.
+    """
+
+    def __init__(self):  # noqa: D102
+        self.n_epochs = 0
+        self._power = self._plf = self._m2 = None
+
+    def add(self, n_epochs, power, plf=None, m2=None):
+        """Add the sums over a chunk of epochs (see _tfr_sums)."""
+        if self.n_epochs == 0:
+            self._power, self._plf, self._m2 = power, plf, m2
+        else:
+            if m2 is not None:
+                delta = power / n_epochs - self._power / self.n_epochs
+                self._m2 += m2 + delta ** 2 * (
+                    self.n_epochs * n_epochs / float(self.n_epochs + n_epochs))
+            self._power += power
+            if plf is not None:
+                self._plf += plf
+        self.n_epochs += n_epochs
+
+    @property
+    def power(self):
+        """The average power."""
+        return self._power / self.n_epochs
+
+    @property
+    def itc(self):
+        """The inter-trial coherence, averaged across tapers."""
+        return np.abs(self._plf).mean(axis=-3) / self.n_epochs
+
+    @property
+    def var(self):
+        """The variance of the power across epochs."""
+        return self._m2 / max(self.n_epochs - 1, 1)
 
 
 def _check_tfr_param(freqs, sfreq, method, zero_mean, n_cycles,
@@ -448,7 +669,7 @@ def _check_tfr_param(freqs, sfreq, method, zero_mean, n_cycles,
 
     # Check output
     allowed_ouput = ('complex', 'power', 'phase',
-                     'avg_power_itc', 'avg_power', 'itc')
+                     'avg_power_itc', 'avg_power', 'itc', 'var_power')
     if output not in allowed_ouput:
         raise ValueError("Unknown output type. Allowed are %s but "
                          "got %s." % (allowed_ouput, output))
@@ -476,10 +697,8 @@ def _time_frequency_loop(X, Ws, output, use_fft, mode, decim):
         * 'complex' : single trial complex.
         * 'power' : single trial power.
         * 'phase' : single trial phase.
-        * 'avg_power' : average of single trial power.
-        * 'itc' : inter-trial coherence.
-        * 'avg_power_itc' : average of single trial power and inter-trial
-          coherence across trials.
+
+        Averages across trials are computed by _average_tfr.
 
     use_fft : bool
         Use the FFT for convolutions or not.
@@ -490,56 +709,29 @@ def _time_frequency_loop(X, Ws, output, use_fft, mode, decim):
     """
     # Set output type
     dtype = np.float
-    if output in ['complex', 'avg_power_itc']:
+    if output == 'complex':
         dtype = np.complex
 
     # Init outputs
     decim = _check_decim(decim)
     n_epochs, n_times = X[:, decim].shape
     n_freqs = len(Ws[0])
-    if ('avg_' in output) or ('itc' in output):
-        tfrs = np.zeros((n_freqs, n_times), dtype=dtype)
-    else:
-        tfrs = np.zeros((n_epochs, n_freqs, n_times), dtype=dtype)
+    tfrs = np.zeros((n_epochs, n_freqs, n_times), dtype=dtype)
 
     # Loops across tapers.
     for W in Ws:
         coefs = _cwt(X, W, mode, decim=decim, use_fft=use_fft)
 
-        # Inter-trial phase locking is apparently computed per taper...
-        if 'itc' in output:
-            plf = np.zeros((n_freqs, n_times), dtype=np.complex)
-
         # Loop across epochs
         for epoch_idx, tfr in enumerate(coefs):
             # Transform complex values
-            if output in ['power', 'avg_power']:
+            if output == 'power':
                 tfr = (tfr * tfr.conj()).real  # power
             elif output == 'phase':
                 tfr = np.angle(tfr)
-            elif output == 'avg_power_itc':
-                tfr_abs = np.abs(tfr)
-                plf += tfr / tfr_abs  # phase
-                tfr = tfr_abs ** 2  # power
-            elif output == 'itc':
-                plf += tfr / np.abs(tfr)  # phase
-                continue  # not need to stack anything else than plf
-
-            # Stack or add
-            if ('avg_' in output) or ('itc' in output):
-                tfrs += tfr
-            else:
-                tfrs[epoch_idx] += tfr
-
-        # Compute inter trial coherence
-        if output == 'avg_power_itc':
-            tfrs += 1j * np.abs(plf)
-        elif output == 'itc':
-            tfrs += np.abs(plf)
 
-    # Normalization of average metrics
-    if ('avg_' in output) or ('itc' in output):
-        tfrs /= n_epochs
+            # Stack
+            tfrs[epoch_idx] += tfr
 
     # Normalization by number of taper
     tfrs /= len(Ws)
@@ -595,12 +787,9 @@ def cwt(X, Ws, use_fft=True, mode='same', decim=1):
 def _tfr_aux(method, inst, freqs, decim, return_itc, picks, average,
              output=None, **tfr_params):
     """Help reduce redundancy between tfr_morlet and tfr_multitaper."""
+    from ..epochs import BaseEpochs
     decim = _check_decim(decim)
-    data = _get_data(inst, return_itc)
-    info = inst.info
-
-    info, data, picks = _prepare_picks(info, data, picks)
-    data = data[:, picks, :]
+    info, picks = _prepare_picks(inst.info, picks)
 
     if average:
         if output == 'complex':
@@ -615,8 +804,22 @@ def _tfr_aux(method, inst, freqs, decim, return_itc, picks, average,
             raise ValueError('Inter-trial coherence is not supported'
                              ' with average=False')
 
-    out = _compute_tfr(data, freqs, info['sfreq'], method=method,
-                       output=output, decim=decim, **tfr_params)
+    if average and isinstance(inst, BaseEpochs):
+        # stream the epochs to average without loading all of them
+        nave = [0]
+
+        def data():
+            for epoch in _iter_epochs_data(inst):
+                nave[0] += 1
+                yield epoch[picks]
+        out = _compute_tfr(data(), freqs, info['sfreq'], method=method,
+                           output=output, decim=decim, **tfr_params)
+        nave = nave[0]
+    else:
+        data = _get_data(inst, return_itc)[:, picks, :]
+        out = _compute_tfr(data, freqs, info['sfreq'], method=method,
+                           output=output, decim=decim, **tfr_params)
+        nave = len(data)
     times = inst.times[decim].copy()
 
     if average:
@@ -624,7 +827,6 @@ def _tfr_aux(method, inst, freqs, decim, return_itc, picks, average,
             power, itc = out.real, out.imag
         else:
             power = out
-        nave = len(data)
         out = AverageTFR(info, power, times, freqs, nave,
                          method='%s-power' % method)
         if return_itc:
@@ -718,8 +920,14 @@ def tfr_array_morlet(epoch_data, sfreq, freqs, n_cycles=7.0,
 
     Parameters
     ----------
-    epoch_data : array of shape (n_epochs, n_channels, n_times)
-        The epochs.
+    epoch_data : array of shape (n_epochs, n_channels, n_times) | iterable
+        The epochs. If output is 'avg_power', 'itc', 'avg_power_itc' or
+        'var_power', it can also be an iterable (e.g., a generator) of arrays
+        of shape (n_channels, n_times), which are then averaged in chunks
+        without holding all epochs in memory.
+
+        .. versionchanged:: 0.17
+           Support for iterables of epochs.
     sfreq : float | int
         Sampling frequency of the data.
     freqs : array-like of floats, shape (n_freqs)
@@ -750,6 +958,10 @@ def tfr_array_morlet(epoch_data, sfreq, freqs, n_cycles=7.0,
         * 'itc' : inter-trial coherence.
         * 'avg_power_itc' : average of single trial power and inter-trial
           coherence across trials.
+        * 'var_power' : variance of single trial power across trials,
+          computed with Welford's algorithm.
+
+          .. versionadded:: 0.17
 
     n_jobs : int
         The number of epochs to process at the same time. The parallelization
@@ -1729,7 +1941,7 @@ class AverageTFR(_BaseTFR):
         data = self.data
         info = self.info
 
-        info, data, picks = _prepare_picks(info, data, picks)
+        info, picks = _prepare_picks(info, picks)
         data = data[picks]
 
         data, times, freqs, vmin, vmax = \
@@ -2134,16 +2346,27 @@ def _get_data(inst, return_itc):
     return data
 
 
-def _prepare_picks(info, data, picks):
+def _iter_epochs_data(epochs):
+    """Iterate over the data of epochs without loading all of them."""
+    if epochs._bad_dropped:  # read in batches
+        for _, data in epochs._iter_data():
+            for epoch in data:
+                yield epoch
+    else:  # reject bad epochs one at a time
+        for epoch in epochs:
+            yield epoch
+
+
+def _prepare_picks(info, picks):
     """Prepare the picks."""
     if picks is None:
         picks = _pick_data_channels(info, with_ref_meg=True, exclude='bads')
-    if np.array_equal(picks, np.arange(len(data))):
+    if np.array_equal(picks, np.arange(len(info['ch_names']))):
         picks = slice(None)
     else:
         info = pick_info(info, picks)
 
-    return info, data, picks
+    return info, picks
 
 
 def _centered(arr, newsize):
@@ -7,7 +7,7 @@ from __future__ import print_function
 # License: BSD (3-clause)
 
 import atexit
-from collections import Iterable
+from collections import Iterable, OrderedDict
 from contextlib import contextmanager
 from distutils.version import LooseVersion
 from functools import wraps
@@ -28,6 +28,7 @@ from string import Formatter
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import traceback
 from unittest import SkipTest
@@ -487,6 +488,50 @@ class _Counter():
         return c
 
 
+class _LRUCache(object):
+    """Bounded least-recently-used cache that counts hits and misses."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, compute):
+        """Get the value for key, using compute() to create it if needed."""
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                value = self._data.pop(key)
+                self._data[key] = value  # now the most recently used
+                return value
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            if self.max_size > 0:
+                self._data[key] = value
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+        return value
+
+    def remove(self, func):
+        """Remove the entries whose key satisfies func(key)."""
+        with self._lock:
+            for key in [key for key in self._data if func(key)]:
+                del self._data[key]
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """Get the cache statistics."""
+        return dict(hits=self.hits, misses=self.misses,
+                    size=len(self._data), max_size=self.max_size)
+
+
 class WrapStdOut(object):
     """Dynamically wrap to sys.stdout.
 
@@ -822,6 +867,50 @@ class use_log_level(object):
         set_log_level(self.old_level)
 
 
+class use_threads(object):
+    """Context handler to limit the number of threads used by MNE.
+
+    Within the context, the total number of threads is shared between
+    parallel jobs and the BLAS/FFT threads of each job: ``n_jobs`` is
+    capped at ``n_threads`` and each of the jobs run with
+    :func:`mne.parallel.parallel_func` uses ``n_threads // n_jobs`` BLAS
+    threads. Functions run serially can use ``n_threads`` BLAS threads.
+    Limiting the BLAS threads requires threadpoolctl.
+
+    Parameters
+    ----------
+    n_threads : int
+        The total number of threads (e.g., the number of CPU cores
+        available to the process).
+
+    Notes
+    -----
+    .. versionadded:: 0.17
+    """
+
+    def __init__(self, n_threads):  # noqa: D102
+        if not isinstance(n_threads, (int, np.integer)) or n_threads < 1:
+            raise ValueError('n_threads must be a positive integer, got %r'
+                             % (n_threads,))
+        self.n_threads = int(n_threads)
+
+    def __enter__(self):  # noqa: D105
+        from .parallel import _set_thread_budget, _blas_threads
+        self._old_n_threads = _set_thread_budget(self.n_threads)
+        logger.info('Using at most %d thread(s) for parallel jobs and BLAS'
+                    % (self.n_threads,))
+        self._blas = _blas_threads(self.n_threads)
+        self._blas.__enter__()
+        return self
+
+    def __exit__(self, *args):  # noqa: D105
+        from .parallel import _set_thread_budget
+        try:
+            self._blas.__exit__(*args)
+        finally:
+            _set_thread_budget(self._old_n_threads)
+
+
 def has_nibabel(vox2ras_tkr=False):
     """Determine if nibabel is installed.
 
@@ -1611,6 +1700,7 @@ known_config_types = (
     'MNE_KIT2FIFF_STIM_CHANNEL_THRESHOLD',
     'MNE_LOGGING_LEVEL',
     'MNE_MEMMAP_MIN_SIZE',
+    'MNE_PARALLEL_BACKEND',
     'MNE_SKIP_FTP_TESTS',
     'MNE_SKIP_NETWORK_TESTS',
     'MNE_SKIP_TESTING_DATASET_TESTS',